@@ -38,6 +38,9 @@ internal sealed interface Arg {
     enum class InputSource(override val short: String, override val long: String) : Arg {
         File(short = "-f", long = "--file"),
         Raw(short = "-r", long = "--raw"),
+
+        /** file paths are read from stdin, one per line, and a result is emitted per file. currently only for [Mode.Format] */
+        Paths(short = "-p", long = "--paths"),
         ;
     }
 
@@ -61,6 +64,7 @@ internal fun usage(): String = buildString {
             when (it) {
                 Arg.InputSource.File -> it.long + " FILE"
                 Arg.InputSource.Raw -> it.long
+                Arg.InputSource.Paths -> it.long
             }
         }
 
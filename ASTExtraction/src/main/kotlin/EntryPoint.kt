@@ -31,6 +31,7 @@ import spec.cvlast.SolidityContract
 import spec.cvlast.typechecker.CVLError
 import utils.CollectingResult
 import utils.nextOrNull
+import java.io.IOException
 import java.nio.file.Path
 import kotlin.io.path.isRegularFile
 import kotlin.io.path.readText
@@ -43,6 +44,10 @@ import kotlin.system.exitProcess
  * If it fails, errors are emitted to stdout, while the ast will be null. Serialization is done via JSON.
  * Currently only basic syntax checking is done. For example, types are not validated and imports are not considered.
  *
+ * In [Arg.InputSource.Paths] mode, the JVM stays up and formats every file whose path is read from stdin, emitting a
+ * [FormattedFile] as a single line of JSON for each, until stdin is closed. This saves a JVM startup per file when
+ * formatting many files, and lets editors keep a formatter process running.
+ *
  * This entry point is currently internal-only.
  */
 fun main(args: Array<String>) {
@@ -72,6 +77,11 @@ fun main(args: Array<String>) {
             val stdin = readUntilEndOfInput()
             Source.String(stdin)
         }
+
+        Arg.InputSource.Paths -> {
+            iter.requireExhausted()
+            Source.Paths
+        }
     }
 
     when (mode) {
@@ -83,6 +93,7 @@ fun main(args: Array<String>) {
                 }
 
                 is Source.String -> Raw(name = "dummy file", rawTxt = source.str, isImported = false)
+                is Source.Paths -> exitError { "${Arg.InputSource.Paths.long} is only supported by ${Arg.Mode.Format.long}" }
             }
             syntaxCheck(cvlSource)
         }
@@ -91,6 +102,7 @@ fun main(args: Array<String>) {
             when (source) {
                 is Source.File -> format(source.file.readText())
                 is Source.String -> format(source.str)
+                is Source.Paths -> formatPaths()
             }
         }
     }
@@ -121,34 +133,79 @@ private fun syntaxCheck(cvlSource: CVLSource): Nothing {
 }
 
 private fun format(source: String): Nothing {
+    when (val result = formatToResult(source)) {
+        is FormatResult.Success -> {
+            print(result.output)
+            exitProcess(EXIT_SUCCESS)
+        }
+        is FormatResult.Failure -> exitError { result.message }
+    }
+}
+
+private fun formatToResult(source: String): FormatResult {
     val ast = when (val cr = parseToAst(source)) {
         is CollectingResult.Result<Ast> -> cr.result
         is CollectingResult.Error<CVLError> -> {
             val lineBreak = System.lineSeparator()
             val messages = cr.messages.joinToString(separator = lineBreak, transform = CVLError::message)
 
-            exitError {
+            return FormatResult.Failure(
                 if (cr.messages.isEmpty()) {
                     "file could not be parsed."
                 } else {
                     "file could not be parsed. got errors:${lineBreak}${messages}"
                 }
-            }
+            )
         }
     }
 
     // XXX: try-catch isn't proper error handling.
-    try {
-        val output = FormatterInput(ast).output()
-        print(output)
-        exitProcess(EXIT_SUCCESS)
+    return try {
+        FormatResult.Success(FormatterInput(ast).output())
     } catch (e: IllegalStateException) {
         // here to catch things from `ensure`
-        exitError { "error while formatting valid AST. got: $e" }
+        FormatResult.Failure("error while formatting valid AST. got: $e")
+    }
+}
+
+/** formats the files whose paths are read from stdin, see [Arg.InputSource.Paths] */
+private fun formatPaths(): Nothing {
+    for (line in generateSequence(::readLine)) {
+        if (line.isBlank()) {
+            continue
+        }
+
+        val path = runCatching { Path.of(line) }.getOrNull()?.takeIf(Path::isRegularFile)
+
+        val formatted = if (path == null) {
+            FormattedFile(file = line, output = null, error = "invalid file: $line")
+        } else {
+            val result = try {
+                formatToResult(path.readText())
+            } catch (e: IOException) {
+                FormatResult.Failure("could not read file. got: $e")
+            }
+
+            when (result) {
+                is FormatResult.Success -> FormattedFile(file = line, output = result.output, error = null)
+                is FormatResult.Failure -> FormattedFile(file = line, output = null, error = result.message)
+            }
+        }
+
+        println(lspJsonConfig.encodeToString(formatted))
+        System.out.flush()
     }
+
+    exitProcess(EXIT_SUCCESS)
+}
+
+private sealed interface FormatResult {
+    class Success(val output: String) : FormatResult
+    class Failure(val message: String) : FormatResult
 }
 
 private sealed interface Source {
     class File(val file: Path) : Source
     class String(val str: kotlin.String) : Source
+    object Paths : Source
 }
@@ -85,6 +85,10 @@ internal data class LSPDiagnostic(val error: CVLError, val severity: Severity)
 @Serializable
 internal enum class Severity { WARNING, ERROR }
 
+/** the result of formatting a single file in [Arg.InputSource.Paths] mode. exactly one of [output] and [error] is set */
+@Serializable
+internal data class FormattedFile(val file: String, val output: String?, val error: String?)
+
 internal fun collectWarningsForLSP(ast: CVLAst): CollectingResult<CVLAst, CVLError> {
     val cmdChecker = object : CVLCmdTransformer<CVLError>(CVLExpTransformer.copyTransformer()) {
         override fun assumeCmd(cmd: CVLCmd.Simple.AssumeCmd.Assume): CollectingResult<CVLCmd, CVLError> {
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any, List, Tuple
+from unittest import mock
+
+# Add the path to the scripts directory to the system path
+scripts_dir_path = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(scripts_dir_path.resolve()))
+
+import certoraBatchRun as Batch
+from Shared import certoraUtils as Util
+from Shared.proverCommon import CertoraFoundViolations
+
+
+class TestCertoraBatchRun(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.orig_cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+        self.calls: List[Tuple[str, Path, int]] = []
+        self.project_files: List[Path] = []
+
+    def tearDown(self) -> None:
+        os.chdir(self.orig_cwd)
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def write_conf(name: str, solc: str) -> str:
+        Path(name).write_text(json.dumps({"files": ["A.sol"], "verify": "A:A.spec", "solc": solc}))
+        return name
+
+    def fake_run_certora(self, args: List[str], app: Any) -> None:
+        """
+        Records the run, and leaves a handler on the root logger behind like a run whose LoggingManager was not torn down
+        """
+        conf = args[0]
+        self.calls.append((conf, Util.CERTORA_INTERNAL_ROOT, len(logging.root.handlers)))
+        self.project_files.append(Util.get_recent_jobs_log_file())
+        logging.root.addHandler(logging.NullHandler())
+        if conf.startswith("violated"):
+            raise CertoraFoundViolations("violations found")
+        if conf.startswith("broken"):
+            raise Exception("build failed")
+        raise Util.TestResultsReady(None)
+
+    def run_batch(self, confs: List[str], jobs: int = 1) -> List[Batch.BatchConfResult]:
+        with mock.patch.object(Batch, "run_certora", self.fake_run_certora):
+            return Batch.run_certora_batch(confs, ["--test", "check_args"], jobs=jobs)
+
+    def test_small_batch(self) -> None:
+        confs = [self.write_conf("a.conf", "solc8.0"), self.write_conf("b.conf", "solc8.1"),
+                 self.write_conf("violated.conf", "solc8.0"), self.write_conf("broken.conf", "solc8.1")]
+        handlers_before = list(logging.root.handlers)
+
+        results = self.run_batch(confs)
+
+        self.assertEqual([r.conf for r in results], confs)
+        self.assertEqual([r.group for r in results], [0, 1, 0, 1])
+        self.assertEqual([r.status for r in results],
+                         [Batch.STATUS_SUCCESS, Batch.STATUS_SUCCESS, Batch.STATUS_VIOLATIONS, Batch.STATUS_FAILED])
+        self.assertEqual(results[3].error, "build failed")
+
+        # every run starts with the root handlers of the batch, and they are restored at the end
+        self.assertEqual({handlers for _, _, handlers in self.calls}, {len(handlers_before)})
+        self.assertEqual(logging.root.handlers, handlers_before)
+
+        # the confs of a group share an internal directory, different groups do not
+        internal_dirs = {conf: internal_dir for conf, internal_dir, _ in self.calls}
+        self.assertEqual(internal_dirs["a.conf"], internal_dirs["violated.conf"])
+        self.assertEqual(internal_dirs["b.conf"], internal_dirs["broken.conf"])
+        self.assertNotEqual(internal_dirs["a.conf"], internal_dirs["b.conf"])
+        for internal_dir in internal_dirs.values():
+            self.assertEqual(internal_dir.parent, Util.CERTORA_INTERNAL_ROOT / Batch.BATCH_GROUPS_DIR)
+            self.assertTrue(internal_dir.is_dir())
+        self.assertEqual(Util.CERTORA_INTERNAL_ROOT, Path(".certora_internal"))
+
+        # the files of the whole project are not moved to the internal directory of a group
+        self.assertEqual(set(self.project_files), {Path(".certora_internal") / Util.RECENT_JOBS_LOG_FILE})
+
+    def test_group_internal_dir_is_stable(self) -> None:
+        conf = self.write_conf("a.conf", "solc8.0")
+        self.run_batch([conf])
+        self.run_batch([conf])
+        self.assertEqual(self.calls[0][1], self.calls[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest import mock
+
+# Add the path to the scripts directory to the system path
+scripts_dir_path = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(scripts_dir_path.resolve()))
+
+from concordance import solc
+from concordance.cache import result_cache
+from concordance.tools import equiv_check
+
+HARNESS = "contract Original { function f() external {} }"
+REWRITE = "contract Rewrite { function f() external {} }"
+
+
+class FakeProver:
+    """
+    A stand-in for certoraRun: writes the given rule result to the --tool_output file and trace to the trace file
+    """
+
+    def __init__(self, rule_value: str, trace: str = "") -> None:
+        self.rule_value = rule_value
+        self.trace = trace
+        self.calls = 0
+
+    def __call__(self, command: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+        self.calls += 1
+        prover_args = command[command.index('--prover_args') + 1].split()
+        Path(prover_args[prover_args.index('-equivTraceFile') + 1]).write_text(self.trace)
+        result: Dict[str, Any] = {"rules": {"equivalence": self.rule_value}}
+        Path(command[command.index('--tool_output') + 1]).write_text(json.dumps(result))
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+
+class TestConcordanceCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.orig_cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+        result_cache.clear()
+
+    def tearDown(self) -> None:
+        result_cache.clear()
+        os.chdir(self.orig_cwd)
+        self.tmp_dir.cleanup()
+
+    def check(self, prover: FakeProver) -> str:
+        state = {"original_harness": HARNESS, "curr_rewrite": REWRITE}
+        with mock.patch.object(equiv_check.subprocess, "run", prover):
+            return equiv_check.equivalence_check.func(original_harness_name="Original", rewrite_harness_name="Rewrite",
+                                                      abi_signature="f()", loop_bound=2, compiler_version="8.29",
+                                                      state=state)
+
+    def test_compile_is_cached(self) -> None:
+        completed = subprocess.CompletedProcess([], 0, '{"errors": []}', "")
+        with mock.patch.object(solc.subprocess, "run", return_value=completed) as run:
+            first = solc.solidity_compiler_impl(HARNESS, "8.29")
+            self.assertEqual(solc.solidity_compiler_impl(HARNESS, "8.29"), first)
+            solc.solidity_compiler_impl(REWRITE, "8.29")
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 2))
+
+    def test_equivalent_is_cached(self) -> None:
+        prover = FakeProver("SUCCESS")
+        self.assertEqual(self.check(prover), "Equivalent")
+        self.assertEqual(self.check(prover), "Equivalent")
+        self.assertEqual(prover.calls, 1)
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 1))
+
+    def test_violation_is_cached(self) -> None:
+        prover = FakeProver("FAIL", "f() returns 1 in Original and 2 in Rewrite")
+        self.assertEqual(self.check(prover), prover.trace)
+        self.assertEqual(self.check(prover), prover.trace)
+        self.assertEqual(prover.calls, 1)
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 1))
+
+    def test_timeout_is_not_cached(self) -> None:
+        prover = FakeProver("TIMEOUT")
+        self.check(prover)
+        self.check(prover)
+        self.assertEqual(prover.calls, 2)
+        self.assertEqual((result_cache.hits, result_cache.misses), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+import unittest
+from pathlib import Path
+
+# Add the path to the scripts directory to the system path
+scripts_dir_path = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(scripts_dir_path.resolve()))
+
+import generateMutant as Gm
+
+
+class TestDiffHeaderPath(unittest.TestCase):
+
+    def test_plain_paths(self) -> None:
+        self.assertEqual(Gm.get_diff_header_path('diff --git a/src/A.sol b/src/A.sol'), 'src/A.sol')
+        self.assertEqual(Gm.get_diff_header_path('diff --git a/src/a b.sol b/src/a b.sol'), 'src/a b.sol')
+
+    def test_quoted_paths(self) -> None:
+        self.assertEqual(Gm.get_diff_header_path(r'diff --git "a/src/caf\303\251.sol" "b/src/caf\303\251.sol"'),
+                         'src/café.sol')
+        self.assertEqual(Gm.get_diff_header_path(r'diff --git "a/src/t\tq\"b\\.sol" "b/src/t\tq\"b\\.sol"'),
+                         'src/t\tq"b\\.sol')
+
+    def test_malformed_quoted_paths(self) -> None:
+        self.assertIsNone(Gm.get_diff_header_path(r'diff --git "a/src/A.sol'))
+        self.assertIsNone(Gm.get_diff_header_path(r'diff --git "a/src/A.sol" "b/src/A.sol" x'))
+        self.assertIsNone(Gm.get_diff_header_path(r'diff --git "a/src/\q.sol" "b/src/\q.sol"'))
+
+    def test_split_diff(self) -> None:
+        diff = ('diff --git a/A.sol b/A.sol\n--- a/A.sol\n+++ b/A.sol\n'
+                'diff --git "a/\\303\\251.sol" "b/\\303\\251.sol"\n--- "a/\\303\\251.sol"\n')
+        diffs = Gm.split_diff(diff, Path('/repo'))
+        self.assertEqual(sorted(diffs), [Path('/repo/A.sol'), Path('/repo/é.sol')])
+        self.assertTrue(diffs[Path('/repo/é.sol')].startswith('diff --git "a/\\303'))
+
+
+if __name__ == '__main__':
+    unittest.main()
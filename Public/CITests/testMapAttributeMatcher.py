@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+import unittest
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+# Add the path to the scripts directory to the system path
+scripts_dir_path = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(scripts_dir_path.resolve()))
+
+import CertoraProver.certoraContextAttributes  # noqa: F401 (resolves the import cycle of certoraContext)
+import CertoraProver.certoraContext as Ctx
+
+
+def make_context(**attrs: Any) -> Any:
+    context = SimpleNamespace(compiler=None, contract_to_file={"A": "src/A.sol", "B": "src/B.sol"})
+    for name, value in attrs.items():
+        setattr(context, name, value)
+    return context
+
+
+class TestMapAttributeMatcher(unittest.TestCase):
+
+    def test_contract_and_file_patterns(self) -> None:
+        context = make_context(compiler_map=OrderedDict([("A", "solc8.1"), ("lib/**/*.sol", "solc8.2"),
+                                                         ("*", "solc8.0")]))
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/A.sol"), "compiler"), "solc8.1")
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("lib/x/L.sol"), "compiler"), "solc8.2")
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/B.sol"), "compiler"), "solc8.0")
+
+    def test_map_updated_in_place(self) -> None:
+        compiler_map = OrderedDict([("A", "solc8.1")])
+        context = make_context(compiler_map=compiler_map)
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/A.sol"), "compiler"), "solc8.1")
+        with self.assertRaises(RuntimeError):
+            Ctx.get_map_attribute_value(context, Path("src/Harness.sol"), "compiler")
+
+        # like the storage extension harnesses, that are added to compiler_map during the build
+        compiler_map["src/Harness.sol"] = "solc8.2"
+        compiler_map.move_to_end("src/Harness.sol", last=False)
+        Ctx.invalidate_map_attribute_matcher("compiler")
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/Harness.sol"), "compiler"), "solc8.2")
+
+        # an entry that is moved before the others takes precedence
+        compiler_map["src/A.sol"] = "solc8.3"
+        compiler_map.move_to_end("src/A.sol", last=False)
+        Ctx.invalidate_map_attribute_matcher("compiler")
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/A.sol"), "compiler"), "solc8.3")
+
+    def test_contract_to_file_updated_in_place(self) -> None:
+        context = make_context(compiler_map={"C": "solc8.4"})
+        with self.assertRaises(RuntimeError):
+            Ctx.get_map_attribute_value(context, Path("src/C.sol"), "compiler")
+        context.contract_to_file["C"] = "src/C.sol"
+        Ctx.invalidate_map_attribute_matcher("compiler")
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/C.sol"), "compiler"), "solc8.4")
+
+    def test_matcher_is_reused(self) -> None:
+        context = make_context(compiler_map={"*": "solc8.0"})
+        matcher = Ctx.get_map_attribute_matcher(context, "compiler")
+        self.assertIs(Ctx.get_map_attribute_matcher(context, "compiler"), matcher)
+        self.assertIsNot(Ctx.get_map_attribute_matcher(make_context(compiler_map={"*": "solc8.1"}), "compiler"),
+                         matcher)
+
+    def test_matcher_is_not_recompiled_per_lookup(self) -> None:
+        compiler_map = {"src/A.sol": "solc8.0", "*": "solc8.0"}
+        context = make_context(compiler_map=compiler_map)
+        matcher = Ctx.get_map_attribute_matcher(context, "compiler")
+        compiler_map["src/A.sol"] = "solc8.1"
+        # an in-place change is only seen after the matcher is invalidated
+        self.assertIs(Ctx.get_map_attribute_matcher(context, "compiler"), matcher)
+        Ctx.invalidate_map_attribute_matcher("compiler")
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/A.sol"), "compiler"), "solc8.1")
+
+    def test_single_value_takes_precedence(self) -> None:
+        context = make_context(compiler="solc8.9", compiler_map={"*": "solc8.0"})
+        self.assertEqual(Ctx.get_map_attribute_value(context, Path("src/A.sol"), "compiler"), "solc8.9")
+
+
+if __name__ == '__main__':
+    unittest.main()
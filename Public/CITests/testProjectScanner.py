@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+# Add the path to the scripts directory to the system path
+scripts_dir_path = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(scripts_dir_path.resolve()))
+
+from CertoraProver import certoraProjectScanner as Scanner
+
+# A stand-in for `solc --standard-json` with 'stopAfter': 'parsing'. Every 'contract X' becomes a deployable
+# contract. A source that contains BREAK_SOLC fails the whole run with an error that is not attributed to a file
+FAKE_SOLC = f'''#!{sys.executable}
+import json, re, sys
+if '--version' in sys.argv:
+    print('fake solc, Version: 0.8.30')
+    sys.exit(0)
+with open(__file__ + '.calls', 'a') as calls:
+    calls.write('call\\n')
+solc_input = json.load(sys.stdin)
+if any('BREAK_SOLC' in source['content'] for source in solc_input['sources'].values()):
+    print(json.dumps({{'errors': [{{'severity': 'error', 'formattedMessage': 'internal compiler error'}}]}}))
+    sys.exit(0)
+sources = {{}}
+for name, source in solc_input['sources'].items():
+    nodes = [{{'nodeType': 'ContractDefinition', 'name': contract, 'contractKind': 'contract', 'nodes': []}}
+             for contract in re.findall(r'contract (\\w+)', source['content'])]
+    sources[name] = {{'ast': {{'nodes': nodes}}}}
+print(json.dumps({{'sources': sources}}))
+'''
+
+
+class TestProjectScanner(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = Path(self.tmp_dir.name)
+        self.project = tmp_path / "project"
+        self.project.mkdir()
+        self.bin_dir = tmp_path / "bin"
+        self.bin_dir.mkdir()
+        self.solc = self.bin_dir / "solc"
+        self.solc.write_text(FAKE_SOLC)
+        self.solc.chmod(0o755)
+        self.env = mock.patch.dict(os.environ, {"PATH": f"{self.bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.tmp_dir.cleanup()
+
+    def write_sources(self, sources: Dict[str, str]) -> None:
+        for name, content in sources.items():
+            (self.project / name).write_text(content)
+
+    def scan(self) -> Dict[str, List[str]]:
+        return {str(result.file_path): result.contracts for result in Scanner.scan_project(str(self.project))}
+
+    def cached_files(self) -> Dict[str, List[str]]:
+        with (Scanner.get_scan_cache_file(self.project)).open() as cache_handle:
+            return json.load(cache_handle)['files']
+
+    def solc_calls(self) -> int:
+        calls_file = Path(f"{self.solc}.calls")
+        return len(calls_file.read_text().splitlines()) if calls_file.exists() else 0
+
+    def test_bad_file_does_not_hide_its_batch(self) -> None:
+        self.write_sources({f"C{i}.sol": f"contract C{i} {{}}" for i in range(6)})
+        self.write_sources({"Bad.sol": "contract Bad {} // BREAK_SOLC"})
+
+        self.assertEqual(self.scan(), {f"C{i}.sol": [f"C{i}"] for i in range(6)})
+        # the failed file is not cached, every other file is
+        self.assertEqual(len(self.cached_files()), 6)
+        self.assertNotIn(Scanner.hash_file(self.project / "Bad.sol"), self.cached_files())
+
+        # a rescan parses only the file that failed
+        calls = self.solc_calls()
+        self.write_sources({"Bad.sol": "contract Bad {}"})
+        self.assertEqual(self.scan()["Bad.sol"], ["Bad"])
+        self.assertEqual(self.solc_calls(), calls + 1)
+        self.assertEqual(len(self.cached_files()), 7)
+
+    def test_failed_batch_is_bisected(self) -> None:
+        sol_files = [Path(f"C{i}.sol") for i in range(8)]
+        self.write_sources({str(sol_file): f"contract {sol_file.stem} {{}}" for sol_file in sol_files})
+        self.write_sources({"C5.sol": "contract C5 {} // BREAK_SOLC"})
+
+        self.assertIsNone(Scanner.parse_deployable_contracts(sol_files, self.project))
+        results = Scanner.process_batch(self.project, sol_files)
+        self.assertEqual([r.file_path for r in results], sol_files)
+        self.assertEqual([r.parsed for r in results], [i != 5 for i in range(8)])
+        self.assertEqual([r.contracts for r in results], [[f"C{i}"] if i != 5 else [] for i in range(8)])
+
+    def test_missing_solc_is_not_cached(self) -> None:
+        self.write_sources({"A.sol": "contract A {}"})
+        self.solc.unlink()
+        with mock.patch.dict(os.environ, {"PATH": str(self.bin_dir)}):  # hide any solc installed on the machine
+            self.assertEqual(self.scan(), {})
+        self.assertFalse((Scanner.get_scan_cache_file(self.project)).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
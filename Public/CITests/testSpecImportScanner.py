@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+import unittest
+from pathlib import Path
+from typing import List, Tuple
+
+# Add the path to the scripts directory to the system path
+scripts_dir_path = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(scripts_dir_path.resolve()))
+
+from CertoraProver.certoraMiniSpecParser import SpecImportScanner
+
+SPEC = Path("s.spec")
+
+
+def scan(spec_content: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    scanner = SpecImportScanner(SPEC, spec_content)
+    imports = scanner.scan()
+    return imports, scanner.parse_error_msgs
+
+
+def scan_paths(spec_content: str) -> List[str]:
+    imports, errors = scan(spec_content)
+    assert not errors, f"unexpected parse errors: {errors}"
+    return [path for path, _ in imports]
+
+
+class TestSpecImportScanner(unittest.TestCase):
+
+    def test_imports_with_locations(self) -> None:
+        imports, errors = scan('import "a.spec";\nimport "dir/b.spec";\n')
+        self.assertEqual(imports, [("a.spec", "1:1"), ("dir/b.spec", "2:2")])
+        self.assertEqual(errors, [])
+
+    def test_no_imports(self) -> None:
+        self.assertEqual(scan(''), ([], []))
+        self.assertEqual(scan('rule r { assert true; }'), ([], []))
+
+    def test_imports_and_uses_keep_their_order(self) -> None:
+        spec = ('import "a.spec";\n'
+                'use rule r from "ignored";\n'
+                'import "b.spec";\n'
+                'use invariant inv;\n'
+                'use builtin rule sanity;\n'
+                'import "c.spec";\n')
+        self.assertEqual(scan_paths(spec), ["a.spec", "b.spec", "c.spec"])
+
+    def test_imports_in_comments_are_ignored(self) -> None:
+        spec = ('// import "line.spec";\n'
+                '/* import "block.spec";\n'
+                '   import "multi_line.spec"; */\n'
+                'import "real.spec"; // import "trailing.spec";\n')
+        self.assertEqual(scan_paths(spec), ["real.spec"])
+
+    def test_comments_between_keyword_and_path(self) -> None:
+        self.assertEqual(scan_paths('import /* c */ // d\n "a.spec";'), ["a.spec"])
+
+    def test_imports_in_strings_are_ignored(self) -> None:
+        self.assertEqual(scan_paths('string s = "import";'), [])
+        self.assertEqual(scan_paths('"x import "'), [])
+        # comment markers inside a string literal do not start a comment
+        self.assertEqual(scan_paths('s = "// not a comment"; import "a.spec";'), ["a.spec"])
+        self.assertEqual(scan_paths('s = "/*"; import "a.spec"; t = "*/";'), ["a.spec"])
+
+    def test_import_is_a_keyword(self) -> None:
+        self.assertEqual(scan_paths('imports "a.spec"; reimport "b.spec"; import_x "c.spec";'), [])
+
+    def test_empty_path(self) -> None:
+        self.assertEqual(scan_paths('import "";'), [""])
+
+    def test_malformed_import(self) -> None:
+        imports, errors = scan('import foo;\nimport "a.spec";')
+        self.assertEqual(imports, [("a.spec", "2:2")])
+        self.assertEqual(errors, ["s.spec:1:8: Did not expect the symbol 'f'"])
+
+    def test_import_followed_by_import(self) -> None:
+        imports, errors = scan('import import "a.spec";')
+        self.assertEqual(imports, [("a.spec", "1:8")])
+        self.assertEqual(errors, ["s.spec:1:8: Did not expect the symbol 'import'"])
+
+    def test_import_in_block(self) -> None:
+        imports, errors = scan('methods { import }')
+        self.assertEqual(imports, [])
+        self.assertEqual(errors, ["s.spec:1:18: Did not expect the symbol '}'"])
+
+    def test_import_at_end_of_file(self) -> None:
+        expected_error = "s.spec:1:1: Expected a string literal after 'import', reached the end of the file"
+        self.assertEqual(scan('import'), ([], [expected_error]))
+        self.assertEqual(scan('import  \n'), ([], [expected_error]))
+        self.assertEqual(scan('import // comment'), ([], [expected_error]))
+
+    def test_unterminated_string_or_comment_at_end_of_file(self) -> None:
+        self.assertEqual(scan('import "a.spec'), ([], ["s.spec:1:8: Did not expect the symbol '\"'"]))
+        self.assertEqual(scan('import /* a.spec'), ([], ["s.spec:1:8: Did not expect the symbol '/'"]))
+        # an unterminated block comment is a syntax error, so the imports in it may be over-approximated
+        self.assertEqual(scan_paths('/* import "a.spec";\nimport "b.spec";'), ["a.spec", "b.spec"])
+
+
+if __name__ == '__main__':
+    unittest.main()
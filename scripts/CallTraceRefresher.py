@@ -13,39 +13,142 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+"""
+Refreshes the expected outputs of the callTrace unit tests.
+
+Every conf is run in its own working directory under .certora_internal/call_trace_refresher, which holds a copy of
+the conf's test directory, so confs can run in parallel without touching each other's files or the process-wide
+working directory. The status of every conf is recorded in a manifest, and a conf that was refreshed successfully is
+skipped as long as its test directory and the Prover jar did not change since.
+"""
+
 import argparse
-from pathlib import Path
+import hashlib
+import json
 import os
 import shutil
-from glob import glob
-from concurrent.futures import ProcessPoolExecutor
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from tabulate import tabulate
+
+CALL_TRACE_TESTS_DIR = Path("src/test/resources/solver/CallTraceTests")
+REFRESHER_DIR = Path(".certora_internal") / "call_trace_refresher"
+MANIFEST_FILE = REFRESHER_DIR / "manifest.json"
+IGNORE_FILE = "CallTraceRefresherIgnore"
+CERTORA_RUN_SCRIPT = Path(__file__).parent.resolve() / "certoraRun.py"
+DEFAULT_JOBS = 4
+LOG_TAIL_LINES = 20
 
+STATUS_SUCCESS = "SUCCESS"
+STATUS_FAILED = "FAILED"
+STATUS_SKIPPED = "SKIPPED"
+STATUS_IGNORED = "IGNORED"
 
-def remove_old_dirs(conf_path: Path) -> None:
+
+@dataclass
+class RefreshResult:
+    conf: str
+    status: str
+    inputs_hash: str
+    run_time: float = 0.0  # seconds
+    rules: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def is_run_artifact(path: Path) -> bool:
     """
-    Remove old directories like .certora_internal and emv* based on the provided conf_path.
+    @return True if path is (or is inside) a directory created by a certoraRun run
+    """
+    return any(part == ".certora_internal" or part.startswith("emv-") for part in path.parts)
 
-    Args:
-        conf_path (Path): The path to the configuration file.
+
+def ignore_run_artifacts(_directory: str, names: List[str]) -> List[str]:
+    return [name for name in names if name == ".certora_internal" or name.startswith("emv-")]
+
+
+def get_prover_key() -> str:
     """
-    certora_internal_path = conf_path.parent / ".certora_internal"
-    if certora_internal_path.exists() and certora_internal_path.is_dir():
-        shutil.rmtree(certora_internal_path)
-    emv_directories = glob(str(conf_path.parent / "emv*"))
-    for emv_dir in emv_directories:
-        if os.path.isdir(emv_dir):
-            shutil.rmtree(emv_dir)
+    @return a key that changes whenever the Prover jar used by certoraRun changes
+    """
+    jar = Path(os.getenv("CERTORA", os.getcwd())) / "emv.jar"
+    try:
+        stat = jar.stat()
+    except OSError:
+        return "no-jar"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
 
 
-def certora_run(conf_path: Path) -> None:
+def get_inputs_hash(conf_path: Path, prover_key: str, output_dirs: Set[str]) -> str:
     """
-    Run Certora with the provided configuration file and save verifier results.
+    Hashes the files of the conf's test directory together with the Prover key.
 
     Args:
         conf_path (Path): The path to the configuration file.
+        prover_key (str): The key of the Prover jar, see get_prover_key.
+        output_dirs (Set[str]): The rule directories that earlier refreshes copied to the test directory, which are
+                                outputs and are not hashed.
+    """
+    digest = hashlib.sha256(prover_key.encode())
+    test_dir = conf_path.parent
+    for file in sorted(test_dir.rglob("*")):
+        relative_path = file.relative_to(test_dir)
+        if not file.is_file() or is_run_artifact(relative_path) or relative_path.parts[0] in output_dirs:
+            continue
+        digest.update(relative_path.as_posix().encode())
+        digest.update(hashlib.sha256(file.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def get_output_dirs(manifest: Dict[str, Dict[str, Any]], test_dir: Path) -> Set[str]:
+    """
+    @return the rule directories that were copied to test_dir by the refreshes recorded in the manifest
+    """
+    return {rule for conf_key, entry in manifest.items() if Path(conf_key).resolve().parent == test_dir
+            for rule in entry.get("rules", [])}
+
+
+def read_manifest() -> Dict[str, Dict[str, Any]]:
+    try:
+        with MANIFEST_FILE.open() as manifest_handle:
+            manifest = json.load(manifest_handle)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest: Dict[str, Dict[str, Any]]) -> None:
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = MANIFEST_FILE.with_suffix(".tmp")
+    with tmp_file.open("w") as manifest_handle:
+        json.dump(manifest, manifest_handle, indent=4, sort_keys=True)
+    tmp_file.replace(MANIFEST_FILE)
+
+
+def get_conf_key(conf_path: Path) -> str:
+    """
+    @return the path of the conf relative to the current directory if possible, used as its key in the manifest
     """
-    cmd = f"certoraRun.py {conf_path.name} --save_verifier_results"
-    os.system(cmd)
+    try:
+        return conf_path.relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return conf_path.as_posix()
+
+
+def get_workdir(conf_key: str) -> Path:
+    return REFRESHER_DIR / "work" / conf_key.replace("/", "__")
+
+
+def log_tail(log_file: Path) -> str:
+    try:
+        return "\n".join(log_file.read_text(errors="replace").splitlines()[-LOG_TAIL_LINES:])
+    except OSError:
+        return ""
 
 
 conversion = {
@@ -60,80 +163,148 @@ conversion = {
     "bytes32": "B32"
 }
 
-def copy_files(conf_path: Path) -> None:
+
+def copy_files(conf_path: Path, workdir: Path) -> List[str]:
     """
-    Copy verifierResults content to the parent directory and expected rule output JSON files.
+    Copy the verifierResults content of the run in workdir to the conf's test directory.
 
     Args:
         conf_path (Path): The path to the configuration file.
+        workdir (Path): The working directory the conf was run in.
+
+    Returns:
+        The names of the rule directories that were copied.
     """
-    # Copy verifierResults content
-    verifier_results_paths = list(conf_path.parent.rglob("verifierResults"))
+    verifier_results_paths = list(workdir.rglob("verifierResults"))
     if not verifier_results_paths:
         raise ValueError(f"no violations were found for {conf_path.parent}\n"
                          "call trace test infra expects violated rules, and so no verifierResults were created.")
     verifier_results_dir = verifier_results_paths[0]
     rules = []
     for item in verifier_results_dir.iterdir():
-        # Copy each item to the parent directory and save rule name that has call trace
+        # Copy each item to the test directory and save rule name that has call trace
         rules.append(item.name)
         shutil.copytree(item, conf_path.parent / item.name, dirs_exist_ok=True)
+    return sorted(rules)
 
 
-def refresh_single(conf_path: Path) -> None:
+def refresh_single(conf_path: Path, conf_key: str, inputs_hash: str) -> RefreshResult:
     """
     Refresh the prerequisites for the callTrace unit test for a single configuration file.
+    The conf is run in a fresh copy of its test directory, which is removed if the refresh succeeded and kept
+    (with the certoraRun log in refresh.log) otherwise.
 
     Args:
-        conf_path (Path): The path to the configuration file.
+        conf_path (Path): The absolute path to the configuration file.
+        conf_key (str): The key of the conf in the manifest.
+        inputs_hash (str): The hash of the conf's inputs, recorded in the result.
     """
-    if ".certora_internal" in conf_path.as_posix() or "emv-" in conf_path.as_posix():
-        return
-    print(f"Working on {conf_path}")
-    current_path = os.getcwd()
-    os.chdir(conf_path.parent)
+    start = time.perf_counter()
+    workdir = get_workdir(conf_key).resolve()
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    shutil.copytree(conf_path.parent, workdir, ignore=ignore_run_artifacts)
+    log_file = workdir / "refresh.log"
+
+    try:
+        with log_file.open("w") as log_handle:
+            subprocess.run([sys.executable, str(CERTORA_RUN_SCRIPT), conf_path.name, "--save_verifier_results"],
+                           cwd=workdir, stdout=log_handle, stderr=subprocess.STDOUT, check=False)
+        rules = copy_files(conf_path, workdir)
+    except Exception as e:
+        error = f"{e}\n{log_tail(log_file)}\n(full log in {log_file})"
+        return RefreshResult(conf_key, STATUS_FAILED, inputs_hash, round(time.perf_counter() - start, 2),
+                             error=error)
 
-    if (conf_path.parent / "CallTraceRefresherIgnore").is_file():
-        print("file 'CallTraceRefresherIgnore' present, skipping directory")
-        return
+    shutil.rmtree(workdir, ignore_errors=True)
+    return RefreshResult(conf_key, STATUS_SUCCESS, inputs_hash, round(time.perf_counter() - start, 2), rules)
 
-    remove_old_dirs(conf_path)
 
-    certora_run(conf_path)
+def refresh_all(conf_paths: List[Path], jobs: int, force: bool) -> List[RefreshResult]:
+    """
+    Refreshes the given confs, at most [jobs] at a time. Confs that were refreshed successfully with the same inputs
+    are skipped unless [force] is set. The manifest is updated as soon as every conf is done, so an interrupted
+    refresh can be resumed by running it again.
+    """
+    manifest = read_manifest()
+    prover_key = get_prover_key()
+    results: List[RefreshResult] = []
+    to_run = []
+    for conf_path in conf_paths:
+        conf_key = get_conf_key(conf_path)
+        if (conf_path.parent / IGNORE_FILE).is_file():
+            results.append(RefreshResult(conf_key, STATUS_IGNORED, ""))
+            continue
+        inputs_hash = get_inputs_hash(conf_path, prover_key, get_output_dirs(manifest, conf_path.parent))
+        entry = manifest.get(conf_key, {})
+        if not force and entry.get("status") == STATUS_SUCCESS and entry.get("inputs_hash") == inputs_hash:
+            results.append(RefreshResult(conf_key, STATUS_SKIPPED, inputs_hash, rules=entry.get("rules", [])))
+            continue
+        to_run.append((conf_path, conf_key, inputs_hash))
+
+    # confs in the same test directory write to the same rule directories, so those are run one after the other
+    by_test_dir: Dict[Path, List[Any]] = {}
+    for run in to_run:
+        by_test_dir.setdefault(run[0].parent, []).append(run)
 
-    copy_files(conf_path)
+    def refresh_test_dir(runs: List[Any]) -> List[RefreshResult]:
+        return [refresh_single(*run) for run in runs]
 
-    remove_old_dirs(conf_path)
+    conf_paths_by_key = {run[1]: run[0] for run in to_run}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [executor.submit(refresh_test_dir, runs) for runs in by_test_dir.values()]
+        for future in as_completed(futures):
+            test_dir_results = future.result()
+            for result in test_dir_results:
+                print(f"{result.status}: {result.conf} ({result.run_time}s)")
+                manifest[result.conf] = asdict(result)
+            # the refreshes may have produced new rule directories, which must not be part of the inputs hash
+            for result in test_dir_results:
+                if result.status == STATUS_SUCCESS:
+                    conf_path = conf_paths_by_key[result.conf]
+                    result.inputs_hash = get_inputs_hash(conf_path, prover_key,
+                                                         get_output_dirs(manifest, conf_path.parent))
+                    manifest[result.conf] = asdict(result)
+            write_manifest(manifest)
+            results.extend(test_dir_results)
 
-    os.chdir(current_path)
+    order = {get_conf_key(conf_path): i for i, conf_path in enumerate(conf_paths)}
+    return sorted(results, key=lambda r: order[r.conf])
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="""Refresh the prerequisites for the callTrace unit test.
                                       Use only when you are sure you need it!""")
-    parser.add_argument("conf_file_path", nargs='?', help="""Relative path to the conf file
+    parser.add_argument("conf_file_path", nargs='*', help="""Relative paths to conf files
                          for example: src/test/resources/solver/CallTraceTests/../example.conf,
                          if no corresponding command-line argument is present, refresh all of the CallTrace tests""")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"maximal number of confs that are run in parallel (default {DEFAULT_JOBS})")
+    parser.add_argument("--force", action="store_true",
+                        help="refresh confs even if their inputs did not change since their last successful refresh")
     args = parser.parse_args()
 
-    conf_file_path = Path(args.conf_file_path) if args.conf_file_path else None
+    if args.conf_file_path:
+        conf_paths = [Path(conf).resolve() for conf in args.conf_file_path]
+    else:
+        # Find all .conf files under "src/test/resources/solver/CallTraceTests"
+        tests_dir = CALL_TRACE_TESTS_DIR.resolve()
+        conf_paths = sorted(p for p in tests_dir.rglob("*.conf") if not is_run_artifact(p.relative_to(tests_dir)))
 
     try:
-        if conf_file_path:
-            abs_path = conf_file_path.resolve()
-            print("Configuration file path:", abs_path)
-            refresh_single(abs_path)
-        else:
-            # Find all .conf files under "src/test/resources/solver/CallTraceTests"
-            conf_files_path = list(Path("src/test/resources/solver/CallTraceTests").resolve().rglob("*.conf"))
-            with ProcessPoolExecutor() as executor:
-                # Refresh all configurations in parallel using ProcessPoolExecutor
-                executor.map(refresh_single, conf_files_path)
-
+        results = refresh_all(conf_paths, args.jobs, args.force)
     except Exception as e:
         print(f"Failed to refresh files \n {e}")
         exit(1)
 
+    print(tabulate([[r.conf, r.status, r.run_time, ", ".join(r.rules)] for r in results],
+                   headers=["Conf", "Status", "Time (s)", "Rules"]))
+    failed = [r for r in results if r.status == STATUS_FAILED]
+    for result in failed:
+        print(f"\nFailed to refresh {result.conf}:\n{result.error}")
+    if failed:
+        exit(1)
+
     print("Success to refresh files")
     exit(0)
 
@@ -14,11 +14,12 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+import shutil
 
 from Shared import certoraUtils as Util
 from pathlib import Path
 from functools import lru_cache
-from typing import Set, Callable
+from typing import Set, Callable, Dict, Tuple
 import re
 import logging
 from CertoraProver.Compiler.CompilerCollector import CompilerLang, CompilerCollector
@@ -32,6 +33,10 @@ import CertoraProver.certoraContext as Ctx
 # logger for running the Solidity compiler and reporting any errors it emits
 compiler_logger = logging.getLogger("compiler")
 
+# Process-wide memo of `<compiler> --version` probes, keyed by the compiler name and the executable it resolves to.
+# Factories are created per build, so a per-instance cache would re-probe every compiler in each run of a batch.
+_compiler_version_cache: Dict[Tuple[str, str], Util.CompilerVersion] = {}
+
 
 def get_relevant_compiler(contract_file_path: Path, context: CertoraContext) -> str:
     """
@@ -125,7 +130,6 @@ class CompilerCollectorFactory:
         version = self.__get_compiler_exe_version(solc_path, self.__version_string_handler_solc)
         return version
 
-    @lru_cache(maxsize=32)
     def __get_compiler_exe_version(self, compiler_name: str,
                                    version_string_handler:
                                    Callable[[str], Util.CompilerVersion]) -> Util.CompilerVersion:
@@ -133,6 +137,10 @@ class CompilerCollectorFactory:
         @param compiler_name: name of the solc we want to run on this contract
         @return: the running compiler version
         """
+        cache_key = (compiler_name, str(shutil.which(compiler_name) or compiler_name))
+        if cache_key in _compiler_version_cache:
+            return _compiler_version_cache[cache_key]
+
         out_name = f"version_check_{Path(compiler_name).name}"
         stdout_path = get_certora_config_dir() / f'{out_name}.stdout'
         stderr_path = get_certora_config_dir() / f'{out_name}.stderr'
@@ -146,7 +154,9 @@ class CompilerCollectorFactory:
 
         with stdout_path.open() as r:
             version_string = r.read(-1)
-        return version_string_handler(version_string)
+        version = version_string_handler(version_string)
+        _compiler_version_cache[cache_key] = version
+        return version
 
     @staticmethod
     def __version_string_handler_vyper(version_string: str) -> Util.CompilerVersion:
@@ -836,17 +836,28 @@ class CompilerLangVy(CompilerLang, metaclass=Singleton):
         return list(set(resolved_result_types)), resolve_vardecl_types(public_vardecls, resolved_result_types)
 
     @staticmethod
-    def collect_storage_layout_info(file_abs_path: str,
-                                    config_path: Path,
-                                    compiler_cmd: str,
-                                    compiler_version: Optional[CompilerVersion],
-                                    data: Dict[str, Any],
-                                    asts : Dict[str, Dict[int, Any]],
-                                    ast_key: str) -> Dict[str, Any]:
-        # only Vyper versions 0.2.16 and up have the storage layout
-        if compiler_version is None or not CompilerCollectorVy.supports_storage_layout(compiler_version):
-            return data
-        storage_layout_output_file_name = f'{get_certora_config_dir()}.storage.layout'
+    def pop_standard_json_storage_layout(data: Dict[str, Any], file_abs_path: str,
+                                         ast_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Removes the "layout" output from the standard-json output [data] and returns it, or None if it was not
+        requested or not returned by the compiler
+        """
+        data_key = file_abs_path if file_abs_path in data.get("contracts", {}) else ast_key
+        for contract_output in data.get("contracts", {}).get(data_key, {}).values():
+            layout = contract_output.pop("layout", None)
+            if layout is not None:
+                return layout
+        return None
+
+    @staticmethod
+    def run_storage_layout_cmd(file_abs_path: str, config_path: Path, compiler_cmd: str) -> Optional[Dict[str, Any]]:
+        """
+        Runs `vyper -f layout` for compiler versions that do not return the layout in the standard-json output.
+        The output files are named after [config_path], which is specific to the compiled SDC, so compilations of
+        different files do not overwrite each other's outputs.
+        @return the storage layout, or None if the compiler did not produce it
+        """
+        storage_layout_output_file_name = f'{config_path}.storage.layout'
         storage_layout_stdout_name = storage_layout_output_file_name + '.stdout'
         storage_layout_stderr_name = storage_layout_output_file_name + '.stderr'
         args = [compiler_cmd, '-f', 'layout', '-o', storage_layout_output_file_name, file_abs_path]
@@ -857,28 +868,48 @@ class CompilerLangVy(CompilerLang, metaclass=Singleton):
                     subprocess.run(args, stdout=stdout, stderr=stderr)
                     # if the file does not exist, bail out
                     if not Path(storage_layout_output_file_name).exists():
-                        ast_logger.warn(f"Could not find storage layout file {storage_layout_output_file_name}, "
-                                        "giving up on storage layout info")
-                        return data
+                        ast_logger.warning(f"Could not find storage layout file {storage_layout_output_file_name}, "
+                                           "giving up on storage layout info")
+                        return None
                     with Path(storage_layout_output_file_name).open('r') as output_file:
-                        storage_layout_dict = json.load(output_file)
-                        # normalize this "declaration object" nonsense.
-                        # https://github.com/vyperlang/vyper/blob/344fd8f36c7f0cf1e34fd06ec30f34f6c487f340/vyper/
-                        # semantics/types/user.py#L555
-                        # and also another piece of nonsense. from 0.2.16 until 0.3.6,
-                        # we didn't have the 'storage_layout' key.
-                        if 'storage_layout' in storage_layout_dict:
-                            storage_layout_dict = storage_layout_dict['storage_layout']
-
-                        for entry in storage_layout_dict.items():
-                            if 'type' in entry[1] and " declaration object" in entry[1]['type']:
-                                entry[1]['type'] = entry[1]['type'].replace(" declaration object", "")
-
+                        return json.load(output_file)
                 except Exception as e:
                     print(f'Error: {e}')
                     print_failed_to_run(compiler_cmd)
                     raise
 
+    @staticmethod
+    def collect_storage_layout_info(file_abs_path: str,
+                                    config_path: Path,
+                                    compiler_cmd: str,
+                                    compiler_version: Optional[CompilerVersion],
+                                    data: Dict[str, Any],
+                                    asts : Dict[str, Dict[int, Any]],
+                                    ast_key: str) -> Dict[str, Any]:
+        # only Vyper versions 0.2.16 and up have the storage layout
+        if compiler_version is None or not CompilerCollectorVy.supports_storage_layout(compiler_version):
+            return data
+
+        # newer versions return the layout from the standard-json invocation itself (see CertoraBuildGenerator.standard_json)
+        layout = CompilerLangVy.pop_standard_json_storage_layout(data, file_abs_path, ast_key)
+        if layout is None:
+            layout = CompilerLangVy.run_storage_layout_cmd(file_abs_path, config_path, compiler_cmd)
+        if layout is None:
+            return data
+        storage_layout_dict: Dict[str, Any] = layout
+
+        # normalize this "declaration object" nonsense.
+        # https://github.com/vyperlang/vyper/blob/344fd8f36c7f0cf1e34fd06ec30f34f6c487f340/vyper/
+        # semantics/types/user.py#L555
+        # and also another piece of nonsense. from 0.2.16 until 0.3.6,
+        # we didn't have the 'storage_layout' key.
+        if 'storage_layout' in storage_layout_dict:
+            storage_layout_dict = storage_layout_dict['storage_layout']
+
+        for entry in storage_layout_dict.items():
+            if 'type' in entry[1] and " declaration object" in entry[1]['type']:
+                entry[1]['type'] = entry[1]['type'].replace(" declaration object", "")
+
         # Depressing how many bugs old Vyper had. Example:
         # vyper 0.3.7: "userBalances": {"type": "HashMap[address, uint256]", "slot": 1}
         # vyper 0.3.0: "userBalances": {"type": "HashMap[address, uint256][address, uint256]",
@@ -1444,6 +1475,13 @@ class CompilerCollectorVy(CompilerCollector):
         return (version[1] > 2 or (
                 version[1] == 2 and version[2] >= 16))
 
+    @staticmethod
+    def supports_storage_layout_output_selection(version: CompilerVersion) -> bool:
+        """
+        Whether the storage layout can be requested in the output selection of the standard-json input
+        """
+        return version >= (0, 4, 0)
+
 
 def first_of(elements: List[Any], options: List[Any], default: Any = None) -> Any:
     """Return the first element of [elements] that is in [options], or [default]"""
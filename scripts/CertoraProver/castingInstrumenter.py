@@ -21,6 +21,7 @@ from CertoraProver.Compiler.CompilerCollectorSol import CompilerCollectorSol
 from CertoraProver.certoraBuildDataClasses import SDC, Instrumentation, Replace
 from CertoraProver.certoraOffsetConverter import OffsetConverter
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profiled
 
 
 @dataclass
@@ -133,6 +134,7 @@ def generate_casting_function(assembly_prefix: str, cast_info: CastInfo, counter
     return function_head + "{\n" + conversion_string + f"return {cast_info.res_type_str}(x);\n" "}\n"
 
 
+@profiled("casting instrumentation")
 def generate_casting_instrumentation(asts: Dict[str, Dict[str, Dict[int, Any]]], contract_file: str, sdc: SDC,
                                      offset_converters: dict[str, OffsetConverter]) \
         -> tuple[Dict[str, Dict[int, Instrumentation]], Dict[str, tuple[str, list[str]]]]:
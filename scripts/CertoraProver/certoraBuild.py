@@ -22,7 +22,8 @@ import shutil
 import sys
 import tempfile
 import typing
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from functools import lru_cache
 from pathlib import Path
@@ -57,10 +58,12 @@ import CertoraProver.certoraContextAttributes as Attrs
 from Shared import certoraValidateFuncs as Vf
 from CertoraProver import certoraContextValidator as Cv
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profile, profiled
 import CertoraProver.certoraContext as Ctx
 from CertoraProver import storageExtension
 from CertoraProver.storageExtension import (
     NameSpacedStorage,
+    NamespaceHarness,
     NewStorageInfo,
 )
 
@@ -77,6 +80,8 @@ FUNCTION = "function"
 NAME = "name"
 MANUAL_MUTANTS = "manual_mutants"
 MUTANTS_LOCATION = "mutants_location"
+SOURCE_COPY_BATCH_THRESHOLD = 64  # source trees with more files than this are copied by several threads
+SOURCE_COPY_THREADS = 8
 
 FunctionSig = Tuple[str, List[str], List[str], str]
 
@@ -468,11 +473,158 @@ def convert_pathname_to_posix(json_dict: Dict[str, Any], entry: str, compiler_co
         json_dict[entry] = json_dict_posix_paths
 
 
+class ImportGraph:
+    """
+    The import and inheritance graph of the ASTs of a single build input file (see CertoraBuildGenerator.asts).
+    Paths are interned to integer ids, and the resolution of paths on the file system, the import closures and the
+    base contracts lists are computed once per build and shared by all their users.
+    The graph is valid only as long as the ASTs it was created from are, see CertoraBuildGenerator.get_import_graph.
+    """
+
+    def __init__(self, contract_ast: Dict[str, Dict[int, Any]]) -> None:
+        # contract file -> node id -> node
+        self.contract_ast = contract_ast
+        self._path_ids: Dict[str, int] = {}
+        self._paths: List[str] = []
+        # path id -> ids of the paths it imports directly
+        self._imports: Dict[int, List[int]] = {}
+        # node id -> the contract file containing it, built on first use
+        self._node_to_contract_file: Optional[Dict[int, str]] = None
+        # (common dir, path id) -> the path relative to the common dir, or None if it could not be resolved
+        self._resolved_paths: Dict[Tuple[Path, int], Optional[str]] = {}
+        self._common_dirs: Dict[Path, Path] = {}
+        self._import_closures: Dict[Tuple[str, Path], List[str]] = {}
+        self._base_contracts: Dict[Tuple[str, int], List[Tuple[str, str, bool]]] = {}
+
+    def intern(self, path: str) -> int:
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = len(self._paths)
+            self._path_ids[path] = path_id
+            self._paths.append(path)
+        return path_id
+
+    def path_of(self, path_id: int) -> str:
+        return self._paths[path_id]
+
+    def direct_imports(self, path_id: int) -> List[int]:
+        """
+        @return the ids of the paths imported by the given path, which must be a key of the ASTs
+        """
+        if path_id not in self._imports:
+            self._imports[path_id] = [self.intern(Util.normalize_double_paths(node["absolutePath"]))
+                                      for node in self.contract_ast[self.path_of(path_id)].values()
+                                      if Nf.is_import(node)]
+        return self._imports[path_id]
+
+    def contract_file_of(self, reference: int) -> Optional[str]:
+        """
+        @return the contract file containing the node with id [reference], or None if there is no such node
+        """
+        if self._node_to_contract_file is None:
+            self._node_to_contract_file = {}
+            for contract_file, nodes in self.contract_ast.items():
+                for node_id in nodes:
+                    self._node_to_contract_file.setdefault(node_id, contract_file)
+        return self._node_to_contract_file.get(reference)
+
+    def common_dir(self, compile_wd: Path) -> Path:
+        if compile_wd not in self._common_dirs:
+            self._common_dirs[compile_wd] = \
+                CertoraBuildGenerator.longest_common_dir_of_imports(compile_wd, self.contract_ast)
+        return self._common_dirs[compile_wd]
+
+    def resolve(self, path_id: int, common_dir: Path) -> Optional[str]:
+        """
+        @return the path of [path_id] relative to [common_dir], or None if it cannot be found there
+        """
+        key = (common_dir, path_id)
+        if key not in self._resolved_paths:
+            self._resolved_paths[key] = Util.find_filename_in(common_dir, self.path_of(path_id))
+        return self._resolved_paths[key]
+
+    def imported_files(self, contract_file: str, compile_wd: Path) -> List[str]:
+        """
+        See CertoraBuildGenerator.retrieve_imported_files
+        """
+        key = (contract_file, compile_wd)
+        if key in self._import_closures:
+            return list(self._import_closures[key])
+
+        imported_files = []
+        # paths are considered the same if they resolve to the same relative path from the common dir
+        seen: Set[str] = set()
+        common_dir = self.common_dir(compile_wd)
+
+        worklist = [self.intern(contract_file)]
+        while worklist:
+            curr_id = worklist.pop()
+            curr = self.path_of(curr_id)
+
+            if curr not in self.contract_ast:
+                if curr == contract_file:
+                    msg = f"Original contract file {contract_file} not found in {self.contract_ast.keys()}"
+                else:
+                    msg = f"Path {curr} should have been accessible from {contract_file}, " \
+                          f"but could not be found in {self.contract_ast.keys()}"
+                fatal_error(build_logger, msg)
+
+            relative_path = self.resolve(curr_id, common_dir)
+            if not relative_path:
+                fatal_error(build_logger, f"Path {curr} could not be resolved in {common_dir}")
+            if relative_path in seen:
+                continue
+            seen.add(relative_path)
+            imported_files.append(curr)
+            worklist.extend(self.direct_imports(curr_id))
+
+        self._import_closures[key] = imported_files
+        return list(imported_files)
+
+    def is_library_def_node(self, contract_file: str, node_ref: int) -> bool:
+        contract_def_node = self.contract_ast[contract_file][node_ref]
+        return contract_def_node.get("contractKind") == "library"
+
+    def base_contracts(self, contract_file: str, contract_name: str,
+                       contract_def_node_ref: int) -> List[Tuple[str, str, bool]]:
+        """
+        See CertoraBuildGenerator.retrieve_base_contracts_list.
+        The base contracts are listed in breadth first order, starting from the contract itself.
+        """
+        key = (contract_file, contract_def_node_ref)
+        if key in self._base_contracts:
+            return list(self._base_contracts[key])
+
+        base_contracts_lst = [(contract_file, contract_name,
+                               self.is_library_def_node(contract_file, contract_def_node_ref))]
+        seen = {(contract_file, contract_name)}
+        queue = deque([(contract_file, contract_def_node_ref)])
+        while queue:
+            curr_contract_file, curr_contract_def_node_ref = queue.popleft()
+            curr_contract_def = self.contract_ast[curr_contract_file][curr_contract_def_node_ref]
+            assert "baseContracts" in curr_contract_def, \
+                f'Got a "ContractDefinition" ast node without a "baseContracts" key: {curr_contract_def}'
+            for bc in curr_contract_def["baseContracts"]:
+                assert "nodeType" in bc and bc["nodeType"] == "InheritanceSpecifier"
+                assert "baseName" in bc and "referencedDeclaration" in bc["baseName"]
+                next_bc_ref = bc["baseName"]["referencedDeclaration"]
+                next_bc = self.contract_file_of(next_bc_ref)
+                if next_bc is None:
+                    fatal_error(ast_logger, f"Could not find reference AST node {next_bc_ref}")
+                next_bc_name = self.contract_ast[next_bc][next_bc_ref]["name"]
+                if (next_bc, next_bc_name) not in seen:
+                    seen.add((next_bc, next_bc_name))
+                    base_contracts_lst.append((next_bc, next_bc_name, self.is_library_def_node(next_bc, next_bc_ref)))
+                    queue.append((next_bc, next_bc_ref))
+
+        self._base_contracts[key] = base_contracts_lst
+        return list(base_contracts_lst)
+
+
 class CertoraBuildGenerator:
     # 12,14,04,06,00,04,10 is 0xce4604a aka certora.
     CONSTRUCTOR_STRING = "constructor"
     FREEFUNCTION_STRING = "freeFunction"
-    file_to_sdc_name: Dict[Path, str] = {}
     BASE_ADDRESS = (12 * 2 ** 24 + 14 * 2 ** 20 + 4 * 2 ** 16 + 6 * 2 ** 12 + 0 + 4 * 2 ** 4 + 10 * 2 ** 0)
 
     """ 6321 - "Unnamed return variable can remain unassigned"
@@ -486,6 +638,8 @@ class CertoraBuildGenerator:
         # bytecode of interest. Which one it is - we don't know yet, but we make a guess based on the base filename.
         # An SDC corresponds to a single Solidity file.
         self.SDCs = {}  # type: Dict[str, SDC]
+        # per build, as several builds may run in the same process (see certoraBatchRun)
+        self.file_to_sdc_name: Dict[Path, str] = {}
 
         build_logger.debug(f"Creating dir {Util.abs_posix_path(Util.get_certora_config_dir())}")
         Util.remove_and_recreate_dir(Util.get_certora_config_dir())
@@ -496,6 +650,8 @@ class CertoraBuildGenerator:
         # original source file -> contract file -> nodeid -> node
         # TODO - make this a proper class
         self.asts = {}  # type: Dict[str, Dict[str, Dict[int, Any]]]
+        # original source file -> import graph of its ASTs, see get_import_graph
+        self.import_graphs: Dict[str, ImportGraph] = {}
         self.address_generator_counter = 0
         self.function_finder_generator_counter = 0
         self.function_finder_file_remappings: Dict[str, str] = {}
@@ -518,9 +674,20 @@ class CertoraBuildGenerator:
                     f"Error: Could not find contract {contract} in contracts "
                     f"[{','.join(map(lambda x: x[1].primary_contract, self.SDCs.items()))}]")
 
+    def get_import_graph(self, build_arg_contract_file: str) -> ImportGraph:
+        """
+        Returns the import graph of the ASTs of [build_arg_contract_file], creating it if the ASTs were (re)collected
+        since the graph was last created
+        """
+        ast = self.asts[build_arg_contract_file]
+        graph = self.import_graphs.get(build_arg_contract_file)
+        if graph is None or graph.contract_ast is not ast:
+            graph = ImportGraph(ast)
+            self.import_graphs[build_arg_contract_file] = graph
+        return graph
+
     def is_library_def_node(self, contract_file: str, node_ref: int, build_arg_contract_file: str) -> bool:
-        contract_def_node = self.asts[build_arg_contract_file][contract_file][node_ref]
-        return "contractKind" in contract_def_node and contract_def_node["contractKind"] == "library"
+        return self.get_import_graph(build_arg_contract_file).is_library_def_node(contract_file, node_ref)
 
     def get_contract_file_of(self, build_arg_contract_file: str, reference: int) -> str:
         """
@@ -529,13 +696,10 @@ class CertoraBuildGenerator:
         :param reference: the id of the node we are looking for
         :returns: the name of the contract file that contains this node
         """
-        original_file_asts = self.asts[build_arg_contract_file]
-        for contract in original_file_asts:
-            if reference in original_file_asts[contract]:
-                return contract
-        # error if got here
-        fatal_error(ast_logger, f"Could not find reference AST node {reference}")
-        return ""
+        contract = self.get_import_graph(build_arg_contract_file).contract_file_of(reference)
+        if contract is None:
+            fatal_error(ast_logger, f"Could not find reference AST node {reference}")
+        return contract
 
     def get_contract_file_of_non_autofinder(self, build_arg_contract_file: str, reference: int) -> str:
         """
@@ -609,9 +773,8 @@ class CertoraBuildGenerator:
 
         if build_arg_contract_file not in self.asts:
             fatal_error(build_logger, f"Failed to find contract file {build_arg_contract_file} in {self.asts.keys()}")
-        ast = self.asts[build_arg_contract_file]
 
-        import_files = self.retrieve_imported_files(ast, contract_file, compile_wd)
+        import_files = self.retrieve_imported_files(build_arg_contract_file, contract_file, compile_wd)
         source_type_descriptions = []  # type: List[CT.Type]
 
         for c_file in set(import_files):
@@ -1009,7 +1172,7 @@ class CertoraBuildGenerator:
 
         return funcs
 
-    def retrieve_imported_files(self, contract_ast: Dict[str, Dict[int, Any]], contract_file: str,
+    def retrieve_imported_files(self, build_arg_contract_file: str, contract_file: str,
                                 compile_wd: Path) -> List[str]:
         """
         Returns a list of all paths that are imported, directly or indirectly,
@@ -1017,57 +1180,12 @@ class CertoraBuildGenerator:
         `compile_wd` is the directory from which compilation is executed, which shares a
         common prefix with `contract_file`.
         note that either `compile_wd` or `contract_file` may be relative - no assumptions can be made here.
-        `contract_ast` is the ast computed for `contract_file` (see `CertoraBuildGenerator.asts`).
+        `build_arg_contract_file` is the build input whose ASTs contain `contract_file`
+        (see `CertoraBuildGenerator.asts`).
+        Paths are resolved in the longest common directory of the imports, and two paths that resolve to the same
+        file are listed once. The result is memoized in the import graph of `build_arg_contract_file`.
         """
-
-        # instead of returning `seen` directly, we use a separate variable for the returned list,
-        # to avoid modifying the input paths
-        imported_files = []
-        seen: Set[str] = set()
-
-        common_dir = self.longest_common_dir_of_imports(compile_wd, contract_ast)
-
-        worklist = [contract_file]
-        while worklist:
-            curr = worklist.pop()
-
-            if curr not in contract_ast:
-                if curr == contract_file:
-                    msg = f"Original contract file {contract_file} not found in {contract_ast.keys()}"
-                else:
-                    msg = f"Path {curr} should have been accessible from {contract_file}, " \
-                          f"but could not be found in {contract_ast.keys()}"
-                fatal_error(build_logger, msg)
-
-            if self.mark_seen(seen, curr, common_dir):
-                imported_files.append(curr)
-
-                for node in contract_ast[curr].values():
-                    if Nf.is_import(node):
-                        import_node = node["absolutePath"]
-                        import_node = Util.normalize_double_paths(import_node)
-                        worklist.append(import_node)
-
-        return imported_files
-
-    @staticmethod
-    def mark_seen(seen: Set[str], path_to_mark: str, common_dir: Path) -> bool:
-        """
-        if `path_to_mark` is in `seen`, returns `False`. otherwise, adds the path
-        to `seen` and returns `True`.
-        `path_to_mark` can be a relative or an absolute path, but must be resolvable
-        in the directory `common_dir`. paths are stored in `seen` in relative form,
-        as the relative path from `common_dir`.
-        """
-        relative_path = Util.find_filename_in(common_dir, path_to_mark)
-
-        if not relative_path:
-            fatal_error(build_logger, f"Path {path_to_mark} could not be resolved in {common_dir}")
-        elif relative_path in seen:
-            return False
-        else:
-            seen.add(relative_path)
-            return True
+        return self.get_import_graph(build_arg_contract_file).imported_files(contract_file, compile_wd)
 
     @staticmethod
     def longest_common_dir_of_imports(contract_wd: Path, contract_ast: Dict[str, Dict[int, Any]]) -> Path:
@@ -1103,33 +1221,9 @@ class CertoraBuildGenerator:
         if get_compiler_lang(contract_file) == CompilerLangVy():
             return [(contract_file, contract_name, False)]
 
-        def retrieve_base_contracts_list_rec(base_contracts_queue: List[Any],
-                                             base_contracts_lst: List[Tuple[str, str, bool]]) -> None:
-            (curr_contract_file, curr_contract_def_node_ref) = base_contracts_queue.pop()
-            curr_contract_def = self.asts[build_arg_contract_file][curr_contract_file][curr_contract_def_node_ref]
-            assert "baseContracts" in curr_contract_def, \
-                f'Got a "ContractDefinition" ast node without a "baseContracts" key: {curr_contract_def}'
-            for bc in curr_contract_def["baseContracts"]:
-                assert "nodeType" in bc and bc["nodeType"] == "InheritanceSpecifier"
-                assert "baseName" in bc and "referencedDeclaration" in bc["baseName"]
-                next_bc_ref = bc["baseName"]["referencedDeclaration"]
-                next_bc = self.get_contract_file_of(build_arg_contract_file, next_bc_ref)
-                next_bc_name = self.asts[build_arg_contract_file][next_bc][next_bc_ref]["name"]
-                if (next_bc, next_bc_name) not in [(e[0], e[1]) for e in base_contracts_lst]:
-                    base_contracts_lst.append(
-                        (next_bc, next_bc_name,
-                         self.is_library_def_node(next_bc, next_bc_ref, build_arg_contract_file)))
-                    base_contracts_queue.insert(0, (next_bc, next_bc_ref))
-
-            if base_contracts_queue:
-                retrieve_base_contracts_list_rec(base_contracts_queue, base_contracts_lst)
-
         contract_def_node_ref = self.get_contract_def_node_ref(build_arg_contract_file, contract_file, contract_name)
-        base_contracts_queue = [(contract_file, contract_def_node_ref)]
-        base_contracts_lst = [
-            (contract_file, contract_name,
-             self.is_library_def_node(contract_file, contract_def_node_ref, build_arg_contract_file))]
-        retrieve_base_contracts_list_rec(base_contracts_queue, base_contracts_lst)
+        base_contracts_lst = self.get_import_graph(build_arg_contract_file).base_contracts(
+            contract_file, contract_name, contract_def_node_ref)
 
         # note the following assumption (as documented above), we turn it off because asserts in the python script
         # are scary
@@ -1281,6 +1375,7 @@ class CertoraBuildGenerator:
         else:
             raise RuntimeError(f"failed to get contract bytes for {contract_name} in file {contract_file}")
 
+    @profiled("load compiler output")
     def get_standard_json_data(self, sdc_name: str, smart_contract_lang: CompilerLang, compiler_collector : CompilerCollector) -> Dict[str, Any]:
         json_file = smart_contract_lang.compilation_output_path(sdc_name)
         process_logger.debug(f"reading standard json data from {json_file}")
@@ -1620,6 +1715,9 @@ class CertoraBuildGenerator:
                 output_selection = ["abi", "evm.bytecode", "evm.deployedBytecode", "evm.methodIdentifiers"]
                 if compiler_collector.compiler_version >= (0, 4, 4):
                     output_selection += ["metadata", "evm.deployedBytecode.symbolMap"]
+                if CompilerCollectorVy.supports_storage_layout_output_selection(compiler_collector.compiler_version):
+                    # saves a separate `vyper -f layout` run, see CompilerLangVy.collect_storage_layout_info
+                    output_selection += ["layout"]
                 ast_selection = ["ast"]
         else:
             # "non-compilable" language so no need to deal with it
@@ -1672,6 +1770,7 @@ class CertoraBuildGenerator:
 
         return srclist
 
+    @profiled("flatten ASTs")
     def collect_asts(self, original_file: str, contract_sources: Dict[str, Dict[str, Any]]) -> None:
         """
         This function fetches the AST provided by solc and flattens it so that each node_id is mapped to a dict object,
@@ -1703,6 +1802,7 @@ class CertoraBuildGenerator:
                     stamp_value_with_contract_name(popped_dict, node)
 
         self.asts[original_file] = {}
+        self.import_graphs.pop(original_file, None)
         for c in contract_sources:
             ast_logger.debug(f"Adding ast of {original_file} for {c}")
             container = {}  # type: Dict[int, Any]
@@ -1817,6 +1917,7 @@ class CertoraBuildGenerator:
                         else:
                             raise Util.CertoraUserInputError(err_msg)
 
+    @profiled("collect_for_file")
     def collect_for_file(self,
                          build_arg_contract_file: str,
                          file_index: int,
@@ -2493,6 +2594,7 @@ class CertoraBuildGenerator:
     def generate_library_import(file_absolute_path: str, library_name: str) -> str:
         return f"\nimport {'{'}{library_name}{'}'} from '{file_absolute_path}';"
 
+    @profiled("function finders")
     def add_auto_finders(self, contract_file: str,
                          sdc: SDC) -> Optional[Tuple[Dict[str, InternalFunc], Dict[str, Dict[int, Instrumentation]]]]:
         function_finder_by_contract: Dict[str, InternalFunc] = dict()
@@ -2652,6 +2754,7 @@ class CertoraBuildGenerator:
                                                                 mut=InsertAfter())
         return function_finder_by_contract, function_finder_instrumentation
 
+    @profiled("internal function harnesses")
     def add_internal_func_harnesses(self, contract_file: str, sdc: SDC, spec_calls: List[str]) -> Optional[Tuple[Dict[str, str], Dict[str, Dict[int, Instrumentation]]]]:
         # contract file -> byte offset -> to insert
         harness_function_instrumentation: Dict[str, Dict[int, Instrumentation]] = defaultdict(dict)
@@ -2820,7 +2923,8 @@ class CertoraBuildGenerator:
         if context.verify and not context.disallow_internal_function_calls:
             with tempfile.NamedTemporaryFile("r", dir=Util.get_build_dir()) as tmp_file:
                 try:
-                    Ctx.run_local_spec_check(False, context, ["-listCalls",  tmp_file.name], print_errors=False)
+                    with profile("list spec calls"):
+                        Ctx.run_local_spec_check(False, context, ["-listCalls",  tmp_file.name], print_errors=False)
                     spec_calls = tmp_file.read().split("\n")
                 except Exception as e:
                     instrumentation_logger.debug(f"Failed to get calls from spec\n{e}")
@@ -2869,7 +2973,7 @@ class CertoraBuildGenerator:
                                                          f"{Util.CWD_FILE}")
                 build_logger.debug(f"Backing up current .certora_sources to {pre_backup_dir}")
                 sources_dir = Util.get_certora_sources_dir()
-                Util.safe_copy_folder(sources_dir, pre_backup_dir, ignore_patterns)
+                Util.snapshot_folder(sources_dir, pre_backup_dir, ignore_patterns)
 
             # Instrument autofinders
             if compiler_lang == CompilerLangSol() and not context.disable_internal_function_instrumentation:
@@ -3002,6 +3106,7 @@ class CertoraBuildGenerator:
             rel_path = os.path.relpath(tmp_file.name, Path.cwd())
             if self.context.compiler_map:
                 self.context.compiler_map.update({rel_path: compiler_version}, last=False)
+                Ctx.invalidate_map_attribute_matcher('compiler')
             # Write the harness contract with dummy fields for each namespaced storage
             var_to_slot = storageExtension.write_harness_contract(tmp_file, harness_name, ns_storage)
             tmp_file.flush()
@@ -3064,6 +3169,67 @@ class CertoraBuildGenerator:
                 # Delete the key from the context
                 self.context.file_to_contract.pop(abs_path, None)
 
+    def extract_slayouts(self, harnesses: List[NamespaceHarness], compiler_version: str) -> Dict[str, NewStorageInfo]:
+        """
+        Extracts the storage information of several contracts with namespaced storage that use the same compiler.
+        The harness contracts of all of them are written to a single file which is compiled once. If that fails
+        (e.g. because the original files cannot be compiled together), falls back to a harness per contract, see
+        extract_slayout.
+
+        Args:
+            harnesses: The contracts to extract the namespaced storage information of
+            compiler_version: The compiler to compile the harnesses with
+
+        Returns:
+            Dict[str, NewStorageInfo]: The storage information of each contract, by its harness cache key
+        """
+        if len(harnesses) > 1:
+            try:
+                return self.extract_batched_slayouts(harnesses, compiler_version)
+            except Exception as e:
+                build_logger.info(f"Failed to compile the storage extension harnesses of {len(harnesses)} contracts "
+                                  f"together, compiling a harness per contract: {e}")
+        return {harness.cache_key: self.extract_slayout(harness.original_file, harness.ns_storage, compiler_version,
+                                                        harness.target_file)
+                for harness in harnesses}
+
+    def extract_batched_slayouts(self, harnesses: List[NamespaceHarness],
+                                 compiler_version: str) -> Dict[str, NewStorageInfo]:
+        """
+        Compiles a single file with the harness contracts of all the given contracts, see extract_slayouts
+        """
+        with tempfile.NamedTemporaryFile(mode="w+t", suffix=".sol", dir=Path.cwd(), delete=True) as tmp_file:
+            rel_path = os.path.relpath(tmp_file.name, Path.cwd())
+            if self.context.compiler_map:
+                self.context.compiler_map.update({rel_path: compiler_version}, last=False)
+                Ctx.invalidate_map_attribute_matcher('compiler')
+            harness_contracts = storageExtension.write_batched_harness_contracts(tmp_file, harnesses)
+            tmp_file.flush()
+
+            if self.context.extract_storage_extension_annotation:
+                # If the flag is set, save the storage extension contract
+                shutil.copyfile(Path(tmp_file.name),
+                                Util.get_build_dir() / f"{Path(tmp_file.name).stem}_storage_extension.sol")
+
+            abs_path = Util.abs_posix_path(tmp_file.name)
+            self.context.file_to_contract[abs_path] = {name for name, _ in harness_contracts.values()}
+            try:
+                compile_idx = storageExtension.get_next_file_index(self.file_to_sdc_name)
+                sdcs = self.collect_for_file(tmp_file.name, compile_idx, CompilerLangSol(), Path.cwd(), abs_path, None,
+                                             fail_on_compilation_error=False)
+                if not sdcs:
+                    raise RuntimeError(f"Failed to compile harness contracts in {tmp_file.name}")
+                slayouts = {}
+                for cache_key, (harness_name, var_to_slot) in harness_contracts.items():
+                    layout = storageExtension.extract_harness_contract_layout(sdcs, harness_name)
+                    # Remap each slot according to the ERC-7201 namespace
+                    remapped_fields = storageExtension.remapped_fields_from_layout(layout, var_to_slot)
+                    slayouts[cache_key] = (remapped_fields, layout.get('types', {}))
+                return slayouts
+            finally:
+                self.context.file_to_contract.pop(abs_path, None)
+
+    @profiled("ERC-7201 annotations")
     def handle_erc7201_annotations(self) -> None:
         """
         Look for contracts that use erc-7201 namespaced storage layout
@@ -3077,9 +3243,14 @@ class CertoraBuildGenerator:
         information such that it contains the information for a `T` at the slot
         erc-7201(some.name.space) as defined in the EIP.
         """
-        # Find all erc7201-like contracts, generate+compile a harness & extract layout information
+        # Find all erc7201-like contracts, generate+compile harnesses & extract layout information
         # maps (path,contract) -> new storage info added by (path,contract)
         slayouts: Dict[Tuple[str, str], NewStorageInfo] = {}
+        # contracts whose storage info is not memoized, grouped by the compiler of their harness
+        pending_harnesses: Dict[str, List[NamespaceHarness]] = defaultdict(list)
+        seen: Set[Tuple[str, str]] = set()
+        # the harness files are only written when compiled, so the memoized storage info is not used to extract them
+        use_memoized = not self.context.extract_storage_extension_annotation
 
         # Scan all of the contracts (including dependencies of targets) for namespaced storage
         # layout information
@@ -3087,6 +3258,8 @@ class CertoraBuildGenerator:
             if target_file not in self.asts:
                 # No AST for this file, so we can't do anything
                 continue
+            unit_hash: Optional[str] = None  # computed once per compilation unit, if it has namespaced storage
+            unit_hashed = False
             for (imported_file, imported_file_ast) in self.asts[target_file].items():
                 for def_node in imported_file_ast.values():
                     if def_node.get("nodeType") != "ContractDefinition":
@@ -3095,9 +3268,10 @@ class CertoraBuildGenerator:
                     # Construct a key for the contract definition node
                     contract_name = def_node.get("name")
                     key = (imported_file, contract_name)
-                    if key in slayouts:
+                    if key in seen:
                         # We already have this contract's storage layout information
                         continue
+                    seen.add(key)
 
                     # Collect any @custom:storage-location annotations
                     ns_storage = storageExtension.get_namespace_storage_from_ast(def_node)
@@ -3106,10 +3280,26 @@ class CertoraBuildGenerator:
                         # No namespaced storage found in this contract
                         continue
 
-                    # Now that we have all the storage layout information, extract it once
-                    slayouts[key] = self.extract_slayout(imported_file, ns_storage,
-                                                         get_relevant_compiler(Path(target_file), self.context),
-                                                         target_file)
+                    if not unit_hashed:
+                        unit_hash = storageExtension.get_compilation_unit_hash(self.asts[target_file].keys())
+                        unit_hashed = True
+                    compiler_version = get_relevant_compiler(Path(target_file), self.context)
+                    cache_key = storageExtension.get_namespace_storage_key(def_node, imported_file, compiler_version,
+                                                                           unit_hash or "")
+                    memoized = storageExtension.get_memoized_storage_info(cache_key) \
+                        if use_memoized and unit_hash is not None else None
+                    if memoized is not None:
+                        slayouts[key] = memoized
+                    else:
+                        pending_harnesses[compiler_version].append(
+                            NamespaceHarness(imported_file, contract_name, ns_storage, target_file, cache_key))
+
+        # Now that we have all the namespaced storage, compile the harnesses of each compiler once
+        for compiler_version, compiler_harnesses in pending_harnesses.items():
+            extracted = self.extract_slayouts(compiler_harnesses, compiler_version)
+            for harness in compiler_harnesses:
+                storageExtension.memoize_storage_info(harness.cache_key, extracted[harness.cache_key])
+                slayouts[(harness.original_file, harness.contract_name)] = extracted[harness.cache_key]
 
         if self.context.test == str(Util.TestValue.STORAGE_EXTENSION_LAYOUT):
             raise Util.TestResultsReady(slayouts)
@@ -3141,6 +3331,7 @@ class CertoraBuildGenerator:
                     build_logger.warning(f"Could not find storage layout for {base[1]} in {base[0]}")
             storageExtension.apply_extensions(target, extensions, harnesses)
 
+    @profiled("storage extension harnesses")
     def handle_storage_extension_harnesses(self) -> None:
         def new_field_of_node(ext_instance: Any, node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
             """
@@ -3258,6 +3449,7 @@ class CertoraBuildGenerator:
             assert target_contract is not None, f"could not find contract for {target}"
             storageExtension.apply_extensions(target_contract, extensions, extension_to_fields_and_types)
 
+    @profiled("autofinders round")
     def finders_compilation_round(self,
                                   build_arg_contract_file: str,
                                   i: int,
@@ -3276,14 +3468,14 @@ class CertoraBuildGenerator:
         # of sources.
         post_backup_dir = self.get_fresh_backupdir(Util.POST_AUTOFINDER_BACKUP_DIR)
         build_logger.debug(f"Backing up instrumented .certora_sources to {post_backup_dir}")
-        Util.safe_copy_folder(Util.get_certora_sources_dir(), post_backup_dir, ignore_patterns)
+        Util.snapshot_folder(Util.get_certora_sources_dir(), post_backup_dir, ignore_patterns)
         # we're rolling back anyway to make extra sure we won't get dirty files in the next compilation
         # (although this is guaranteed by the other call to build_source_tree),
         # and to keep .certora_sources pristine.
-        # roll back .certora_sources by copying from backup directory
+        # roll back .certora_sources by restoring the files that were instrumented from the backup directory
         build_logger.debug(f"Rolling back .certora_sources to {pre_backup_dir} version")
-        shutil.copytree(pre_backup_dir, Util.get_certora_sources_dir(), dirs_exist_ok=True,
-                        ignore=ignore_patterns)
+        restored = Util.restore_snapshot(pre_backup_dir, Util.get_certora_sources_dir(), ignore_patterns)
+        build_logger.debug(f"Restored {restored}")
         return added_finders_to_sdc, finders_compilation_success, source_finders_gen_success, post_backup_dir
 
     @staticmethod
@@ -3447,6 +3639,8 @@ class CertoraBuildGenerator:
                 f"has {len(instr_rewrites)} rewrites")
             ordered_rewrite = sorted(instr_rewrites, key=lambda it: it[0])
 
+            # the file in .certora_sources may be shared with the backups of .certora_sources
+            Util.detach_file(new_abs_path)
             with old_abs_path.open('rb') as in_file:
                 with new_abs_path.open("wb+") as output:
                     read_so_far = 0
@@ -3555,6 +3749,7 @@ class CertoraBuildGenerator:
         new_path = Util.get_certora_sources_dir() / self.context.cwd_rel_in_sources / rel_to_cwd_path
         return str(new_path.absolute())
 
+    @profiled("links")
     def handle_links(self) -> None:
         # Link processing
         if self.context.link is not None:
@@ -3907,6 +4102,7 @@ class CertoraBuildGenerator:
     #   3) All spec files, including imported specs
     #   4) bytecode files (spec and json)
     @staticmethod
+    @profiled("collect sources")
     def collect_sources(context: CertoraContext, certora_verify_generator: CertoraVerifyGenerator,
                         sources_from_SDCs: Set[Path]) -> Set[Path]:
         def add_to_sources(path_to_file: Path) -> None:
@@ -3984,6 +4180,28 @@ def sources_to_abs(sources: Set[Path]) -> Set[Path]:
     return result
 
 
+def copy_source_file(source_path: Path, target_path: Path, overwrite: bool) -> None:
+    """
+    Copies a single file to the source tree. The target directory is assumed to exist
+    """
+    try:
+        if overwrite:
+            # expecting the target path to exist.
+            if target_path.exists():
+                build_logger.debug(f"Overwriting {target_path} by copying from {source_path}")
+            else:
+                build_logger.warning(f"Supposed to overwrite {target_path} by copying from {source_path}" +
+                                     " but it does not exist... this may indicate bad things happen")
+        if overwrite or not target_path.exists():
+            build_logger.debug(f"Copying {source_path} to {target_path}")
+            Util.detach_file(target_path)
+            shutil.copyfile(source_path, target_path)
+    except OSError as e:
+        build_logger.debug(f"Couldn't copy {source_path} to {target_path}", exc_info=e)
+        raise
+
+
+@profiled("build source tree")
 def build_source_tree(sources: Set[Path], context: CertoraContext, overwrite: bool = False) -> None:
     """
     Copies files to .certora_sources
@@ -3991,39 +4209,36 @@ def build_source_tree(sources: Set[Path], context: CertoraContext, overwrite: bo
     sources = sources_to_abs(sources)
     context.cwd_rel_in_sources, context.common_path = CertoraBuildGenerator.get_cwd_rel_in_sources(sources)
 
+    # compute the path of every file from the common root under the sources directory, and create every target
+    # directory once
+    target_directories: Set[Path] = set()
+    files_to_copy: List[Tuple[Path, Path]] = []
     for source_path in sources:
         is_dir = source_path.is_dir()
-        # copy file to the path of the file from the common root under the sources directory
-
-        # make sure directory exists
         target_path = Util.get_certora_sources_dir() / source_path.relative_to(context.common_path)
-        target_directory = target_path if is_dir else target_path.parent
-        try:
-            target_directory.mkdir(parents=True, exist_ok=True)
-        except OSError as e:
-            build_logger.debug(f"Failed to create directory {target_directory}", exc_info=e)
-            raise
-
+        target_directories.add(target_path if is_dir else target_path.parent)
         # copy files. if we got a directory, nothing to do
         if is_dir:
             build_logger.debug(f"Skipping directory {source_path}")
-            continue
+        else:
+            files_to_copy.append((source_path, target_path))
 
+    for target_directory in sorted(target_directories):
         try:
-            if overwrite:
-                # expecting the target path to exist.
-                if target_path.exists():
-                    build_logger.debug(f"Overwriting {target_path} by copying from {source_path}")
-                else:
-                    build_logger.warning(f"Supposed to overwrite {target_path} by copying from {source_path}" +
-                                         " but it does not exist... this may indicate bad things happen")
-            if overwrite or not target_path.exists():
-                build_logger.debug(f"Copying {source_path} to {target_path}")
-                shutil.copyfile(source_path, target_path)
+            target_directory.mkdir(parents=True, exist_ok=True)
         except OSError as e:
-            build_logger.debug(f"Couldn't copy {source_path} to {target_path}", exc_info=e)
+            build_logger.debug(f"Failed to create directory {target_directory}", exc_info=e)
             raise
 
+    # copying is I/O bound, so large source trees are copied by several threads
+    if len(files_to_copy) > SOURCE_COPY_BATCH_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=SOURCE_COPY_THREADS) as executor:
+            for _ in executor.map(lambda paths: copy_source_file(paths[0], paths[1], overwrite), files_to_copy):
+                pass
+    else:
+        for source_path, target_path in files_to_copy:
+            copy_source_file(source_path, target_path, overwrite)
+
     #  the empty file .cwd is written in the source tree to denote the current working directory
     cwd_file_path = Util.get_certora_sources_dir() / context.cwd_rel_in_sources / Util.CWD_FILE
     cwd_file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -4033,6 +4248,7 @@ def build_source_tree(sources: Set[Path], context: CertoraContext, overwrite: bo
     forge_remappings = getattr(context, 'forge_remappings', None)
     if forge_remappings:
         remappings_file_path = Util.get_certora_sources_dir() / context.cwd_rel_in_sources / Util.REMAPPINGS_FILE
+        Util.detach_file(remappings_file_path)
         with remappings_file_path.open("w") as remap_file:
             for remap in context.forge_remappings:
                 remap_file.write(remap + "\n")
@@ -4053,6 +4269,7 @@ def build_source_tree(sources: Set[Path], context: CertoraContext, overwrite: bo
     # the repro file from .certora_internal to .certora_sources so it will be uploaded as a run
     # resource.
     try:
+        Util.detach_file(Util.get_certora_sources_dir() / Util.LAST_CONF_FILE)
         shutil.copy(Util.get_last_conf_file(), Util.get_certora_sources_dir() / Util.LAST_CONF_FILE)
     except OSError as e:
         build_logger.debug("Couldn't copy repro conf to certora sources.", exc_info=e)
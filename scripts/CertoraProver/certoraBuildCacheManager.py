@@ -18,7 +18,7 @@ import logging
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Set, Optional
+from typing import Set, Optional, Dict, Tuple
 
 from Crypto.Hash import keccak
 
@@ -26,6 +26,7 @@ from CertoraProver.certoraContext import collect_args_build_cache_affecting, get
     collect_args_build_cache_disabling, get_client_version
 from CertoraProver.certoraContextClass import CertoraContext
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profiled
 from Shared.certoraUtils import safe_create_dir
 
 build_cache_logger = logging.getLogger("build_cache")
@@ -62,8 +63,12 @@ class CachedFiles:
 
 
 class CertoraBuildCacheManager:
+    # (absolute path, mtime in ns, size) -> content hash. Lives for the whole process, so that several builds
+    # run from the same process (e.g. by certoraBatchRun) do not re-hash unchanged source files.
+    _file_hash_index: Dict[Tuple[str, int, int], str] = {}
 
     @staticmethod
+    @profiled("build cache lookup")
     def build_from_cache(context: CertoraContext) -> Optional[CachedFiles]:
         """
         Given a certora context, tries to get a matching .certora_build.json file from the build cache.
@@ -138,6 +143,7 @@ class CertoraBuildCacheManager:
                            asts_file=asts_file)
 
     @staticmethod
+    @profiled("save build cache")
     def save_build_cache(context: CertoraContext, cached_files: CachedFiles) -> None:
         build_cache_dir = Util.get_certora_build_cache_dir()
         main_cache_entry_dir = build_cache_dir / context.main_cache_key
@@ -252,10 +258,16 @@ class CertoraBuildCacheManager:
         @param f: the file to hash contents of. Assumed to exist and be ascii
         @return the hash of the contents of f
         """
+        stat = f.stat()
+        index_key = (str(f.absolute()), stat.st_mtime_ns, stat.st_size)
+        if index_key in CertoraBuildCacheManager._file_hash_index:
+            return CertoraBuildCacheManager._file_hash_index[index_key]
+
         with f.open() as f_obj:
             bytes = f_obj.read()
             computed_hash = CertoraBuildCacheManager.hash_string(bytes)
 
+        CertoraBuildCacheManager._file_hash_index[index_key] = computed_hash
         return computed_hash
 
     @staticmethod
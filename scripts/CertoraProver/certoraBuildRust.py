@@ -21,14 +21,23 @@ from pathlib import Path
 scripts_dir_path = Path(__file__).parent.parent.resolve()  # containing directory
 sys.path.insert(0, str(scripts_dir_path))
 
+import fnmatch
 import glob
+import hashlib
+import json
+import os
 import shutil
+import subprocess
 import time
 import logging
+from functools import lru_cache
 from pathlib import Path
-from typing import Set, Dict
+from typing import Any, Set, Dict, List, Optional
+
+from wcmatch import glob as wcglob
 
 from CertoraProver.certoraBuild import build_source_tree
+from CertoraProver.certoraContext import get_client_version
 from CertoraProver.certoraContextClass import CertoraContext
 from CertoraProver.certoraParseBuildScript import run_rust_build
 import CertoraProver.certoraContextAttributes as Attrs
@@ -37,6 +46,132 @@ from Shared import certoraUtils as Util
 
 log = logging.getLogger(__name__)
 
+RUST_BUILD_CACHE_DIR_NAME = "rust"
+RUST_SOURCE_PATTERNS = ["*.rs", "*.so", "*.wasm", Util.CARGO_TOML_FILE, "Cargo.lock", "justfile"]
+# directories under a Rust project that are not searched for sources: build outputs and VCS/Certora internals
+RUST_SOURCES_SKIPPED_DIRS = {"target", ".git", ".certora_internal"}
+# where cargo certora-sbf installs the platform tools, one directory per tools version
+SOLANA_TOOLS_CACHE_DIR = Path.home() / ".cache" / "solana"
+
+
+@lru_cache(maxsize=1)
+def get_rust_toolchain_version() -> Dict[str, Any]:
+    """
+    Probes the installed Solana toolchain once per process: the version of cargo certora-sbf and the installed
+    platform tools, so upgrading either is noticed even if --cargo_tools_version is not given
+    """
+    try:
+        result = subprocess.run(["cargo", "certora-sbf", "--version"], capture_output=True, text=True)
+        certora_sbf_version: Optional[str] = result.stdout.strip() if result.returncode == 0 else None
+    except OSError:
+        certora_sbf_version = None
+    platform_tools = {}
+    for tools_dir in sorted(SOLANA_TOOLS_CACHE_DIR.glob("*/platform-tools")):
+        try:
+            platform_tools[tools_dir.parent.name] = tools_dir.stat().st_mtime_ns
+        except OSError:
+            continue
+    return {"certora_sbf": certora_sbf_version, "platform_tools": platform_tools}
+
+
+class RustBuildCache:
+    """
+    Caches the output of Rust builds, so that a build whose inputs did not change is not run again.
+
+    An entry is keyed by the build command (including the features and tools version), the directory it runs from,
+    the build script's contents, the installed toolchain (see get_rust_toolchain_version) and the certora-cli version. It holds the JSON output of the build, a copy of the
+    built executable, and the hashes of the build inputs: Cargo.toml, Cargo.lock, the build script and the files
+    matched by the `sources` globs of the build output. An entry is used only if all these files still have the same
+    hashes and the globs match no new files.
+    """
+
+    build_output_file = "build_output.json"
+    input_hashes_file = "input_hashes.json"
+    executable_dir = "executable"
+
+    def __init__(self, context: CertoraContext, build_command: List[str]):
+        self.context = context
+        key_dict = {
+            "build_command": build_command,
+            "cwd": os.getcwd(),
+            "build_script": self.__hash_file(Path(context.build_script)) if context.build_script else None,
+            "package_version": get_client_version(),
+            "toolchain": get_rust_toolchain_version()
+        }
+        key = hashlib.sha256(json.dumps(key_dict, sort_keys=True).encode()).hexdigest()
+        self.entry_dir = Util.get_certora_build_cache_dir() / RUST_BUILD_CACHE_DIR_NAME / key
+
+    @staticmethod
+    def __hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def __get_input_hashes(self, build_output: Dict[str, Any]) -> Dict[str, str]:
+        project_directory = Path(build_output["project_directory"])
+        input_files = {project_directory / "Cargo.toml", project_directory / "Cargo.lock"}
+        for source in build_output["sources"]:
+            for file in glob.glob(str(project_directory / source), recursive=True):
+                file_path = Path(file)
+                if ".certora_internal" not in file_path.parts:
+                    input_files.add(file_path)
+        if self.context.build_script:
+            input_files.add(Path(self.context.build_script))
+        return {str(f.absolute()): self.__hash_file(f) for f in sorted(input_files) if f.is_file()}
+
+    @staticmethod
+    def __get_executable(build_output: Dict[str, Any]) -> Path:
+        return Path(build_output["project_directory"]) / build_output["executables"]
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        @return the cached build output if there is an entry for the build and its inputs did not change, else None.
+                On a hit, the executable is restored from the cache if it was removed or changed since.
+        """
+        try:
+            with (self.entry_dir / self.build_output_file).open() as f:
+                build_output: Dict[str, Any] = json.load(f)
+            with (self.entry_dir / self.input_hashes_file).open() as f:
+                input_hashes = json.load(f)
+            cached_executable = self.entry_dir / self.executable_dir / Path(build_output["executables"]).name
+            if self.__get_input_hashes(build_output) != input_hashes["inputs"]:
+                log.info("Rust build cache miss: the build inputs changed")
+                return None
+
+            executable = self.__get_executable(build_output)
+            if not executable.is_file() or self.__hash_file(executable) != input_hashes["executable"]:
+                log.debug(f"restoring {executable} from the Rust build cache")
+                executable.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(cached_executable, executable)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.info(f"Rust build cache miss: {e}")
+            return None
+
+        # the logs of the cached build may have been removed since
+        log_files = build_output.get("log") or {}
+        if any(not Path(f).is_file() for f in log_files.values() if f):
+            build_output.pop("log")
+        log.info(f"Rust build cache hit on {self.entry_dir.name}")
+        return build_output
+
+    def save(self, build_output: Dict[str, Any]) -> None:
+        try:
+            executable = self.__get_executable(build_output)
+            input_hashes = {"inputs": self.__get_input_hashes(build_output),
+                            "executable": self.__hash_file(executable)}
+            Util.safe_create_dir(self.entry_dir / self.executable_dir)
+            (self.entry_dir / self.build_output_file).unlink(missing_ok=True)
+            shutil.copyfile(executable, self.entry_dir / self.executable_dir / executable.name)
+            with (self.entry_dir / self.input_hashes_file).open("w") as f:
+                json.dump(input_hashes, f, indent=4)
+            # written last, so that an interrupted save is a cache miss
+            with (self.entry_dir / self.build_output_file).open("w") as f:
+                json.dump(build_output, f, indent=4)
+        except (OSError, KeyError, TypeError) as e:
+            log.warning(f"Could not save the Rust build in the build cache: {e}")
+
 
 def build_rust_project(context: CertoraContext, timings: Dict) -> None:
     """
@@ -90,7 +225,15 @@ def build_rust_app(context: CertoraContext) -> None:
     if context.test == str(Util.TestValue.SOLANA_BUILD_CMD):
         raise Util.TestResultsReady(build_command)
 
-    run_rust_build(context, build_command)
+    if not getattr(context, 'build_cache', False):
+        run_rust_build(context, build_command)
+        return
+
+    build_cache = RustBuildCache(context, build_command)
+    cached_output = build_cache.load()
+    build_output = run_rust_build(context, build_command, cached_output)
+    if cached_output is None:
+        build_cache.save(build_output)
 
 
 def add_solana_files_to_sources(context: CertoraContext, sources: Set[Path]) -> None:
@@ -114,23 +257,58 @@ def add_solana_files_to_sources(context: CertoraContext, sources: Set[Path]) ->
             sources.add(file_path.absolute().resolve())
 
 
-def collect_files_from_rust_sources(context: CertoraContext, sources: Set[Path]) -> None:
-    patterns = ["*.rs", "*.so", "*.wasm", Util.CARGO_TOML_FILE, "Cargo.lock", "justfile"]
-    exclude_dirs = [".certora_internal"]
+def get_glob_root(pattern: str) -> Path:
+    """
+    @return the longest leading directory of the glob pattern that has no glob magic characters
+    """
+    root_parts = []
+    for part in Path(pattern).parts[:-1]:
+        if glob.has_magic(part):
+            break
+        root_parts.append(part)
+    return Path(*root_parts) if root_parts else Path(".")
+
+
+def walk_rust_sources(project_directory: Path, source_patterns: List[str]) -> Set[Path]:
+    """
+    Finds the files that match the given glob patterns (relative to project_directory) and the Rust source file
+    patterns, with a single walk of every glob root. Directories that never hold sources (RUST_SOURCES_SKIPPED_DIRS)
+    are not descended into.
+    """
+    abs_patterns = [os.path.normpath(project_directory.absolute() / pattern) for pattern in source_patterns]
+    # the same semantics as glob.glob(pattern, recursive=True): `**` matches any number of directories, and
+    # wildcards do not match hidden files
+    sources_matcher = wcglob.compile(abs_patterns, flags=wcglob.GLOBSTAR)
 
+    roots: List[Path] = []
+    for root in sorted({Path(os.path.normpath(get_glob_root(pattern))) for pattern in abs_patterns}):
+        if not any(root.is_relative_to(walked) for walked in roots):
+            roots.append(root)
+
+    sources: Set[Path] = set()
+    for root in roots:
+        if root.is_file():
+            if sources_matcher.match(str(root)) and any(fnmatch.fnmatch(root.name, p) for p in RUST_SOURCE_PATTERNS):
+                sources.add(root)
+            continue
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = [d for d in dir_names if d not in RUST_SOURCES_SKIPPED_DIRS]
+            for file_name in file_names:
+                if any(fnmatch.fnmatch(file_name, p) for p in RUST_SOURCE_PATTERNS):
+                    file_path = os.path.join(dir_path, file_name)
+                    if sources_matcher.match(file_path):
+                        sources.add(Path(file_path))
+    return sources
+
+
+def collect_files_from_rust_sources(context: CertoraContext, sources: Set[Path]) -> None:
     if hasattr(context, 'rust_project_directory'):
         project_directory = Path(context.rust_project_directory)
 
         if not project_directory.is_dir():
             raise ValueError(f"The given directory '{project_directory}' is not valid.")
 
-        for source in context.rust_sources:
-            for file in glob.glob(f'{project_directory.joinpath(source)}', recursive=True):
-                file_path = Path(file)
-                if any(excluded in file_path.parts for excluded in exclude_dirs):
-                    continue
-                if file_path.is_file() and any(file_path.match(pattern) for pattern in patterns):
-                    sources.add(file_path)
+        sources.update(walk_rust_sources(project_directory, context.rust_sources))
 
         sources.add(project_directory.absolute())
         if context.build_script:
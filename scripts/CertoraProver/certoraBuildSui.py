@@ -22,19 +22,132 @@ from pathlib import Path
 scripts_dir_path = Path(__file__).parent.parent.resolve()  # containing directory
 sys.path.insert(0, str(scripts_dir_path))
 
+import hashlib
+import json
+import os
+import re
 import shutil
 import time
 import logging
 from pathlib import Path
-from typing import Set, Dict
+from typing import Set, Dict, List, Optional
 
 from CertoraProver.certoraBuild import build_source_tree
+from CertoraProver.certoraContext import get_client_version
 from CertoraProver.certoraContextClass import CertoraContext
 from Shared import certoraUtils as Util
 
 
 log = logging.getLogger(__name__)
 
+SUI_BUILD_CACHE_DIR_NAME = "sui"
+# a dependency on a package in a local directory in Move.toml, e.g. `Sui = { local = "../sui-framework" }`
+MOVE_LOCAL_DEPENDENCY = re.compile(r'\blocal\s*=\s*"([^"]+)"')
+MOVE_BUILD_OUTPUTS = ["build", "package_summaries"]
+
+
+class SuiBuildCache:
+    """
+    Caches the output of Move builds (the build and package_summaries directories of the spec package), so that a
+    build whose inputs did not change is not run again.
+
+    An entry is keyed by the build command, the directory it runs from, the build script's contents, the sui CLI version
+    and the certora-cli version. It holds a copy of the build outputs and the hashes of the build inputs: Move.toml,
+    Move.lock and the .move files of the spec package and of the local packages it depends on.
+    """
+
+    input_hashes_file = "input_hashes.json"
+
+    def __init__(self, build_cmd: List[str], spec_package_dir: Path, build_script: Optional[Path]):
+        self.spec_package_dir = spec_package_dir
+        key_dict = {
+            "build_command": build_cmd,
+            "cwd": os.getcwd(),
+            "build_script": self.__hash_file(build_script) if build_script else None,
+            "sui_version": self.get_sui_version(),
+            "package_version": get_client_version()
+        }
+        key = hashlib.sha256(json.dumps(key_dict, sort_keys=True).encode()).hexdigest()
+        self.entry_dir = Util.get_certora_build_cache_dir() / SUI_BUILD_CACHE_DIR_NAME / key
+
+    @staticmethod
+    def get_sui_version() -> str:
+        try:
+            return subprocess.run(["sui", "--version"], capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return ""
+
+    @staticmethod
+    def __hash_file(path: Path) -> str:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def __get_input_hashes(self) -> Dict[str, str]:
+        """
+        @return the hashes of the inputs of the spec package and of its local dependencies, recursively
+        """
+        input_hashes: Dict[str, str] = {}
+        package_dirs = [self.spec_package_dir.resolve()]
+        seen = set(package_dirs)
+        while package_dirs:
+            package_dir = package_dirs.pop()
+            for dir_path, dir_names, file_names in os.walk(package_dir):
+                if Path(dir_path) == package_dir:
+                    dir_names[:] = [d for d in dir_names if d not in MOVE_BUILD_OUTPUTS]
+                dir_names[:] = [d for d in dir_names if not d.startswith('.')]
+                for file_name in file_names:
+                    if file_name.endswith(".move") or file_name in ["Move.toml", "Move.lock"]:
+                        file_path = Path(dir_path) / file_name
+                        input_hashes[str(file_path)] = self.__hash_file(file_path)
+
+            move_toml = package_dir / "Move.toml"
+            if move_toml.is_file():
+                for dependency in MOVE_LOCAL_DEPENDENCY.findall(move_toml.read_text()):
+                    dependency_dir = (package_dir / dependency).resolve()
+                    if dependency_dir.is_dir() and dependency_dir not in seen:
+                        seen.add(dependency_dir)
+                        package_dirs.append(dependency_dir)
+        return dict(sorted(input_hashes.items()))
+
+    def load(self) -> bool:
+        """
+        Checks if there is an entry for the build whose inputs did not change. If so, the build outputs of the spec
+        package are rolled back to the cached ones (only the files that changed or were removed are copied).
+        The outputs are copied rather than hard linked, since a later build of the package may rewrite them in place.
+        @return True on a cache hit
+        """
+        try:
+            with (self.entry_dir / self.input_hashes_file).open() as f:
+                cached_input_hashes = json.load(f)
+            if cached_input_hashes != self.__get_input_hashes():
+                log.info("Move build cache miss: the package changed")
+                return False
+            for output in self.cached_outputs():
+                Util.restore_snapshot(output, self.spec_package_dir / output.name, shutil.ignore_patterns(),
+                                      link=False)
+        except (OSError, ValueError) as e:
+            log.info(f"Move build cache miss: {e}")
+            return False
+        log.info(f"Move build cache hit on {self.entry_dir.name}")
+        return True
+
+    def save(self) -> None:
+        try:
+            # removed first, so that an interrupted save is a cache miss
+            (self.entry_dir / self.input_hashes_file).unlink(missing_ok=True)
+            Util.safe_create_dir(self.entry_dir)
+            for output in MOVE_BUILD_OUTPUTS:
+                shutil.rmtree(self.entry_dir / output, ignore_errors=True)
+                if (self.spec_package_dir / output).is_dir():
+                    # a real copy, since the build may modify its outputs in place next time
+                    shutil.copytree(self.spec_package_dir / output, self.entry_dir / output)
+            with (self.entry_dir / self.input_hashes_file).open("w") as f:
+                json.dump(self.__get_input_hashes(), f, indent=4)
+        except OSError as e:
+            log.warning(f"Could not save the Move build in the build cache: {e}")
+
+    def cached_outputs(self) -> List[Path]:
+        return [self.entry_dir / output for output in MOVE_BUILD_OUTPUTS if (self.entry_dir / output).is_dir()]
+
 
 def build_sui_project(context: CertoraContext, timings: Dict) -> None:
     """
@@ -56,6 +169,7 @@ def set_sui_build_directory(context: CertoraContext) -> None:
     sources: Set[Path] = set()
 
     move_toml_file: Path | None = None
+    build_cache: SuiBuildCache | None = None
 
     if context.move_path:
         # If move_path is specified, we assume the user has already built the spec package separately.  This is a legacy
@@ -83,14 +197,23 @@ def set_sui_build_directory(context: CertoraContext) -> None:
         context.move_path = str(spec_package_dir / "build")
         context.sui_package_summary_path = spec_package_dir / "package_summaries"
 
+        script_path = None
         if context.build_script:
             # Run the user-provided build script
             script_path = Path(context.build_script).resolve()
             sources.add(script_path)
-            run_sui_build([str(script_path), str(spec_package_dir)])
+            build_cmd = [str(script_path), str(spec_package_dir)]
         else:
             # Build the package using `sui move summary`, which will also produce the package summaries.
-            run_sui_build(["sui", "move", "summary", "--test", "--path", str(move_toml_file.parent)])
+            build_cmd = ["sui", "move", "summary", "--test", "--path", str(move_toml_file.parent)]
+
+        if getattr(context, 'build_cache', False):
+            build_cache = SuiBuildCache(build_cmd, spec_package_dir, script_path)
+            if not build_cache.load():
+                run_sui_build(build_cmd)
+                build_cache.save()
+        else:
+            run_sui_build(build_cmd)
 
     assert context.move_path, "expecting move_path to be set after build"
     move_dir = Path(context.move_path)
@@ -105,13 +228,22 @@ def set_sui_build_directory(context: CertoraContext) -> None:
     if getattr(context, 'conf_file', None) and Path(context.conf_file).exists():
         sources.add(Path(context.conf_file).absolute())
 
-    # Copy the binary modules and source maps
-    shutil.copytree(move_dir,
-                    Util.get_build_dir() / move_dir.name,
-                    ignore=shutil.ignore_patterns('*.move'))
+    if build_cache and build_cache.cached_outputs():
+        # The cached outputs are never modified in place, so they can be hard linked instead of copied
+        for output in build_cache.cached_outputs():
+            Util.snapshot_folder(output, Util.get_build_dir() / output.name,
+                                 shutil.ignore_patterns('*.move') if output.name == move_dir.name
+                                 else shutil.ignore_patterns())
+        build_outputs_copied = True
+    else:
+        build_outputs_copied = False
+        # Copy the binary modules and source maps
+        shutil.copytree(move_dir,
+                        Util.get_build_dir() / move_dir.name,
+                        ignore=shutil.ignore_patterns('*.move'))
 
     # Copy package summary directory if it exists.  Projects built manually with "sui move build" may not have this.
-    if context.sui_package_summary_path and context.sui_package_summary_path.exists():
+    if not build_outputs_copied and context.sui_package_summary_path and context.sui_package_summary_path.exists():
         assert context.sui_package_summary_path.is_dir(), f"Package summary path '{context.sui_package_summary_path}' is not a directory"
         shutil.copytree(context.sui_package_summary_path,
                         Util.get_build_dir() / context.sui_package_summary_path.name)
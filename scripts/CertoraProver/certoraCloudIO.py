@@ -33,6 +33,7 @@ from CertoraProver.certoraJobList import JobList
 from CertoraProver.certoraExtensionInfo import ExtensionInfoWriter
 from CertoraProver.certoraContextClass import CertoraContext
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profiled
 import CertoraProver.certoraContextAttributes as Attrs
 import CertoraProver.certoraContext as Ctx
 from Shared import certoraValidateFuncs as Vf
@@ -204,6 +205,7 @@ def parse_json(response: Response) -> Dict[str, Any]:
     return json_response
 
 
+@profiled("zip")
 def compress_files(zip_file_path: Path, *resource_paths: Path, short_output: bool = False) -> bool:
     with zipfile.ZipFile(zip_file_path, 'w', zipfile.ZIP_DEFLATED) as zip_obj:
 
@@ -1077,6 +1079,7 @@ class CloudVerification:
             self.check_polling_timeout(start_poll_t, self.max_poll_minutes, self.max_poll_error_msg)
 
     @staticmethod
+    @profiled("upload")
     def upload(presigned_url: str, path_to_upload: Path) -> Optional[Response]:
         """
         Uploads user contract/s as a zip file to S3
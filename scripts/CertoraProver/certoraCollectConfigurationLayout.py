@@ -15,7 +15,7 @@
 import dataclasses
 import json
 from enum import Enum
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Tuple, Type
 from pathlib import Path
 import sys
 
@@ -66,6 +66,19 @@ DOC_LINK_PREFIX = 'https://docs.certora.com/en/latest/docs/'
 GIT_ATTRIBUTES = ['origin', 'revision', 'branch', 'dirty']
 
 
+def to_json_data(obj: Any) -> Any:
+    """
+    Converts the layout dataclasses to plain dicts before dumping them. Letting MetadataEncoder convert them calls
+    dataclasses.asdict, which deep copies every value, for every card and inner content, which is slow for long lists
+    and maps.
+    """
+    if isinstance(obj, (CardContent, InnerContent)):
+        return {name: to_json_data(value) for name, value in vars(obj).items()}
+    if isinstance(obj, list):
+        return [to_json_data(item) for item in obj]
+    return obj
+
+
 class AttributeJobConfigData:
     """
     Collect information about attribute configuration presented in the Config tab of the Rule Report.
@@ -122,8 +135,10 @@ class RunConfigurationLayout:
     @classmethod
     def dump_file(cls, data: list) -> None:
         sorted_data = sort_configuration_layout(data)
+        # a single write, json.dump writes every token separately
+        serialized = json.dumps(to_json_data(sorted_data), indent=4, cls=MetadataEncoder)
         with Utils.get_configuration_layout_data_file().open("w+") as f:
-            json.dump(sorted_data, f, indent=4, cls=MetadataEncoder)
+            f.write(serialized)
 
     @classmethod
     def load_file(cls) -> dict:
@@ -178,6 +193,49 @@ def get_doc_link(attr) -> str:  # type: ignore
     return doc_link
 
 
+@dataclasses.dataclass(frozen=True)
+class AttributeLayoutTemplate:
+    """
+    The static part of an attribute's entry in the configuration layout, that does not depend on the run
+    """
+    attr_name: str
+    main_section_key: str
+    doc_link: str
+    tooltip: str
+    unsound: bool
+    is_arg_flag_list: bool
+
+
+# The layout templates of every attribute class. Rust apps have different doc links, so they are keyed separately.
+# The templates depend only on the attribute definitions, so they are computed once per process
+_layout_templates: Dict[Tuple[Type, bool], List[AttributeLayoutTemplate]] = {}
+
+
+def get_layout_templates() -> List[AttributeLayoutTemplate]:
+    """
+    Returns the layout templates of all the attributes of the current app that are presented in the Config tab,
+    in the order of the attribute list
+    """
+    key = (Attrs.get_attribute_class(), Attrs.is_rust_app())
+    if key not in _layout_templates:
+        templates = []
+        for attr in key[0].attribute_list():
+            if attr.config_data is None:
+                continue
+            config_data: AttributeJobConfigData = attr.config_data
+            attr_name = attr.name.lower()
+            templates.append(AttributeLayoutTemplate(
+                attr_name=attr_name,
+                main_section_key=config_data.main_section.value.lower(),
+                doc_link=config_data.doc_link or get_doc_link(attr),
+                tooltip=config_data.tooltip or '',
+                unsound=config_data.unsound,
+                is_arg_flag_list=attr_name in Attrs.ARG_FLAG_LIST_ATTRIBUTES
+            ))
+        _layout_templates[key] = templates
+    return _layout_templates[key]
+
+
 def create_or_get_card_content(output: list[CardContent], name: str) -> CardContent:
     """
         Returns an existing CardContent by name or creates and appends a new one if it doesn't exist.
@@ -234,15 +292,15 @@ def split_and_sort_arg_list_value(args_list: List[str]) -> List[str]:
     return sorted(lines)
 
 
-def create_inner_content(name: str, content_type: ContentType, value: Any, doc_link: str,
-                         config_data: AttributeJobConfigData) -> InnerContent:
+def create_inner_content(name: str, content_type: ContentType, value: Any,
+                         template: AttributeLayoutTemplate) -> InnerContent:
     return InnerContent(
         inner_title=name,
         content_type=content_type.value,
         content=value,
-        doc_link=doc_link,
-        tooltip=config_data.tooltip or '',
-        unsound=config_data.unsound
+        doc_link=template.doc_link,
+        tooltip=template.tooltip,
+        unsound=template.unsound
     )
 
 
@@ -265,53 +323,49 @@ def collect_attribute_configs(metadata: dict) -> list[CardContent]:
         list: A list of CardContent objects representing the structured configuration view,
               ready for rendering or further processing.
     """
-    attr_list = Attrs.get_attribute_class().attribute_list()
     output: list[CardContent] = []
+    # the cards of the main sections by their title, NEW_SECTION attributes get a card of their own
+    main_sections: Dict[str, CardContent] = {}
+    conf = metadata.get('conf', {})
 
-    for attr in attr_list:
-        attr_name = attr.name.lower()
-        if attr.config_data is None:
-            continue
-
-        attr_value = metadata.get(attr_name) or metadata.get('conf', {}).get(attr_name)
+    for template in get_layout_templates():
+        attr_name = template.attr_name
+        attr_value = metadata.get(attr_name) or conf.get(attr_name)
         if attr_value is None:
             continue
 
-        config_data: AttributeJobConfigData = attr.config_data
-        doc_link = config_data.doc_link or get_doc_link(attr)
-
-        # Find or create the main section
-        main_section_key = config_data.main_section.value.lower()
-        main_section = create_or_get_card_content(output, main_section_key)
-
         # Files, Links and Packages are special cases where the main section is the attribute itself
-        if main_section_key == MainSection.NEW_SECTION.value.lower():
-            main_section.card_title = attr_name
-            main_section.content_type = ContentType.SIMPLE.value
-            main_section.content.append(
-                create_inner_content(attr_name, ContentType.SIMPLE, attr_value, doc_link, config_data)
-            )
+        if template.main_section_key == MainSection.NEW_SECTION.value.lower():
+            output.append(CardContent(
+                card_title=attr_name,
+                content_type=ContentType.SIMPLE.value,
+                content=[create_inner_content(attr_name, ContentType.SIMPLE, attr_value, template)]
+            ))
             continue
 
+        # Find or create the main section
+        main_section = main_sections.get(template.main_section_key)
+        if main_section is None:
+            main_section = create_or_get_card_content(output, template.main_section_key)
+            main_sections[template.main_section_key] = main_section
+
         # Find or create the subsection (if it doesn't exist)
         if isinstance(attr_value, list):
             content_type = ContentType.SIMPLE
-            if attr_name in Attrs.ARG_FLAG_LIST_ATTRIBUTES:
+            if template.is_arg_flag_list:
                 attr_value = split_and_sort_arg_list_value(attr_value)
 
         elif isinstance(attr_value, dict):
             content_type = ContentType.COMPLEX
             attr_value = [
-                create_inner_content(key, ContentType.FLAG, value, doc_link, config_data)
+                create_inner_content(key, ContentType.FLAG, value, template)
                 for key, value in attr_value.items()
             ]
         else:
             content_type = ContentType.FLAG
 
         # Update the current section with attribute details
-        main_section.content.append(
-            create_inner_content(attr_name, content_type, attr_value, doc_link, config_data)
-        )
+        main_section.content.append(create_inner_content(attr_name, content_type, attr_value, template))
 
     return output
 
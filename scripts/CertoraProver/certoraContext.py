@@ -25,7 +25,7 @@ from wcmatch import glob
 
 
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Type
+from typing import Dict, List, Optional, Any, Union, Type, Tuple
 from rich.console import Console
 
 scripts_dir_path = Path(__file__).parent.resolve()  # containing directory
@@ -665,29 +665,85 @@ def attrs_to_relative(context: CertoraContext) -> None:
     prover_resource_file_to_relative()
     verify_to_relative()
 
+class MapAttributeMatcher:
+    """
+    The entries of a *_map attribute (e.g. compiler_map), compiled once.
+    A key of the map is either a contract name pattern (no file suffix) or a file glob pattern. Contract patterns are
+    resolved to the files of the matching contracts in contract_to_file, and file patterns are compiled to glob
+    matchers. The value of every path that is looked up is memoized.
+    Code that changes the map or contract_to_file in place (e.g. adds the storage extension harnesses to compiler_map)
+    must call invalidate_map_attribute_matcher afterward.
+    """
+
+    def __init__(self, attr_name: str, map_value: Dict[str, Any], contract_to_file: Dict[str, str]):
+        self.attr_name = attr_name
+        self.map_value = map_value
+        self.contract_to_file = contract_to_file
+        # for every entry of the map, in order: either the files of the matching contracts or a glob matcher
+        self.entries: List[Tuple[Union[List[str], glob.WcMatcher], Any]] = []
+        for key, entry_value in map_value.items():
+            # Split key to handle contract:field syntax
+            pattern = key.split(':')[0]
+            if Path(pattern).suffix == "":  # This is a contract pattern
+                contract_regex = re.compile(fnmatch.translate(os.path.normcase(pattern)))
+                contract_files = [contract_file_path for contract_name, contract_file_path in contract_to_file.items()
+                                  if contract_regex.match(os.path.normcase(contract_name))]
+                self.entries.append((contract_files, entry_value))
+            else:  # This is a file pattern
+                self.entries.append((glob.compile(pattern, flags=glob.GLOBSTAR), entry_value))
+        self.__path_to_value: Dict[str, Any] = {}
+
+    def get_value(self, path: Path) -> Any:
+        path_str = str(path)
+        if path_str not in self.__path_to_value:
+            self.__path_to_value[path_str] = self.__match(path_str)
+        return self.__path_to_value[path_str]
+
+    def __match(self, path_str: str) -> Any:
+        for matcher, entry_value in self.entries:
+            if isinstance(matcher, list):
+                # Check if the file of a matching contract is our target path
+                if any(path_str.endswith(contract_file_path) for contract_file_path in matcher):
+                    return entry_value
+            elif matcher.match(path_str):
+                return entry_value
+        raise RuntimeError(f"cannot match {self.attr_name} to {path_str} from {self.attr_name}_map")
+
+
+# the compiled *_map attributes, by attribute name
+_map_attribute_matchers: Dict[str, MapAttributeMatcher] = {}
+
+
+def get_map_attribute_matcher(context: CertoraContext, attr_name: str) -> Optional[MapAttributeMatcher]:
+    """
+    @return the compiled {attr_name}_map attribute of the context, or None if it is not set. The matcher is compiled
+            again if the map or contract_to_file of the context were replaced since it was compiled
+    """
+    map_value = getattr(context, f"{attr_name}_map", None)
+    if not map_value:
+        return None  # No map value defined
+    contract_to_file = getattr(context, 'contract_to_file', None) or {}
+    matcher = _map_attribute_matchers.get(attr_name)
+    if matcher is None or matcher.map_value is not map_value or matcher.contract_to_file is not contract_to_file:
+        matcher = MapAttributeMatcher(attr_name, map_value, contract_to_file)
+        _map_attribute_matchers[attr_name] = matcher
+    return matcher
+
+
+def invalidate_map_attribute_matcher(attr_name: str) -> None:
+    """
+    Drops the compiled {attr_name}_map attribute, after the map or contract_to_file were changed in place
+    """
+    _map_attribute_matchers.pop(attr_name, None)
+
+
 def get_map_attribute_value(context: CertoraContext, path: Path, attr_name: str) -> Optional[Union[str, bool]]:
 
     value = getattr(context, attr_name, None)
     if value:
         return value
 
-    map_value = getattr(context, f"{attr_name}_map", None)
-    if not map_value:
+    matcher = get_map_attribute_matcher(context, attr_name)
+    if matcher is None:
         return None  # No map value defined
-    for key, entry_value in map_value.items():
-        # Split key to handle contract:field syntax
-        key_parts = key.split(':')
-        pattern = key_parts[0]
-
-        if Path(pattern).suffix == "":  # This is a contract pattern
-            # Find contracts that match the pattern
-            for contract_name, contract_file_path in context.contract_to_file.items():
-                if fnmatch.fnmatch(contract_name, pattern):
-                    # Check if this contract's file matches our target path
-                    if str(path).endswith(contract_file_path):
-                        return entry_value
-        else:  # This is a file pattern
-            # Match the file pattern against the path
-            if glob.globmatch(str(path), pattern, flags=glob.GLOBSTAR):
-                return entry_value
-    raise RuntimeError(f"cannot match {attr_name} to {path} from {attr_name}_map")
+    return matcher.get_value(path)
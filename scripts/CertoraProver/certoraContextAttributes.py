@@ -1797,6 +1797,17 @@ class RustAttributes(AttrUtil.Attributes):
         disables_build_cache=False
     )
 
+    BUILD_CACHE = AttrUtil.AttributeDefinition(
+        arg_type=AttrUtil.AttrArgType.BOOLEAN,
+        argparse_args={
+            'action': AttrUtil.STORE_TRUE
+        },
+        help_msg="Enable caching of the Rust build, reusing the executable while the build inputs do not change",
+        default_desc="Builds the Rust project from scratch each time",
+        affects_build_cache_key=False,
+        disables_build_cache=False
+    )
+
 
 class EvmRuleAttribute(AttrUtil.Attributes):
     RULE = AttrUtil.AttributeDefinition(
@@ -1930,6 +1941,17 @@ class SuiProverAttributes(CommonAttributes, InternalUseAttributes, BackendAttrib
         disables_build_cache=False
     )
 
+    BUILD_CACHE = AttrUtil.AttributeDefinition(
+        arg_type=AttrUtil.AttrArgType.BOOLEAN,
+        argparse_args={
+            'action': AttrUtil.STORE_TRUE
+        },
+        help_msg="Enable caching of the Move build, reusing its output while the package does not change",
+        default_desc="Builds the Move package from scratch each time",
+        affects_build_cache_key=False,
+        disables_build_cache=False
+    )
+
     RULE = AttrUtil.AttributeDefinition(
         arg_type=AttrUtil.AttrArgType.LIST,
         attr_validation_func=Vf.validate_move_rule_name,
@@ -841,7 +841,8 @@ def check_no_pretty_quotes(args_list: List[str]) -> None:
 def __suggest_contract_name(err_msg: str, contract_name: str, all_contract_names: Set[str],
                             contract_to_file: Dict[str, str]) -> None:
     err_str = err_msg
-    suggestions = Util.get_closest_strings(contract_name, list(all_contract_names), max_suggestions=1)
+    suggestions = Util.get_closest_strings(contract_name, Util.get_suggestion_index(all_contract_names),
+                                           max_suggestions=1)
 
     if len(suggestions) == 1:
         suggested_contract = suggestions[0]
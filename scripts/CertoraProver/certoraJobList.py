@@ -13,57 +13,161 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from contextlib import contextmanager
 from datetime import datetime
-from shutil import copyfile
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from pathlib import Path
 import click
+import json
+import os
 import sys
 import requests
+import tempfile
 import time
 import logging
 
 from Shared import certoraUtils as Util
 
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
 job_logger = logging.getLogger("jobList")
 
+RECENT_JOBS_COMPACTION_SIZE = 1024 * 1024  # bytes, a larger jobs log is compacted when jobs are saved
+READ_CHUNK_SIZE = 64 * 1024  # bytes, the jobs log is read backwards in chunks of this size
+
 
-def get_temp_recent_jobs_file() -> Path:
-    return Util.CERTORA_INTERNAL_ROOT / f".tmp{Util.RECENT_JOBS_FILE}"
+def get_recent_jobs_lock_file() -> Path:
+    return Util.get_from_project_internal(f".lock{Util.RECENT_JOBS_LOG_FILE}")
+
+
+@contextmanager
+def locked(lock_path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive lock on lock_path, which is shared by all the processes that modify the jobs log
+    """
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as lock_file:
+        if sys.platform == "win32":
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def parse_record(line: bytes) -> Optional[Dict[str, Any]]:
+    """
+    @return the record of a line of the jobs log, or None for an empty or malformed line (e.g. a line that was cut by
+        a crash while it was written)
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not isinstance(record.get("path"), str):
+        return None
+    return record
+
+
+def read_records(log_path: Path) -> Iterator[Dict[str, Any]]:
+    try:
+        with log_path.open("rb") as log_file:
+            for line in log_file:
+                record = parse_record(line)
+                if record is not None:
+                    yield record
+    except FileNotFoundError:
+        return
+
+
+def read_records_reversed(log_path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Reads the records of the jobs log from the most recent one, without reading the parts of the log that are not
+    needed
+    """
+    try:
+        log_file = log_path.open("rb")
+    except FileNotFoundError:
+        return
+    with log_file:
+        log_file.seek(0, os.SEEK_END)
+        position = log_file.tell()
+        partial_line = b""
+        while position > 0:
+            chunk_size = min(READ_CHUNK_SIZE, position)
+            position -= chunk_size
+            log_file.seek(position)
+            lines = (log_file.read(chunk_size) + partial_line).split(b"\n")
+            partial_line = lines.pop(0)  # may continue in the previous chunk
+            for line in reversed(lines):
+                record = parse_record(line)
+                if record is not None:
+                    yield record
+        record = parse_record(partial_line)
+        if record is not None:
+            yield record
 
 
 class JobList:
     """
     Represents Recently executed jobs
 
-    Structure is as follows:
-    {
-        "path_to_test/working_dir": [
-            {
-                "job_id": {JOB_ID},
-                "output_url": {REPORT_URL: https://{DOMAIN}/output/.../data.json...},
-                "notify_msg": {OPTIONAL: NOTIFICATION_MSG}
-            },...
-        ],...
-    }
+    Jobs are kept in an append-only log, one JSON record per line:
+        {"path": "path_to_test/working_dir",
+         "job": {"job_id": {JOB_ID},
+                 "output_url": {REPORT_URL: https://{DOMAIN}/output/.../data.json...},
+                 "notify_msg": {OPTIONAL: NOTIFICATION_MSG}, ...}}
+    A record without a job clears the jobs of its path.
 
     Each path has a (FIFO) queue of up to {MAX_LENGTH} recently executed jobs
     The first element in the queue is the most recent one
 
+    Records are appended under a file lock, so concurrent submissions do not lose each other's jobs, and a crash can
+    at most leave a truncated last line, which is ignored. Queries read the log backwards, until they have the jobs
+    they need. Once the log grows beyond RECENT_JOBS_COMPACTION_SIZE, it is rewritten atomically with only the
+    {MAX_LENGTH} most recent jobs of every path.
     """
 
-    jobs = {}  # type: Dict[str, Any]
-
     MAX_LENGTH = 10
 
-    recent_jobs_path = Path()
-    temp_file_path = Path()
-
     def __init__(self, current_path: Path = Path.cwd()):
         self.current_path = current_path.resolve().as_posix()
         self.recent_jobs_path = Util.get_recent_jobs_file()
-        self.temp_file_path = get_temp_recent_jobs_file()
-        self.get_recent_jobs(self.recent_jobs_path)
+        self.log_path = Util.get_recent_jobs_log_file()
+        self.lock_path = get_recent_jobs_lock_file()
+        # the jobs of the paths that were queried or modified, the most recent first
+        self.jobs: Dict[str, List[Dict[str, Any]]] = {}
+        # records that were not saved yet
+        self.pending_records: List[Dict[str, Any]] = []
+        self.import_recent_jobs_file()
+
+    def get_jobs(self, path: str) -> List[Dict[str, Any]]:
+        """
+        @return the recent jobs of path, the most recent first
+        """
+        if path not in self.jobs:
+            jobs: List[Dict[str, Any]] = []
+            for record in read_records_reversed(self.log_path):
+                if record["path"] != path:
+                    continue
+                if not isinstance(record.get("job"), dict):
+                    break  # the jobs of path were cleared
+                jobs.append(record["job"])
+                if len(jobs) == self.MAX_LENGTH:
+                    break
+            self.jobs[path] = jobs
+        return self.jobs[path]
 
     def add_job(self, job_id: str, output_url: str, notify_msg: str, domain: str, user_id: str,
                 anonymous_key: str) -> None:
@@ -79,23 +183,19 @@ class JobList:
             "time": int(time.time()),
             "user_id": user_id
         }  # type: Dict[str, Any]
-        try:
-            if self.current_path not in self.jobs.keys():
-                self.jobs[self.current_path] = []
-            self.jobs[self.current_path].insert(0, new_job)  # insert at the front of the list
-            if len(self.jobs[self.current_path]) > self.MAX_LENGTH:
-                self.remove_oldest_job()
-        except AttributeError as e:
-            job_logger.debug(f"Couldn't add job {job_id}. Recent jobs file format may have changed", exc_info=e)
-            self.rename_recent_jobs_file()
+        self.get_jobs(self.current_path).insert(0, new_job)  # insert at the front of the list
+        self.pending_records.append({"path": self.current_path, "job": new_job})
+        if len(self.jobs[self.current_path]) > self.MAX_LENGTH:
+            self.remove_oldest_job()
 
     def remove_oldest_job(self) -> None:
         if not self.current_path:
             job_logger.debug("Current path attribute is missing")
             return
-        if len(self.jobs[self.current_path]):
-            removed_job = self.jobs[self.current_path].pop()  # remove the last element
-            job_logger.debug(f"Removed job {removed_job.get('jobId', '')} from recent jobs list")
+        jobs = self.get_jobs(self.current_path)
+        if len(jobs):
+            removed_job = jobs.pop()  # remove the last element, the log drops it on compaction
+            job_logger.debug(f"Removed job {removed_job.get('job_id', '')} from recent jobs list")
 
     def remove_jobs_in_current_path(self) -> bool:
         if not self.current_path:
@@ -103,6 +203,7 @@ class JobList:
             return False
 
         self.jobs[self.current_path] = []
+        self.pending_records.append({"path": self.current_path})
         return True
 
     def get_latest_job(self) -> Optional[Dict[str, Any]]:
@@ -110,36 +211,96 @@ class JobList:
             job_logger.error("Current path attribute is missing")
             return None
 
-        if self.current_path not in self.jobs:
+        jobs = self.get_jobs(self.current_path)
+        if not jobs:
             job_logger.error(f"Current path {self.current_path} is not in jobs")
             return None
 
-        return max(self.jobs[self.current_path], key=lambda job: 0 if "time" not in job else job["time"])
+        return max(jobs, key=lambda job: 0 if "time" not in job else job["time"])
 
     def get_data(self) -> Dict[str, Any]:
-        return self.jobs
+        """
+        @return the recent jobs of all paths, including the jobs that were not saved yet. Reads the whole log
+        """
+        data = self.compact_records(list(read_records(self.log_path)) + self.pending_records)
+        for path, jobs in self.jobs.items():
+            if path in data or jobs:
+                data[path] = list(jobs)
+        return data
 
-    def save_data(self) -> None:
-        # backup
-        succeeded = self.copy(self.recent_jobs_path, self.temp_file_path)
-        if not succeeded:
-            job_logger.debug("Couldn't create a backup file.")
+    def compact_records(self, records: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        @return the up to {MAX_LENGTH} most recent jobs of every path in records, the most recent first
+        """
+        data: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            jobs = data.setdefault(record["path"], [])
+            if isinstance(record.get("job"), dict):
+                jobs.insert(0, record["job"])
+                del jobs[self.MAX_LENGTH:]
+            else:
+                jobs.clear()
+        return data
 
+    def save_data(self) -> None:
+        """
+        Appends the records that were not saved yet to the jobs log, and compacts the log if it grew too large
+        """
+        if not self.pending_records:
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in self.pending_records)
         try:
-            output_data = self.get_data()
+            with locked(self.lock_path):
+                with self.log_path.open("a+b") as log_file:
+                    if log_file.tell() > 0:
+                        log_file.seek(-1, os.SEEK_END)
+                        if log_file.read(1) != b"\n":
+                            lines = "\n" + lines  # terminate a line that was cut by a crash
+                    log_file.write(lines.encode())
+                self.pending_records = []
+                if self.log_path.stat().st_size > RECENT_JOBS_COMPACTION_SIZE:
+                    self.compact_log()
+        except OSError as e:
+            job_logger.debug("Error occurred when saving recent jobs", exc_info=e)
 
-            # convert all top level keys from Path objects to strings:
-            all_file_paths = [file_path for file_path in output_data]
-            for file_path in all_file_paths:
-                output_data[str(file_path)] = output_data.pop(file_path)
+    def compact_log(self) -> None:
+        """
+        Rewrites the jobs log with only the most recent jobs of every path. Must be called while holding the lock
+        """
+        data = self.compact_records(list(read_records(self.log_path)))
+        self.write_log_atomically([{"path": path, "job": job} for path, jobs in data.items() for job in reversed(jobs)])
+        job_logger.debug(f"Compacted the recent jobs log {self.log_path}")
 
-            Util.write_json_file(output_data, self.recent_jobs_path)
+    def write_log_atomically(self, records: List[Dict[str, Any]]) -> None:
+        with tempfile.NamedTemporaryFile("w", dir=self.log_path.parent, delete=False) as tmp_file:
+            for record in records:
+                tmp_file.write(json.dumps(record) + "\n")
+        os.replace(tmp_file.name, self.log_path)
 
-            # remove the backup file
-            Util.remove_file(self.temp_file_path)
-        except (ValueError, OSError) as e:
-            job_logger.debug("Error occurred when saving json data", exc_info=e)
-            self.revert()
+    def import_recent_jobs_file(self) -> None:
+        """
+        Moves the jobs of the recent jobs file of older versions, which held all the jobs in a single JSON object,
+        to the jobs log
+        """
+        if self.log_path.exists() or not self.recent_jobs_path.is_file():
+            return
+        try:
+            recent_jobs = Util.read_json_file(self.recent_jobs_path)
+            records = [{"path": path, "job": job} for path, jobs in recent_jobs.items() for job in reversed(jobs)
+                       if isinstance(job, dict)]
+        except (ValueError, AttributeError, TypeError):
+            job_logger.debug("Recent jobs file has incorrect format", exc_info=True)
+            self.rename_recent_jobs_file()
+            return
+        except OSError:
+            job_logger.debug(f"Couldn't read recent jobs file {self.recent_jobs_path}", exc_info=True)
+            return
+        try:
+            with locked(self.lock_path):
+                if not self.log_path.exists():
+                    self.write_log_atomically(records)
+        except OSError as e:
+            job_logger.debug("Couldn't import the recent jobs file", exc_info=e)
 
     def save_recent_jobs_to_path(self) -> None:
         """
@@ -163,73 +324,29 @@ class JobList:
             ]
         }
         """
-        all_data = self.get_data()
         path = Util.get_build_dir()
-        if path not in all_data:
+        jobs = self.get_jobs(path.as_posix())
+        if not jobs:
             job_logger.debug(f"Couldn't create a recent jobs file for {path}.")
-            job_logger.debug(f"All data keys = {all_data.keys()}.")
         else:
             path_data = \
                 {
                     "workingDir": path.as_posix(),
-                    "recentJobs": all_data[str(path)]
+                    "recentJobs": jobs
                 }
 
-            if self.recent_jobs_path.exists():
-                # backup
-
-                succeeded = self.copy(self.recent_jobs_path, self.temp_file_path)
-                if not succeeded:
-                    job_logger.debug("Couldn't create a backup file.")
-
             try:
                 job_logger.debug(f"writing recent jobs file to {Util.abs_posix_path(self.recent_jobs_path)}")
-                Util.write_json_file(path_data, self.recent_jobs_path)
-                # remove the backup file
-                Util.remove_file(self.temp_file_path)
+                with tempfile.NamedTemporaryFile("w", dir=self.recent_jobs_path.parent, delete=False) as tmp_file:
+                    json.dump(path_data, tmp_file, indent=4)
+                os.replace(tmp_file.name, self.recent_jobs_path)
             except (ValueError, OSError) as e:
                 job_logger.debug("Error occurred when saving json data", exc_info=e)
-                self.revert()
-
-    def revert(self) -> None:
-        """
-        used when recent job file is corrupted
-        overrides this file with the backup file (if exists)
-        """
-        if self.temp_file_path.is_file():
-            succeeded = self.copy(self.temp_file_path, self.recent_jobs_path)
-            if succeeded:
-                # remove the backup file
-                Util.remove_file(self.temp_file_path)
-        else:
-            job_logger.debug("Couldn't revert recent jobs changes. Backup file does not exist")
-
-    def get_recent_jobs(self, file_path: Path) -> None:
-        """
-        Sets the jobs attribute to be the JSON object stored in the supplied file_path
-        If file_path format is wrong (on ValueError) renames the file
-        """
-        try:
-            recent_jobs = Util.read_json_file(file_path)
-            self.jobs = recent_jobs
-        except FileNotFoundError:
-            job_logger.debug(f"Couldn't find recent jobs file in {file_path}", exc_info=True)
-        except ValueError:
-            job_logger.debug("Recent jobs file has incorrect format", exc_info=True)
-            self.rename_recent_jobs_file()
-
-    def copy(self, src_path: Path, dst_path: Path) -> bool:
-        try:
-            copyfile(src_path, dst_path)
-            return True
-        except OSError as e:
-            job_logger.debug(f"Couldn't copy {src_path}", exc_info=e)
-        return False
 
     def rename_recent_jobs_file(self) -> None:
         now = datetime.now()
         current_time = now.strftime("%Y-%m-%d_%H-%M-%S-%f")
-        name = Util.CERTORA_INTERNAL_ROOT / f".incompatible.{current_time}{Util.RECENT_JOBS_FILE}"
+        name = Util.get_from_project_internal(f".incompatible.{current_time}{Util.RECENT_JOBS_FILE}")
         try:
             self.recent_jobs_path.rename(name)
             job_logger.warning(f"Recent jobs file was renamed. Please, see {name}")
@@ -13,119 +13,209 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
+import json
+import logging
 import os
 import re
+import tempfile
+import threading
 from pathlib import Path
-from typing import List, Tuple, Dict, Set
-
-from sly import Lexer  # type: ignore[import]
-from sly import Parser  # type: ignore[import]
-from sly.lex import Token  # type: ignore[import]
-from sly.yacc import YaccProduction  # type: ignore[import]
+from typing import Any, List, Tuple, Dict, Set, Optional
 
 from Shared import certoraUtils as Util
 
+# Only comments, string literals and 'import' keywords matter when looking for import declarations; any other
+# character is skipped by the scanner. Comments are matched first, so commented out imports are ignored
+SPEC_IMPORT_TOKENS = re.compile(r'(?P<COMMENT>//[^\n\r]*|/\*[\s\S]*?\*/)|(?P<STRING>"[^"]*")|(?P<IMPORT>\bimport\b)')
+# Characters that may appear between an 'import' keyword and its string literal (besides comments)
+SPEC_IMPORT_WHITESPACE = re.compile(r'[ \t\n]*')
+
+# (spec file, sha256 of its content) -> (imports with their locations, parse errors), see get_spec_imports
+_spec_imports_cache: Dict[Tuple[str, str], Tuple[List[Tuple[str, str]], List[str]]] = {}
+
+SPEC_IMPORT_GRAPH_FILE = "spec_import_graph.json"
+SPEC_IMPORT_GRAPH_VERSION = 2
 
-class SpecImportLexer(Lexer):
+spec_parser_logger = logging.getLogger("build_conf")
+
+
+class SpecImportScanner:
     """
-        A lexer that creates designated tokens for 'import' keywords and strings literals in the given spec file.
+        A scanner for import declarations of specification files, namely strings that have the form
+        'import "<path>"', possibly with whitespaces and comments between the keyword and the string literal.
+        NOTE: The scanner should guarantee that if the spec file has a valid syntax, then all of its imports
+        are found. In particular, no actual imports are omitted, and no
+        non-existing or commented out imports are erroneously added.
+        If the spec has an invalid syntax, we may over-approximate the actual set of imports,
+        but we expect that the CVL parser would fail later.
+        An 'import' keyword that is not followed by a string literal is reported in parse_error_msgs.
     """
 
     def __init__(self, spec_file: Path, spec_content: str):
         self.spec_file = spec_file
         self.spec_content = spec_content
+        self.parse_error_msgs: List[str] = []
 
-    tokens = {ANY, IMPORT, STRING}  # type: ignore # noqa: F821
-
-    ignore = ' \t'  # Ignore whitespace and tab characters
-
-    # Ignore comments; in particular, ignore commented out imports;
-    ignore_comments_a = r'[/][/][^\n\r]*'
-
-    @_(r'[/][*][\s\S]*?[*][/]')  # type: ignore # noqa: F821
-    def ignore_comments_b(self, t: Token) -> None:
-        self.lineno += t.value.count("\n")
-
-    IMPORT = r'\bimport\b'  # First, match against 'import' keywords and string literals
-
-    @_(r'\"[^"]*\"')  # type: ignore # noqa: F821
-    def STRING(self, t: Token) -> Token:  # Extract the characters of the string literal, e.g., '"abc"' --> 'abc'
-        result = re.search(r'[^"]+', t.value)
-        if result:
-            t.value = result.group(0)
-        else:  # An empty string literal (i.e., '""')
-            t.value = ''
-        return t
-
-    ANY = r'.'  # Default: Characters that have nothing to do with import declarations
-
-    @_(r'\n+')  # type: ignore # noqa: F821
-    def ignore_newline(self, t: Token) -> None:  # Ignore new line characters; use those to compute the line number
-        self.lineno += len(t.value)
-
-    # Error handling
-    def error(self, t: Token) -> None:
-        raise Util.CertoraUserInputError(f'{self.spec_file}:{self.lineno}:{self.find_column(t.index)}: '
-                                         f'Encountered the illegal symbol {repr(t.value[0])}')
-
-    # Computes the column number from the given token's index
-    def find_column(self, token_index: int) -> int:
-        last_cr = self.spec_content.rfind('\n', 0, token_index)
+    def scan(self) -> List[Tuple[str, str]]:
+        """
+        @return the imported paths in order of appearance, each with the 'line:column' location of its declaration
+        """
+        imports: List[Tuple[str, str]] = []
+        import_index: Optional[int] = None  # the index of an 'import' keyword still waiting for its string literal
+        after_import = 0  # the index after that keyword and the comments that follow it
+
+        for token in SPEC_IMPORT_TOKENS.finditer(self.spec_content):
+            kind = token.lastgroup
+            if import_index is None:
+                if kind == 'IMPORT':
+                    import_index, after_import = token.start(), token.end()
+                continue
+
+            gap_end = self.__skip_whitespace(after_import)
+            if gap_end < token.start():
+                # some other symbol separates the keyword from this token. Skip everything until the next keyword
+                self.__add_error(gap_end, repr(self.spec_content[gap_end]))
+                import_index = None
+            elif kind == 'COMMENT':
+                after_import = token.end()
+                continue
+            elif kind == 'STRING':
+                imports.append((token.group()[1:-1], self.__location(import_index)))
+                import_index = None
+                continue
+            else:
+                self.__add_error(token.start(), repr(token.group()))
+                import_index = None
+            if kind == 'IMPORT':
+                # the keyword that ended the malformed declaration may start a declaration of its own
+                import_index, after_import = token.start(), token.end()
+
+        if import_index is not None:
+            gap_end = self.__skip_whitespace(after_import)
+            if gap_end < len(self.spec_content):
+                self.__add_error(gap_end, repr(self.spec_content[gap_end]))
+            else:
+                self.parse_error_msgs.append(f"{self.spec_file}:{self.__location(import_index)}: "
+                                             f"Expected a string literal after 'import', reached the end of the file")
+
+        return imports
+
+    def __skip_whitespace(self, index: int) -> int:
+        whitespace = SPEC_IMPORT_WHITESPACE.match(self.spec_content, index)
+        return whitespace.end() if whitespace else index
+
+    def __add_error(self, index: int, symbol: str) -> None:
+        self.parse_error_msgs.append(f'{self.spec_file}:{self.__location(index)}: Did not expect the symbol {symbol}')
+
+    def __location(self, index: int) -> str:
+        line = self.spec_content.count('\n', 0, index) + 1
+        return f'{line}:{self.find_column(index)}'
+
+    # Computes the column number from the given index
+    def find_column(self, index: int) -> int:
+        last_cr = self.spec_content.rfind('\n', 0, index)
         if last_cr < 0:
             last_cr = 0
-        column = (token_index - last_cr) + 1
+        column = (index - last_cr) + 1
         return column
 
 
-class SpecImportParser(Parser):
+def get_spec_imports(spec_file: Path, spec_content: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Scans [spec_content] for import declarations, see SpecImportScanner.
+    Results are cached by the spec file and the hash of its content, as the same spec files are scanned by every build
+    of the process.
+    @return the imports with their locations, and the parse errors
     """
-           A parser for import declarations of specification files, namely strings that have the form
-           'IMPORT STRING'.
-           NOTE: The parser should guarantee that if the spec file has a valid syntax, then all of its imports
-           are parsed. In particular, no actual imports are omitted, and no
-           non-existing or commented out imports are erroneously added.
-           If the spec has an invalid syntax, we may over-approximate the actual set of imports,
-           but we expect that the CVL parser would fail later.
+    key = (str(spec_file), hashlib.sha256(spec_content.encode()).hexdigest())
+    if key not in _spec_imports_cache:
+        scanner = SpecImportScanner(spec_file, spec_content)
+        imports = scanner.scan()
+        _spec_imports_cache[key] = (imports, scanner.parse_error_msgs)
+    imports, errors = _spec_imports_cache[key]
+    return list(imports), list(errors)
+
 
+def get_file_signature(path: Path) -> Tuple[int, int]:
     """
+    @return the size and the modification time of path, which tell cheaply whether it may have changed
+    """
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
 
-    def __init__(self, _lexer: SpecImportLexer):
-        self.lexer = _lexer
-        self.parse_error_msgs: List[str] = []
 
-    # Get the token list from the lexer (required)
-    tokens = SpecImportLexer.tokens
-
-    # Grammar rules and actions
-    @_('imports maybe_import_decl')  # type: ignore # noqa: F821,F811
-    def imports(self, p: YaccProduction) -> List[Tuple[str, str]]:
-        return p.imports if not p.maybe_import_decl else p.imports + p.maybe_import_decl
-
-    @_('')  # type: ignore # noqa: F821,F811
-    def imports(self, p: YaccProduction) -> List[Tuple[str, str]]:  # noqa: F821,F811
-        return []
-
-    @_('ANY', 'STRING')  # type: ignore # noqa: F821,F811
-    def maybe_import_decl(self, p: YaccProduction) -> None:  # Surely NOT an import declaration
-        return None
-
-    @_('IMPORT STRING')  # type: ignore # noqa: F821,F811
-    def maybe_import_decl(self, p: YaccProduction) -> List[Tuple[str, str]]:  # noqa: F821,F811
-        # Surely an import declaration
-        # Also log the location of the import declaration
-        return [(p.STRING, f'{p.lineno}:{self.lexer.find_column(p.index)}')]
-
-    def error(self, p: Token) -> Token:
-        self.parse_error_msgs.append(fr'{self.lexer.spec_file}:{p.lineno}:{self.lexer.find_column(p.index)}: '
-                                     fr'Did not expect the symbol {repr(p.value)}')  # log the error
-        # Read ahead looking for an 'import' keyword.
-        # If such a keyword is found, restart the parser in its initial state
-        while True:
-            p = next(self.tokens.__iter__(), None)
-            if not p or p.type == 'IMPORT':
-                break
-            self.restart()
-        return p  # Return IMPORT as the next lookahead token
+class SpecImportGraph:
+    """
+    The import declarations of every spec file that was scanned, persisted in .certora_internal so that runs that share
+    spec libraries (e.g. the confs of a multi-conf repo) do not read and scan them again.
+    An entry is used as long as the size and modification time of its file are unchanged. Otherwise the file is read,
+    and scanned again only if the hash of its content changed.
+    """
+
+    def __init__(self) -> None:
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.graph_file: Optional[Path] = None
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def __load(self) -> None:
+        """
+        Loads the persisted graph of the project's .certora_internal directory, if it was not loaded yet
+        """
+        graph_file = Util.get_from_project_internal(SPEC_IMPORT_GRAPH_FILE).resolve()
+        if graph_file == self.graph_file:
+            return
+        self.graph_file = graph_file
+        self.entries = {}
+        self.dirty = False
+        try:
+            with graph_file.open() as graph_handle:
+                data = json.load(graph_handle)
+            if data.get("version") == SPEC_IMPORT_GRAPH_VERSION:
+                self.entries = data["specs"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # a missing or unreadable graph is rebuilt from scratch
+
+    def get_imports(self, spec_file: Path) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        @return the imports of spec_file with their locations, and the parse errors (see get_spec_imports)
+        """
+        with self._lock:
+            self.__load()
+            key = str(Path(spec_file).resolve())
+            size, mtime_ns = get_file_signature(spec_file)
+            entry = self.entries.get(key)
+            if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+                spec_content = Path(spec_file).read_text()
+                content_hash = hashlib.sha256(spec_content.encode()).hexdigest()
+                if entry is None or entry["sha256"] != content_hash:
+                    imports, errors = get_spec_imports(spec_file, spec_content)
+                    entry = {"sha256": content_hash, "imports": imports, "errors": errors}
+                entry.update({"size": size, "mtime_ns": mtime_ns})
+                self.entries[key] = entry
+                self.dirty = True
+            return [(path, loc) for path, loc in entry["imports"]], list(entry["errors"])
+
+    def save(self) -> None:
+        """
+        Persists the graph if it changed since it was loaded
+        """
+        with self._lock:
+            if not self.dirty or self.graph_file is None:
+                return
+            try:
+                self.graph_file.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile("w", dir=self.graph_file.parent, delete=False) as tmp_handle:
+                    json.dump({"version": SPEC_IMPORT_GRAPH_VERSION, "specs": self.entries}, tmp_handle)
+                os.replace(tmp_handle.name, self.graph_file)
+                self.dirty = False
+            except OSError as e:
+                spec_parser_logger.debug(f"Could not save the spec import graph to {self.graph_file}: {e}")
+
+
+# The spec import graph shared by all the builds of the process
+spec_import_graph = SpecImportGraph()
 
 
 class SpecWithImports:
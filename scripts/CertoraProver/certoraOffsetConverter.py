@@ -19,6 +19,7 @@ from pathlib import Path
 
 from CertoraProver.certoraBuildDataClasses import SDC
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profiled
 
 
 class OffsetConverter:
@@ -49,6 +50,7 @@ class OffsetConverter:
         return line, column
 
 
+@profiled("offset converters")
 def generate_offset_converters(sdc: SDC) -> dict[str, OffsetConverter]:
     original_files = {Util.convert_path_for_solc_import(c.original_file) for c in sdc.contracts}
     return {file: OffsetConverter(file) for file in original_files}
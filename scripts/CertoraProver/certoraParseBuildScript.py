@@ -17,7 +17,9 @@ import subprocess
 import json
 import logging
 import os
-from typing import List
+import tempfile
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 
 from CertoraProver.certoraContextClass import CertoraContext
 from Shared import certoraUtils as Util
@@ -26,6 +28,8 @@ from CertoraProver.certoraCollectConfigurationLayout import collect_configuratio
 
 build_script_logger = logging.getLogger("build_script")
 
+BUILD_STDERR_TAIL_LINES = 1000  # the number of stderr lines of a failing build that are shown to the user
+
 
 def update_metadata(context: CertoraContext, attr_name: str) -> None:
     metadata = RunMetaData.load_file()
@@ -57,17 +61,44 @@ def add_solana_files_to_context(context: CertoraContext, json_obj: dict) -> None
                 update_metadata(context, solana_files_attr)
 
 
-def run_rust_build(context: CertoraContext, build_cmd: List[str]) -> None:
-
+def run_rust_build_cmd(build_cmd: List[str]) -> subprocess.CompletedProcess:
+    """
+    Runs the build command. Its standard error is logged line by line while the build runs, and only its tail is kept.
+    @return the completed process, with the whole standard output and the tail of the standard error
+    """
+    stderr_tail: Deque[str] = deque(maxlen=BUILD_STDERR_TAIL_LINES)
+    with tempfile.TemporaryFile(mode="w+") as stdout_file:
+        with subprocess.Popen(build_cmd, stdout=stdout_file, stderr=subprocess.PIPE, text=True) as process:
+            assert process.stderr is not None
+            for line in process.stderr:
+                build_script_logger.debug(line.rstrip("\n"))
+                stderr_tail.append(line)
+        stdout_file.seek(0)
+        return subprocess.CompletedProcess(build_cmd, process.returncode, stdout_file.read(), "".join(stderr_tail))
+
+
+def run_rust_build(context: CertoraContext, build_cmd: List[str],
+                   cached_output: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Runs the build command and updates the context from its JSON output.
+    @param cached_output: the JSON output of an earlier identical build. If given, the build command is not run
+    @return the JSON output of the build
+    """
+
+    json_obj: Any
     try:
-        build_script_logger.info(f"Building by calling `{' '.join(build_cmd)}`")
-        result = subprocess.run(build_cmd, capture_output=True, text=True)
+        if cached_output is not None:
+            build_script_logger.info(f"Using the cached output of `{' '.join(build_cmd)}`")
+            json_obj = cached_output
+        else:
+            build_script_logger.info(f"Building by calling `{' '.join(build_cmd)}`")
+            result = run_rust_build_cmd(build_cmd)
 
-        # Check if the script executed successfully
-        if result.returncode != 0:
-            raise Util.CertoraUserInputError(f"Error running the script {context.build_script}\n{result.stderr}")
+            # Check if the script executed successfully
+            if result.returncode != 0:
+                raise Util.CertoraUserInputError(f"Error running the script {context.build_script}\n{result.stderr}")
 
-        json_obj = json.loads(result.stdout)
+            json_obj = json.loads(result.stdout)
 
         if not json_obj:
             raise Util.CertoraUserInputError(f"No JSON output from build script {context.build_script}")
@@ -96,6 +127,8 @@ def run_rust_build(context: CertoraContext, build_cmd: List[str]) -> None:
         if context.test == str(Util.TestValue.AFTER_BUILD_RUST):
             raise Util.TestResultsReady(context)
 
+        return json_obj
+
     except Util.TestResultsReady as e:
         raise e
     except FileNotFoundError as e:
@@ -13,6 +13,7 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
 import json
 import logging
 import os
@@ -21,9 +22,11 @@ from dataclasses import dataclass
 from functools import partial
 from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from tqdm import tqdm
 
+from Shared import certoraUtils as Util
+
 
 def get_solidity_files(project_root: Path) -> List[Path]:
     """
@@ -65,96 +68,79 @@ def get_solidity_files(project_root: Path) -> List[Path]:
         return fallback_walk()
 
 
-def get_solc_base_args(project_root: Path) -> List[str]:
-    """
-    Get base arguments for solc command including paths if node_modules exists
-    """
-    args = []
-    if (project_root / 'node_modules').is_dir():
-        args.extend(['--base-path', str(project_root), '--include-path', 'node_modules'])
-
-    remappings_file = project_root / 'remappings.txt'
-    if remappings_file.exists():
-        with open(remappings_file) as f:
-            remappings = [line.strip() for line in f if line.strip()]
-            args.extend(remappings)
-    else:
-        logging.info("no 'remappings.txt' file found")
+# Parsing is cheap, so files are parsed in batches to save solc process startups
+SCAN_BATCH_SIZE = 100
+# Maps the sha256 of a file's content to its deployable contracts, see scan_project
+SCAN_CACHE_FILE = "project_scan_cache.json"
+
 
-    return args
+def get_solc_version() -> str:
+    try:
+        return subprocess.run(['solc', '--version'], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
 
 
-def get_ast_contract_nodes(sol_file: Path, project_root: Path) -> List[dict]:
+def is_deployable(contract_node: dict) -> bool:
     """
-    Parse Solidity file and return list of ContractDefinition nodes from AST
+    Decides from the parsed AST of a ContractDefinition whether the contract can be deployed: it must be a contract
+    (not an interface or a library) that is not abstract and that implements all of its own functions.
+    Note that a contract that does not implement functions it inherits must be declared abstract, or it does not compile.
     """
-    base_args = get_solc_base_args(project_root)
-    ast_cmd = ['solc', '--ast-compact-json', '--stop-after', 'parsing'] + base_args + [sol_file]
-    ast_result = subprocess.run(
-        ast_cmd,
-        capture_output=True,
-        text=True,
-        cwd=project_root
-    )
-
-    if ast_result.returncode != 0:
-        logging.error(f"Failed to build {sol_file}! Error:\n{ast_result.stderr}")
-        return []
-
-    contract_nodes = []
-    for line in ast_result.stdout.split('\n'):
-        if not line.strip() or line.startswith('>'):
-            continue
-        try:
-            ast_json = json.loads(line)
-            for node in ast_json.get('nodes', []):
-                if node.get('nodeType') == 'ContractDefinition':
-                    contract_nodes.append(node)
-        except json.JSONDecodeError:
-            continue
-
-    return contract_nodes
+    if contract_node.get('contractKind') != 'contract' or contract_node.get('abstract', False):
+        return False
+    return all(node.get('implemented', True) for node in contract_node.get('nodes', [])
+               if node.get('nodeType') == 'FunctionDefinition')
 
 
-def extract_deployable_contracts(sol_file: Path, project_root: Path) -> List[str]:
+def parse_deployable_contracts(sol_files: List[Path], project_root: Path) -> Optional[Dict[Path, List[str]]]:
     """
-    Extract the deployable contract names from a Solidity file.
+    Parses [sol_files] with a single parse-only solc run, and returns the deployable contracts of every file.
+    Imports are not resolved when parsing, so the files are passed to solc by content.
+    Files with syntax errors have no deployable contracts.
+    @return None if the batch failed as a whole: a file could not be read, solc failed, or reported an error that is
+    not attributed to a file
     """
-    try:
-        base_args = get_solc_base_args(project_root)
-        bin_runtime = 'bin-runtime'
-        compiler_cmd = ['solc', '--combined-json', bin_runtime] + base_args + [str(sol_file)]
-        result = subprocess.run(
-            compiler_cmd,
-            capture_output=True,
-            text=True,
-            cwd=project_root
-        )
+    sources = {}
+    for sol_file in sol_files:
+        try:
+            sources[str(sol_file)] = {'content': (project_root / sol_file).read_text(encoding='utf-8', errors='replace')}
+        except OSError as e:
+            logging.error(f"Failed to read {sol_file}: {e}")
+            return None
+    solc_input = {
+        'language': 'Solidity',
+        'sources': sources,
+        'settings': {'stopAfter': 'parsing', 'outputSelection': {'*': {'': ['ast']}}}
+    }
 
+    try:
+        result = subprocess.run(['solc', '--standard-json'], input=json.dumps(solc_input), capture_output=True,
+                                text=True, cwd=project_root)
+        output = json.loads(result.stdout)
     except Exception as e:
-        logging.error(f"Error extracting contracts from {sol_file}: {e}")
-        return []
-
-    if result.returncode != 0:
-        logging.error(f"Failed to build {sol_file}! Error:\n{result.stderr}")
-        return []
-
-    contract_nodes = get_ast_contract_nodes(sol_file, project_root)
-
-    bins = json.loads(result.stdout)
-
-    if "contracts" not in bins:
-        # an empty file...
-        return []
-
-    deployable_contracts: List[str] = []
-    for contract, data in bins["contracts"].items():
-        current_file, current_contract = contract.split(':')
-        if data[bin_runtime] and data[bin_runtime] != '0x' and \
-           str(sol_file).endswith(current_file) and \
-           all(node.get('contractKind') != 'library' or node.get('name') != current_contract for node in contract_nodes):
-            deployable_contracts.append(current_contract)
+        logging.error(f"Error parsing {len(sol_files)} Solidity files: {e}")
+        return None
 
+    failed_files = set()
+    for error in output.get('errors', []):
+        if error.get('severity') != 'error':
+            continue
+        error_file = error.get('sourceLocation', {}).get('file')
+        if error_file is None:
+            logging.error(f"Failed to parse Solidity files! Error:\n{error.get('formattedMessage', error)}")
+            return None
+        logging.error(f"Failed to parse {error_file}! Error:\n{error.get('formattedMessage', error)}")
+        failed_files.add(error_file)
+
+    deployable_contracts: Dict[Path, List[str]] = {}
+    for sol_file in sol_files:
+        source_output = output.get('sources', {}).get(str(sol_file))
+        if str(sol_file) in failed_files or source_output is None:
+            deployable_contracts[sol_file] = []
+            continue
+        deployable_contracts[sol_file] = [node['name'] for node in source_output['ast'].get('nodes', [])
+                                          if node.get('nodeType') == 'ContractDefinition' and is_deployable(node)]
     return deployable_contracts
 
 
@@ -163,20 +149,66 @@ class FileResult:
     """Result of processing a single Solidity file"""
     file_path: Path
     contracts: List[str]
+    parsed: bool = True  # False if the file could not be parsed, its (empty) contracts must not be cached
+
+
+def process_batch(project_root: Path, sol_files: List[Path]) -> List[FileResult]:
+    """
+    Process a batch of Solidity files. Designed for Pool.map usage.
+    If the batch fails as a whole, it is split in two and each half is processed again, so that a single bad file does
+    not hide the contracts of the other files of its batch.
+    """
+    deployable_contracts = parse_deployable_contracts(sol_files, project_root)
+    if deployable_contracts is not None:
+        return [FileResult(sol_file, deployable_contracts[sol_file]) for sol_file in sol_files]
+    if len(sol_files) == 1:
+        return [FileResult(sol_files[0], [], parsed=False)]
+    middle = len(sol_files) // 2
+    return process_batch(project_root, sol_files[:middle]) + process_batch(project_root, sol_files[middle:])
+
 
+def hash_file(sol_file: Path) -> str:
+    return hashlib.sha256(sol_file.read_bytes()).hexdigest()
 
-def process_file(project_root: Path, sol_file: Path) -> FileResult:
+
+def get_scan_cache_file(project_root: Path) -> Path:
+    # follows the active internal directory (e.g. of a certoraBatchRun group)
+    return project_root / Util.get_from_certora_internal(SCAN_CACHE_FILE)
+
+
+def read_scan_cache(project_root: Path, solc_version: str) -> Dict[str, List[str]]:
     """
-    Process a single Solidity file. Designed for Pool.map usage.
+    @return the deployable contracts of previously scanned files by the hash of their content, or an empty dict if the
+    cache is missing, unreadable or was created by another solc
     """
-    contract_names = extract_deployable_contracts(sol_file, project_root)
-    return FileResult(sol_file, contract_names)
+    try:
+        with get_scan_cache_file(project_root).open() as cache_handle:
+            cache = json.load(cache_handle)
+        if cache.get('solc_version') == solc_version:
+            return cache.get('files', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def write_scan_cache(project_root: Path, solc_version: str, files: Dict[str, List[str]]) -> None:
+    try:
+        cache_file = get_scan_cache_file(project_root)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with cache_file.open('w') as cache_handle:
+            json.dump({'solc_version': solc_version, 'files': files}, cache_handle)
+    except OSError as e:
+        logging.debug(f"Failed to write the project scan cache: {e}")
+
 
 def scan_project(project_path: Optional[str] = None) -> List[FileResult]:
     """
     Scan a project and return a list of `FileResult`s, each containing a
     filename and a list of (deployable) contracts declared in that file.
-    Only files with at least one deployable contract are returned
+    Only files with at least one deployable contract are returned.
+    Deployability is decided from parse-only ASTs, see is_deployable. Results are cached by the hash of the files'
+    contents, so only new and modified files are parsed again when the project is rescanned. Files that could not be
+    parsed are not cached, and are parsed again by the next scan.
     """
     if project_path is None:
         project_root = Path.cwd()
@@ -185,14 +217,36 @@ def scan_project(project_path: Optional[str] = None) -> List[FileResult]:
 
     all_sol_files = get_solidity_files(project_root)
 
-    # Process files in parallel with progress bar
-    func = partial(process_file, project_root)
-    with Pool() as pool:
-        results = list(tqdm(
-            pool.imap(func, all_sol_files),
-            total=len(all_sol_files),
-            desc="Processing Solidity files",
-            unit="%"
-        ))
-
+    solc_version = get_solc_version()
+    if not solc_version:
+        logging.error("Cannot run solc, the Solidity files of the project are not scanned")
+        return []
+    cached_files = read_scan_cache(project_root, solc_version)
+    cache = dict(cached_files)
+    file_hashes: Dict[Path, str] = {}
+    for sol_file in all_sol_files:
+        try:
+            file_hashes[sol_file] = hash_file(project_root / sol_file)
+        except OSError as e:
+            logging.error(f"Failed to read {sol_file}: {e}")
+    files_to_parse = [sol_file for sol_file, file_hash in file_hashes.items() if file_hash not in cache]
+
+    # Parse the new and modified files in parallel batches, with a progress bar
+    batches = [files_to_parse[i:i + SCAN_BATCH_SIZE] for i in range(0, len(files_to_parse), SCAN_BATCH_SIZE)]
+    if batches:
+        func = partial(process_batch, project_root)
+        with Pool() as pool:
+            with tqdm(total=len(files_to_parse), desc="Processing Solidity files", unit="file") as progress:
+                for batch_results in pool.imap(func, batches):
+                    for result in batch_results:
+                        if result.parsed:
+                            cache[file_hashes[result.file_path]] = result.contracts
+                    progress.update(len(batch_results))
+
+    # entries of deleted and modified files are dropped
+    current_files = {file_hash: cache[file_hash] for file_hash in file_hashes.values() if file_hash in cache}
+    if current_files != cached_files:
+        write_scan_cache(project_root, solc_version, current_files)
+
+    results = [FileResult(sol_file, current_files.get(file_hash, [])) for sol_file, file_hash in file_hashes.items()]
     return list(filter(lambda result: len(result.contracts) > 0, results))
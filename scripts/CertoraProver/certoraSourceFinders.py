@@ -23,6 +23,7 @@ from CertoraProver.certoraBuildDataClasses import SDC, Instrumentation, instrume
     UnspecializedSourceFinder
 from CertoraProver.certoraType import PrimitiveType
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profiled
 
 
 class LocalAssignmentSourceFinder(UnspecializedSourceFinder):
@@ -323,6 +324,7 @@ def find_char(filepath: str, offset: int, c : str) -> Optional[int]:
         return None
 
 
+@profiled("source finders")
 def add_source_finders(asts: Dict[str, Dict[str, Dict[int, Any]]], contract_file: str,
                        sdc: SDC) -> Tuple[Dict[str, UnspecializedSourceFinder], Dict[str, Dict[int, Instrumentation]]]:
     source_finder_map: Dict[str, UnspecializedSourceFinder] = dict()
@@ -17,16 +17,33 @@ import json
 import logging
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Set, List, Tuple, Optional
 
-from CertoraProver.certoraMiniSpecParser import SpecImportLexer, SpecImportParser, SpecWithImports
+from CertoraProver.certoraMiniSpecParser import SpecWithImports, get_file_signature, spec_import_graph
 from CertoraProver.certoraContextClass import CertoraContext
 from Shared import certoraUtils as Util
 import CertoraProver.certoraApp as App
 
 build_logger = logging.getLogger("build_conf")
 
+SPEC_COPY_THREADS = 8
+
+# main spec file -> (signatures of the main spec and of every spec it imports transitively, the imports to their
+# locations, the spec files to their import declarations), see get_spec_with_imports
+_resolved_spec_imports: Dict[str, Tuple[Dict[str, Tuple[int, int]], Dict[str, Set[str]], Dict[str, Set[str]]]] = {}
+
+
+def copy_spec_file(source: str, target: str) -> None:
+    """
+    Copies a spec file, unless target is already a copy of it (copies keep the size and modification time of source)
+    """
+    if os.path.isfile(target) and get_file_signature(Path(target)) == get_file_signature(Path(source)):
+        return
+    Util.detach_file(Path(target))  # target may be hard linked by a snapshot of .certora_sources
+    shutil.copy2(source, target)
+
 
 class CertoraVerifyGenerator:
     def __init__(self, context: CertoraContext):
@@ -108,70 +125,84 @@ class CertoraVerifyGenerator:
     def get_spec_with_imports(self, spec_file: str) -> SpecWithImports:
         seen_abspath_imports_to_locs: Dict[str, Set[str]] = dict()
         spec_file_to_orig_imports: Dict[str, Set[str]] = dict()
-        self.check_and_collect_imported_spec_files(Path(spec_file), seen_abspath_imports_to_locs, [spec_file],
-                                                   spec_file_to_orig_imports)
+        resolved = _resolved_spec_imports.get(spec_file)
+        if resolved is not None and self.__spec_files_unchanged(resolved[0]):
+            build_logger.debug(f"The imports of {spec_file} are unchanged since they were last collected")
+            seen_abspath_imports_to_locs = {k: set(v) for k, v in resolved[1].items()}
+            spec_file_to_orig_imports = {k: set(v) for k, v in resolved[2].items()}
+        else:
+            self.check_and_collect_imported_spec_files(Path(spec_file), seen_abspath_imports_to_locs, [spec_file],
+                                                       spec_file_to_orig_imports)
+            spec_import_graph.save()
+            signatures = {f: get_file_signature(Path(f)) for f in [spec_file, *seen_abspath_imports_to_locs]}
+            _resolved_spec_imports[spec_file] = (signatures,
+                                                 {k: set(v) for k, v in seen_abspath_imports_to_locs.items()},
+                                                 {k: set(v) for k, v in spec_file_to_orig_imports.items()})
         # will start with spec_idx == 0 to give the imports the unique names starting with 1
         return SpecWithImports(spec_file, 0, seen_abspath_imports_to_locs, spec_file_to_orig_imports)
 
+    @staticmethod
+    def __spec_files_unchanged(signatures: Dict[str, Tuple[int, int]]) -> bool:
+        try:
+            return all(get_file_signature(Path(f)) == signature for f, signature in signatures.items())
+        except OSError:
+            return False
+
     def check_and_collect_imported_spec_files(self, spec_file: Path, seen_abspath_imports_to_locs: Dict[str, Set[str]],
                                               dfs_stack: List[str],
                                               spec_file_to_orig_imports: Dict[str, Set[str]]) -> None:
-        with spec_file.open() as f:
-            spec_content = f.read()
-            spec_import_lexer = SpecImportLexer(spec_file, spec_content)
-            spec_import_parser = SpecImportParser(spec_import_lexer)
-            imports_with_locs = spec_import_parser.parse(spec_import_lexer.tokenize(spec_content))
-
-            if imports_with_locs:
-                spec_file_to_orig_imports[str(spec_file)] = set()
-                for orig_import_to_loc in imports_with_locs:
-                    spec_file_to_orig_imports[str(spec_file)].add(orig_import_to_loc[0])
-
-            build_logger.debug(fr'In {spec_file}, found the imports: {imports_with_locs}')
-            if spec_import_parser.parse_error_msgs:  # We have parsing errors
-                errors_str = '\n'.join(spec_import_parser.parse_error_msgs)
-                raise Util.CertoraUserInputError(f'Could not parse {spec_file} '
-                                                 f'due to the following errors:\n{errors_str}')
-
-            abspath_imports_with_locs = list(map(
-                lambda path_to_loc: (Util.abs_posix_path_relative_to_root_file(Path(path_to_loc[0]), spec_file),
-                                     path_to_loc[1]),
-                imports_with_locs))
-
-            invalid_imports_with_locs = [p for p in abspath_imports_with_locs if not os.path.isfile(p[0]) or
-                                         os.path.splitext(p[0])[1] != '.spec']
-
-            def path_to_loc_str(path_to_loc: Tuple[Path, str]) -> str:
-                return f'{path_to_loc[1]}:\"{path_to_loc[0]}\"'
-
-            if invalid_imports_with_locs:
-                invalid_paths_str = '\n'.join(map(path_to_loc_str, invalid_imports_with_locs))
+        imports_with_locs, parse_error_msgs = spec_import_graph.get_imports(spec_file)
+
+        if imports_with_locs:
+            spec_file_to_orig_imports[str(spec_file)] = set()
+            for orig_import_to_loc in imports_with_locs:
+                spec_file_to_orig_imports[str(spec_file)].add(orig_import_to_loc[0])
+
+        build_logger.debug(fr'In {spec_file}, found the imports: {imports_with_locs}')
+        if parse_error_msgs:  # We have parsing errors
+            errors_str = '\n'.join(parse_error_msgs)
+            raise Util.CertoraUserInputError(f'Could not parse {spec_file} '
+                                             f'due to the following errors:\n{errors_str}')
+
+        abspath_imports_with_locs = list(map(
+            lambda path_to_loc: (Util.abs_posix_path_relative_to_root_file(Path(path_to_loc[0]), spec_file),
+                                 path_to_loc[1]),
+            imports_with_locs))
+
+        invalid_imports_with_locs = [p for p in abspath_imports_with_locs if not os.path.isfile(p[0]) or
+                                     os.path.splitext(p[0])[1] != '.spec']
+
+        def path_to_loc_str(path_to_loc: Tuple[Path, str]) -> str:
+            return f'{path_to_loc[1]}:\"{path_to_loc[0]}\"'
+
+        if invalid_imports_with_locs:
+            invalid_paths_str = '\n'.join(map(path_to_loc_str, invalid_imports_with_locs))
+            raise Util.CertoraUserInputError(
+                f'In {spec_file}, the following import declarations do not import existing .spec files:'
+                f'\n{invalid_paths_str}\n'
+            )
+
+        for import_path_to_loc in abspath_imports_with_locs:  # Visit each import declaration in a DFS fashion
+            if import_path_to_loc[0] in dfs_stack:  # We have cyclic imports :(((
+                imports_cycle = ' -->\n'.join(
+                    dfs_stack[dfs_stack.index(str(import_path_to_loc[0])):] + [str(import_path_to_loc[0])])
                 raise Util.CertoraUserInputError(
-                    f'In {spec_file}, the following import declarations do not import existing .spec files:'
-                    f'\n{invalid_paths_str}\n'
-                )
-
-            for import_path_to_loc in abspath_imports_with_locs:  # Visit each import declaration in a DFS fashion
-                if import_path_to_loc[0] in dfs_stack:  # We have cyclic imports :(((
-                    imports_cycle = ' -->\n'.join(
-                        dfs_stack[dfs_stack.index(str(import_path_to_loc[0])):] + [str(import_path_to_loc[0])])
-                    raise Util.CertoraUserInputError(
-                        f'In {spec_file}, the import declaration {path_to_loc_str(import_path_to_loc)} '
-                        f'leads to an imports\' cycle:\n{imports_cycle}')
-
-                import_loc_with_spec_file = f'{spec_file}:{import_path_to_loc[1]}'
-
-                # xxx condition should cast import_path_to_loc[0] here - apply after gaining more confidence
-                # (and it looks like we do not have much confidence in this code at all)
-                if import_path_to_loc[0] in seen_abspath_imports_to_locs:  # Visit each import declaration only once
-                    seen_abspath_imports_to_locs[str(import_path_to_loc[0])].add(import_loc_with_spec_file)
-                    continue
-
-                seen_abspath_imports_to_locs[str(import_path_to_loc[0])] = {import_loc_with_spec_file}
-                dfs_stack.append(str(import_path_to_loc[0]))
-                self.check_and_collect_imported_spec_files(Path(import_path_to_loc[0]), seen_abspath_imports_to_locs,
-                                                           dfs_stack, spec_file_to_orig_imports)
-                dfs_stack.pop()
+                    f'In {spec_file}, the import declaration {path_to_loc_str(import_path_to_loc)} '
+                    f'leads to an imports\' cycle:\n{imports_cycle}')
+
+            import_loc_with_spec_file = f'{spec_file}:{import_path_to_loc[1]}'
+
+            # xxx condition should cast import_path_to_loc[0] here - apply after gaining more confidence
+            # (and it looks like we do not have much confidence in this code at all)
+            if import_path_to_loc[0] in seen_abspath_imports_to_locs:  # Visit each import declaration only once
+                seen_abspath_imports_to_locs[str(import_path_to_loc[0])].add(import_loc_with_spec_file)
+                continue
+
+            seen_abspath_imports_to_locs[str(import_path_to_loc[0])] = {import_loc_with_spec_file}
+            dfs_stack.append(str(import_path_to_loc[0]))
+            self.check_and_collect_imported_spec_files(Path(import_path_to_loc[0]), seen_abspath_imports_to_locs,
+                                                       dfs_stack, spec_file_to_orig_imports)
+            dfs_stack.pop()
 
     def copy_specs(self) -> None:
         spec = self.verify_spec
@@ -179,10 +210,14 @@ class CertoraVerifyGenerator:
         Path(spec.eventual_path_to_spec).parent.mkdir(parents=True, exist_ok=True)
         build_logger.debug(f"copying spec file {spec.spec_file} to "
                            f"{Util.abs_posix_path(spec.eventual_path_to_spec)}")
-        shutil.copy2(spec.spec_file, spec.eventual_path_to_spec)
-        #  copy .spec imports
-        for import_srcpath, import_dstpath in spec.abspath_to_eventual_import_paths.items():
-            shutil.copy2(import_srcpath, import_dstpath)
+        #  copy the main .spec file and its .spec imports, independent copies are done concurrently
+        copies = [(spec.spec_file, spec.eventual_path_to_spec), *spec.abspath_to_eventual_import_paths.items()]
+        if len(copies) > 1:
+            with ThreadPoolExecutor(max_workers=min(SPEC_COPY_THREADS, len(copies))) as executor:
+                for _ in executor.map(lambda paths: copy_spec_file(paths[0], paths[1]), copies):
+                    pass
+        else:
+            copy_spec_file(spec.spec_file, spec.eventual_path_to_spec)
 
     def get_spec_files(self) -> Set[Path]:
         specs: Set[Path] = set()
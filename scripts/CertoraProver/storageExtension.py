@@ -14,12 +14,15 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import re
+import copy
+import json
 import time
 import hashlib
 import sys
+from dataclasses import dataclass
 from pathlib import Path
 import logging
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 try:
     from typing import TypeAlias
 except ImportError:
@@ -40,6 +43,22 @@ NewStorageInfo   = Tuple[NewStorageFields, NewStorageTypes]
 
 storage_extension_logger = logging.getLogger("storage_extension")
 
+# Storage info extracted from harnesses, by get_namespace_storage_key. Memoized so that repeated builds in the same
+# process (e.g. the runs of certoraBatchRun) do not compile the same harness again
+_namespace_storage_info: Dict[str, NewStorageInfo] = {}
+
+
+@dataclass
+class NamespaceHarness:
+    """
+    A contract with namespaced storage, whose storage info is extracted by compiling a harness contract
+    """
+    original_file: str  # the file declaring the contract
+    contract_name: str
+    ns_storage: Set[NameSpacedStorage]
+    target_file: str  # the target file in whose compilation unit the contract was found
+    cache_key: str  # see get_namespace_storage_key
+
 
 def erc7201_of_node(n: Dict[str, Any]) -> Optional[NameSpacedStorage]:
     """
@@ -136,7 +155,8 @@ def get_next_file_index(self_file_to_sdc_name: Dict[Path, str], max_index: int =
 
 def write_harness_contract(tmp_file: Any,
                            harness_name: str,
-                           ns_storage: Set[NameSpacedStorage]) -> Dict[str, str]:
+                           ns_storage: Set[NameSpacedStorage],
+                           type_prefix: str = "") -> Dict[str, str]:
     """
     Write the harness contract with dummy fields to the temporary file.
 
@@ -144,6 +164,7 @@ def write_harness_contract(tmp_file: Any,
         tmp_file: The temporary file to write to
         harness_name: Name of the harness contract
         ns_storage: Set of namespace storage declarations
+        type_prefix: Prefix of the type names, e.g. the alias under which their file is imported
 
     Returns:
         Dict[str, str]: Mapping from variable names to their slots
@@ -164,12 +185,43 @@ def write_harness_contract(tmp_file: Any,
         slot = str(erc7201.erc7201(namespace.encode('utf-8')))
 
         var_to_slot[var_name] = slot
-        tmp_file.write(f"\t{type_name} {var_name};\n")
+        tmp_file.write(f"\t{type_prefix}{type_name} {var_name};\n")
 
     tmp_file.write("}\n")
     return var_to_slot
 
 
+def write_batched_harness_contracts(tmp_file: Any,
+                                    harnesses: List[NamespaceHarness]) -> Dict[str, Tuple[str, Dict[str, str]]]:
+    """
+    Write a harness contract for each of the given contracts to a single temporary file, so they are all compiled
+    at once. Every original file is imported under its own alias, so declarations with the same name in different
+    files do not clash.
+
+    Args:
+        tmp_file: The temporary file to write to
+        harnesses: The contracts to write harness contracts for
+
+    Returns:
+        Dict[str, Tuple[str, Dict[str, str]]]: For each harness cache key, the name of its harness contract and the
+            mapping from variable names to their slots
+    """
+    file_aliases: Dict[str, str] = {}
+    for harness in harnesses:
+        if harness.original_file not in file_aliases:
+            file_aliases[harness.original_file] = f"ns_file_{len(file_aliases)}"
+            tmp_file.write(f"import \"{harness.original_file}\" as {file_aliases[harness.original_file]};\n")
+    tmp_file.write("\n")
+
+    harness_contracts = {}
+    for harness in harnesses:
+        harness_name = generate_harness_name(f"{harness.original_file}_{harness.contract_name}")
+        var_to_slot = write_harness_contract(tmp_file, harness_name, harness.ns_storage,
+                                             f"{file_aliases[harness.original_file]}.")
+        harness_contracts[harness.cache_key] = (harness_name, var_to_slot)
+    return harness_contracts
+
+
 def extract_harness_contract_layout(sdcs: List[SDC], harness_name: str) -> Dict[str, Any]:
     """
     Extract the storage layout of the harness contract.
@@ -245,6 +297,54 @@ def get_namespace_storage_from_ast(def_node: Dict[str, Any]) -> Set[NameSpacedSt
     return ns_storage
 
 
+def get_compilation_unit_hash(unit_files: Iterable[str]) -> Optional[str]:
+    """
+    Hashes the contents of the files of a compilation unit. The namespaced structs may use types declared anywhere in
+    the unit (e.g. nested or imported structs), which their AST nodes only reference by id and name.
+
+    Returns:
+        Optional[str]: The hash, or None if some file cannot be read (the storage info must not be memoized then).
+    """
+    digest = hashlib.sha256()
+    for unit_file in sorted(set(unit_files)):
+        try:
+            content = Path(unit_file).read_bytes()
+        except OSError:
+            return None
+        digest.update(f"{unit_file}\0{len(content)}\0".encode())
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def get_namespace_storage_key(def_node: Dict[str, Any], original_file: str, compiler_version: str,
+                              unit_hash: str) -> str:
+    """
+    Computes the key under which the storage info of a contract with namespaced storage is memoized: a hash of the
+    AST of its namespaced structs and of the contents of its compilation unit (see get_compilation_unit_hash).
+
+    Args:
+        def_node: The AST node of the contract definition.
+        original_file: The file declaring the contract.
+        compiler_version: The compiler the harness is compiled with.
+        unit_hash: The hash of the files of the compilation unit the contract was found in.
+
+    Returns:
+        str: The memoization key.
+    """
+    struct_nodes = [n for n in def_node.get("nodes") or [] if erc7201_of_node(n) is not None]
+    key_data = json.dumps([original_file, compiler_version, unit_hash, struct_nodes], sort_keys=True, default=str)
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+def get_memoized_storage_info(cache_key: str) -> Optional[NewStorageInfo]:
+    info = _namespace_storage_info.get(cache_key)
+    return copy.deepcopy(info) if info is not None else None
+
+
+def memoize_storage_info(cache_key: str, info: NewStorageInfo) -> None:
+    _namespace_storage_info[cache_key] = copy.deepcopy(info)
+
+
 def apply_extensions(target_contract: ContractInSDC,
                      extensions: Set[str],
                      to_add: Dict[str, NewStorageInfo]) -> None:
@@ -20,6 +20,7 @@ from CertoraProver.certoraBuildDataClasses import SDC, Instrumentation, Replace,
 from CertoraProver.certoraOffsetConverter import OffsetConverter
 from CertoraProver.certoraSourceFinders import find_char
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import profiled
 
 
 def is_unchecked_block(node: Any) -> bool:
@@ -118,6 +119,7 @@ def add_instrumentation(inst_dict: dict[int, Instrumentation], k: int, v: Instru
         inst_dict[k] = v
 
 
+@profiled("overflow instrumentation")
 def generate_overflow_instrumentation(asts: dict[str, dict[str, dict[int, Any]]], contract_file: str, sdc: SDC,
                                       offset_converters: dict[str, OffsetConverter]) \
         -> tuple[dict[str, dict[int, Instrumentation]], dict[str, tuple[str, list[str]]]]:
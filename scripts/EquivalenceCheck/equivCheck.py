@@ -20,14 +20,17 @@ import sys
 import json
 from pathlib import Path
 from argparse import Namespace, ArgumentParser
-from typing import List, TypeVar, Union, Optional
+from typing import Any, Dict, List, TypeVar, Union, Optional
 
 
 # Credit for this work goes to Nick and Netanel.
 
 scripts_dir_path = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(scripts_dir_path))
-from CertoraProver.certoraBuild import InputConfig, CertoraBuildGenerator, FunctionSig, VY
+from CertoraProver.certoraBuild import InputConfig, CertoraBuildGenerator, FunctionSig, VY, build_from_scratch, \
+    build_source_tree
+from CertoraProver.certoraBuildCacheManager import CertoraBuildCacheManager
+from CertoraProver.Compiler.CompilerCollectorFactory import get_relevant_compiler
 from CertoraProver.certoraVerifyGenerator import CertoraVerifyGenerator
 from CertoraProver.certoraContext import get_args
 from certoraRun import run_certora
@@ -51,6 +54,7 @@ FUNCTIONS = "functions"
 CONTRACTS = "contracts"
 PROVER_ARGS = "prover_args"
 OPTIMISTIC_FALLBACK_SETTING = "optimistic_fallback"
+BUILD_CACHE = "build_cache"
 
 T = TypeVar("T", str, Path)
 
@@ -143,30 +147,60 @@ class EquivalenceChecker:
         print("Go check the link above to track the progress of your job and see results")
 
     def build_fun_signatures(self) -> None:
+        """
+        Compiles both contracts in a single build session, and collects the signatures of their functions from it.
+        The build is saved in the build cache, so the verification run (see generate_conf_file) does not compile the
+        contracts again.
+        """
         if self.path is None:
             raise RuntimeError("Expected path to not be None.")
-        for i in range(2):
-            file_i = self.files[i]
-            contract_i = self.contracts[i]
-            solc_i = self.solcs[i]
+        if self.conf_mode:
+            if self.conf_path is None:
+                raise RuntimeError("Running in conf mode but conf_path is not set.")
+            with self.conf_path.open() as conf_file:
+                contents = json.load(conf_file)
+        else:
             with (self.path / SANITY_CONF_PATH).open() as sanity_conf:
                 contents = json.load(sanity_conf)
-                append_unique(contents[FILES], str(file_i))
-                contents[SOLC] = solc_i
-                contents[VERIFY] = f'{contract_i}:{self.path / SANITY_PATH}'
-                contents["build_only"] = True
-            tmp_conf = self.path / TMP_SANITY_CONF
-            with tmp_conf.open('w') as temp_sanity:
-                json.dump(contents, temp_sanity, indent=4)
+            self.set_compilers(contents)
+        contents[FILES] = list()
+        for file in self.files:
+            append_unique(contents[FILES], str(file))
+        contents[VERIFY] = f'{self.contracts[0]}:{self.path / SANITY_PATH}'
+        contents["build_only"] = True
+        contents[BUILD_CACHE] = True
+
+        tmp_conf = self.path / TMP_SANITY_CONF
+        with tmp_conf.open('w') as temp_sanity:
+            json.dump(contents, temp_sanity, indent=4)
+        try:
             context = get_args([str(tmp_conf)], App.EvmApp)
             config = InputConfig(context)
+            context.main_cache_key = CertoraBuildCacheManager.get_main_cache_key(context)
             cfb = CertoraBuildGenerator(config, context)
             certora_verify_generator = CertoraVerifyGenerator(context)
             certora_verify_generator.copy_specs()
             certora_verify_generator.dump()
-            cfb.build(certora_verify_generator)
+            cached_files = build_from_scratch(context, cfb, certora_verify_generator, True)
+            sources = cfb.collect_sources(context, certora_verify_generator, cached_files.all_contract_files)
+            build_source_tree(sources, context)
+            if cached_files.may_store_in_build_cache:
+                CertoraBuildCacheManager.save_build_cache(context, cached_files)
+        finally:
             os.remove(tmp_conf)
-            self.funcs.append(cfb.collect_func_source_code_signatures_source(file_i, contract_i, solc_i))
+
+        for file_i, contract_i in zip(self.files, self.contracts):
+            solc_i = get_relevant_compiler(Path(file_i), context)
+            self.funcs.append(cfb.collect_func_source_code_signatures_source(Path(file_i), contract_i, solc_i))
+
+    def set_compilers(self, contents: Dict[str, Any]) -> None:
+        """
+        Sets the compilers given on the command line in the conf contents, through compiler_map if they differ
+        """
+        if self.solcs[0] == self.solcs[1]:
+            contents[SOLC] = self.solcs[0]
+        else:
+            contents[COMPILER_MAP] = {self.contracts[0]: self.solcs[0], self.contracts[1]: self.solcs[1]}
 
     def read_input_conf_file(self) -> None:
         if self.args is None:
@@ -339,13 +373,12 @@ class EquivalenceChecker:
                     if 'server' in contents:
                         del contents['server']
                     contents['tool_output'] = 'out.json'
-                if self.solcs[0] == self.solcs[1]:
-                    contents[SOLC] = self.solcs[0]
-                else:
-                    contents[COMPILER_MAP] = {self.contracts[0]: self.solcs[0], self.contracts[1]: self.solcs[1]}
+                self.set_compilers(contents)
                 contents['msg'] = f'EquivalenceCheck of {self.functions[0]} and {self.functions[1]}'
         contents[VERIFY] = f'{self.contracts[0]}:{spec}'
         contents[OPTIMISTIC_FALLBACK_SETTING] = True
+        # the contracts were already built by build_fun_signatures with the same files and compilers
+        contents[BUILD_CACHE] = True
 
         # set prover_args. optimisticFallback is always set for consistent send() operations
         contents.setdefault(PROVER_ARGS, [])
@@ -0,0 +1,147 @@
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+A hierarchical timing tracer for certoraRun.
+
+Phases are timed with the profile() context manager or the profiled() decorator, and phases that start while
+another phase is running are nested in it. At the end of a run, dump() writes the trace in the Chrome trace event
+format (can be opened with chrome://tracing or https://ui.perfetto.dev) and returns a table that sums up the time
+spent in every phase. Self time is the time spent in a phase and not in any of its nested phases.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, TypeVar, cast
+
+from tabulate import tabulate
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+@dataclass
+class ProfileEvent:
+    name: str
+    category: str
+    start: float  # seconds since the profiler was reset
+    duration: float  # seconds
+    self_time: float  # seconds, excluding nested phases
+    thread_id: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class BuildProfiler:
+    """
+    Collects the timing events of a single run. Nesting is tracked per thread.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[ProfileEvent] = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+
+    def reset(self) -> None:
+        self.events = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+
+    def _nested_time_stack(self) -> List[float]:
+        """
+        @return for every running phase of the current thread, the total time of the phases nested in it
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def profile(self, name: str, category: str = "build", **args: Any) -> Iterator[None]:
+        stack = self._nested_time_stack()
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            nested_time = stack.pop()
+            if stack:
+                stack[-1] += duration
+            self.events.append(ProfileEvent(name, category, start - self.origin, duration, duration - nested_time,
+                                            threading.get_ident(), {k: str(v) for k, v in args.items()}))
+
+    def summary(self) -> str:
+        """
+        @return a table with the number of calls, the total time and the self time of every phase, slowest first
+        """
+        totals: Dict[str, List[float]] = OrderedDict()
+        for event in self.events:
+            calls_total_self = totals.setdefault(event.name, [0, 0.0, 0.0])
+            calls_total_self[0] += 1
+            calls_total_self[1] += event.duration
+            calls_total_self[2] += event.self_time
+        rows = [[name, int(calls), round(total, 4), round(self_time, 4)]
+                for name, (calls, total, self_time) in sorted(totals.items(), key=lambda item: -item[1][1])]
+        return tabulate(rows, headers=["Phase", "Calls", "Total (s)", "Self (s)"])
+
+    def dump(self, trace_file: Path) -> str:
+        """
+        Writes the collected events to trace_file in the Chrome trace event format, and their summary table next to it
+        @return the summary table of the events
+        """
+        pid = os.getpid()
+        trace_events = [{"name": event.name,
+                         "cat": event.category,
+                         "ph": "X",  # a complete event, with both a start time and a duration
+                         "ts": round(event.start * 1e6),
+                         "dur": round(event.duration * 1e6),
+                         "pid": pid,
+                         "tid": event.thread_id,
+                         "args": event.args}
+                        for event in sorted(self.events, key=lambda e: e.start)]
+        with trace_file.open("w") as trace_handle:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, trace_handle, indent=1)
+        summary = self.summary()
+        trace_file.with_suffix(".txt").write_text(summary + "\n")
+        return summary
+
+
+# The profiler of the current run, reset by certoraRun at the start of every run
+build_profiler = BuildProfiler()
+
+
+def profile(name: str, category: str = "build", **args: Any) -> ContextManager[None]:
+    """
+    A context manager that records the time spent in its body as the phase [name]. [args] are attached to the event
+    """
+    return build_profiler.profile(name, category, **args)
+
+
+def profiled(name: str, category: str = "build") -> Callable[[F], F]:
+    """
+    A decorator that records the time spent in every call of the decorated function as the phase [name]
+    """
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with build_profiler.profile(name, category):
+                return func(*args, **kwargs)
+        return cast(F, wrapper)
+    return decorator
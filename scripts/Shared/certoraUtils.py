@@ -14,6 +14,7 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import csv
+import filecmp
 import json
 import os
 import io
@@ -26,13 +27,12 @@ import platform
 import shlex
 import shutil
 import re
-import queue
 import math
 import urllib3.util
-from collections import defaultdict
+from collections import defaultdict, deque
 from types import SimpleNamespace
 
-from typing import Any, Callable, Dict, List, Optional, Set, Union, Generator, Tuple, Iterable, Sequence, TypeVar, OrderedDict
+from typing import AbstractSet, Any, Callable, Deque, Dict, FrozenSet, List, Optional, Set, Union, Generator, Tuple, Iterable, Sequence, TypeVar, OrderedDict
 from pathlib import Path
 import json5
 
@@ -40,7 +40,9 @@ scripts_dir_path = Path(__file__).parent.parent.resolve()  # containing director
 sys.path.insert(0, str(scripts_dir_path))
 from contextlib import contextmanager
 from Shared.ExpectedComparator import ExpectedComparator
+from Shared.certoraProfiler import profile, profiled
 import logging
+import logging.handlers
 import time
 import tempfile
 from datetime import datetime
@@ -77,6 +79,9 @@ DEFAULT_VYPER_COMPILER = 'vyper'
 ENVVAR_CERTORA = "CERTORA"
 KEY_SIGNUP_URL = "https://www.certora.com/signup"
 CERTORA_INTERNAL_ROOT = Path(".certora_internal")
+# The files that are shared by all the runs of a project (e.g. the recent jobs) stay here even when
+# CERTORA_INTERNAL_ROOT is moved for a run (see certoraBatchRun)
+CERTORA_PROJECT_INTERNAL_ROOT = CERTORA_INTERNAL_ROOT
 CERTORA_BUILD_CACHE_DIR_NAME = "build_cache"
 PRODUCTION_PACKAGE_NAME = "certora-cli"
 BETA_PACKAGE_NAME = "certora-cli-beta"
@@ -94,6 +99,7 @@ PACKAGE_FILE = Path("package.json")
 REMAPPINGS_FILE = Path("remappings.txt")
 FOUNDRY_TOML_FILE = Path("foundry.toml")
 RECENT_JOBS_FILE = Path(".certora_recent_jobs.json")
+RECENT_JOBS_LOG_FILE = Path(".certora_recent_jobs.jsonl")
 LAST_CONF_FILE = Path("run.conf")
 EMV_JAR = Path("emv.jar")
 CERTORA_SOURCES = Path(".certora_sources")
@@ -227,6 +233,13 @@ def get_certora_build_file() -> Path:
     return path_in_build_directory(Path(".certora_build.json"))
 
 
+def get_build_profile_file() -> Path:
+    """
+    The timing trace of the run, see certoraProfiler
+    """
+    return path_in_build_directory(Path("build_profile.json"))
+
+
 def get_certora_verify_file() -> Path:
     return path_in_build_directory(Path(".certora_verify.json"))
 
@@ -262,6 +275,14 @@ def get_debug_log_file() -> Path:
     return path_in_build_or_internal(Path("certora_debug_log.txt"))
 
 
+def get_jar_stderr_file() -> Path:
+    """
+    The standard error of the jars run by run_jar_cmd. Every run appends to it, after a line with its command.
+    Rotated when it gets too big, so it holds the most recent output of the jar runs
+    """
+    return path_in_build_or_internal(Path("jar_stderr.txt"))
+
+
 def get_extension_info_file() -> Path:
     return path_in_build_directory(Path(".vscode_extension_info.json"))
 
@@ -275,7 +296,11 @@ def get_zip_output_url_file() -> Path:
 
 
 def get_recent_jobs_file() -> Path:
-    return CERTORA_INTERNAL_ROOT / RECENT_JOBS_FILE
+    return CERTORA_PROJECT_INTERNAL_ROOT / RECENT_JOBS_FILE
+
+
+def get_recent_jobs_log_file() -> Path:
+    return CERTORA_PROJECT_INTERNAL_ROOT / RECENT_JOBS_LOG_FILE
 
 
 # for both files and directories
@@ -283,6 +308,10 @@ def get_from_certora_internal(name: str) -> Path:
     return CERTORA_INTERNAL_ROOT / name
 
 
+def get_from_project_internal(name: str) -> Path:
+    return CERTORA_PROJECT_INTERNAL_ROOT / name
+
+
 def get_last_conf_file() -> Path:
     return path_in_build_directory(LAST_CONF_FILE)
 
@@ -531,6 +560,87 @@ def safe_merge_folder(source: Path, dest: Path, ignore_patterns: Callable[[str,
     shutil.rmtree(copy_temp, ignore_errors=True)
 
 
+def __list_folder(source: Path, ignore_patterns: Callable[[str, List[str]], Iterable[str]]) -> Tuple[List[Path], List[Path]]:
+    """
+    Lists the directories and the files under source, relative to it, skipping the ones matched by ignore_patterns
+    (with the semantics of the ignore parameter of shutil.copytree)
+    """
+    dirs: List[Path] = []
+    files: List[Path] = []
+    for dir_path, dir_names, file_names in os.walk(source):
+        ignored = set(ignore_patterns(dir_path, dir_names + file_names))
+        dir_names[:] = [d for d in dir_names if d not in ignored]
+        rel_dir = Path(dir_path).relative_to(source)
+        dirs.extend(rel_dir / d for d in dir_names)
+        files.extend(rel_dir / f for f in file_names if f not in ignored)
+    return dirs, files
+
+
+def __link_or_copy(source: Path, dest: Path) -> None:
+    try:
+        os.link(source, dest)
+    except OSError:
+        # e.g., the file system does not support hard links, or source and dest are on different devices
+        shutil.copy2(source, dest)
+
+
+@profiled("snapshot sources")
+def snapshot_folder(source: Path, dest: Path, ignore_patterns: Callable[[str, List[str]], Iterable[str]]) -> None:
+    """
+    Creates dest as a snapshot of source. Assume dest does not exist.
+    Files of the snapshot are hard links to the files of source where possible, so taking a snapshot does not copy
+    file contents. Therefore, as long as the snapshot is in use, files of source must be replaced rather than modified
+    in place (see detach_file).
+    Like safe_copy_folder, dest may be a subdirectory of source, since the files are listed before dest is created.
+    """
+    dirs, files = __list_folder(source, ignore_patterns)
+    dest.mkdir(parents=True)
+    for d in dirs:
+        (dest / d).mkdir(parents=True, exist_ok=True)
+    for f in files:
+        __link_or_copy(source / f, dest / f)
+
+
+@profiled("restore sources")
+def restore_snapshot(snapshot: Path, dest: Path, ignore_patterns: Callable[[str, List[str]], Iterable[str]],
+                     link: bool = True) -> List[Path]:
+    """
+    Rolls dest back to a snapshot taken by snapshot_folder. Only files that were replaced, modified or removed since the
+    snapshot was taken are restored. Files that are not in the snapshot are left untouched.
+    @param link: if True, restored files are hard links to the snapshot where possible, like the files of the snapshot.
+                 Must be False when dest is not ours (e.g. the build directory of a user's package), since whoever
+                 writes there may modify files in place and would change the snapshot through a shared file. Files of
+                 dest that are hard links to the snapshot are then replaced by copies as well.
+    @return the restored files, relative to dest
+    """
+    restored = []
+    _, files = __list_folder(snapshot, ignore_patterns)
+    for f in files:
+        snapshot_file = snapshot / f
+        dest_file = dest / f
+        if dest_file.is_file():
+            if os.path.samefile(snapshot_file, dest_file):
+                if link:
+                    continue
+            elif filecmp.cmp(snapshot_file, dest_file, shallow=False):  # a file rewritten in place may keep its stat
+                continue
+            dest_file.unlink()
+        dest_file.parent.mkdir(parents=True, exist_ok=True)
+        if link:
+            __link_or_copy(snapshot_file, dest_file)
+        else:
+            shutil.copy2(snapshot_file, dest_file)
+        restored.append(f)
+    return restored
+
+
+def detach_file(path: Path) -> None:
+    """
+    Removes path before it is rewritten, so that snapshots that hard link to it (see snapshot_folder) keep their content
+    """
+    path.unlink(missing_ok=True)
+
+
 def as_posix(path: str) -> str:
     """
     Converts path from windows to unix
@@ -799,7 +909,7 @@ def split_by_delimiter_and_ignore_character(input_str: str, delimiter: str, igno
     return substrings
 
 
-def string_distance_function(input_str: str, dictionary_str: str) -> float:
+def string_distance_function(input_str: str, dictionary_str: str, max_dist: float = math.inf) -> float:
     """
     Calculates a modified levenshtein distance between two strings. The distance function is modified to penalize less
     for more common user mistakes.
@@ -811,6 +921,8 @@ def string_distance_function(input_str: str, dictionary_str: str) -> float:
 
     :param input_str: the string the user gave as input, error-prone
     :param dictionary_str: a legal string we compare the wrong input to
+    :param max_dist: once the distance is known to be larger than max_dist, the calculation stops and a lower bound of
+                     the distance (that is larger than max_dist) is returned
     :return a distance measure between the two string. A low number indicates a high probably the user to give the
             dictionary string as input
     """
@@ -836,43 +948,125 @@ def string_distance_function(input_str: str, dictionary_str: str) -> float:
     constant
     """
 
-    # Initialize matrix of zeros
+    # The matrix is calculated column by column, keeping only the previous column
     rows = len(input_str) + 1
     cols = len(dictionary_str) + 1
 
-    distance_matrix = []
-    for row in range(rows):
-        column = []
-        for j in range(cols):
-            column.append(0.0)
-        distance_matrix.append(column)
-
-    # Populate matrix of zeros with the indices of each character of both strings
-    for i in range(1, rows):
-        distance_matrix[i][0] = i
-    for k in range(1, cols):
-        distance_matrix[0][k] = k
+    # The first column holds the indices of each character of the input string
+    prev_column: List[float] = [float(i) for i in range(rows)]
 
     # Calculate modified Levenshtein distance
     for col in range(1, cols):
+        dictionary_char = dictionary_str[col - 1]
+        column: List[float] = [float(col)]
         for row in range(1, rows):
-            if input_str[row - 1] == dictionary_str[col - 1]:
+            input_char = input_str[row - 1]
+            if input_char == dictionary_char:
                 # No cost if the characters are the same up to casing in the two strings
                 cost: float = 0
-            elif input_str[row - 1] == '_' or dictionary_str[col - 1] == '_':
+            elif input_char == '_' or dictionary_char == '_':
                 # common mistake
                 cost = 0.1
             else:
                 # full cost
                 cost = 1
-            distance_matrix[row][col] = min(distance_matrix[row - 1][col] + cost,  # Cost of deletions
-                                            distance_matrix[row][col - 1] + cost,  # Cost of insertions
-                                            distance_matrix[row - 1][col - 1] + cost)  # Cost of substitutions
+            column.append(min(column[row - 1] + cost,  # Cost of deletions
+                              prev_column[row] + cost,  # Cost of insertions
+                              prev_column[row - 1] + cost))  # Cost of substitutions
+        prev_column = column
+        # Costs are non-negative and every path to the last cell passes through this column
+        if min(column) > max_dist:
+            return min(column)
 
-    return distance_matrix[rows - 1][cols - 1]
+    return prev_column[rows - 1]
 
 
-def get_closest_strings(input_word: str, word_dictionary: List[str],
+class SuggestionIndex:
+    """
+    An index of a dictionary of words, built once, that finds the closest words to an input word with respect to
+    string_distance_function.
+
+    string_distance_function is not a metric (prefixes and repeated characters are almost free), so a metric tree
+    cannot be used. Instead, every word is stored with the set of its characters, and a lower bound of its distance
+    from the input word is computed from the characters that appear in only one of the two. The exact (quadratic)
+    distance is computed only for the words whose lower bound is within the maximal distance.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self.words = list(words)
+        self.__char_sets = [frozenset(word.lower()) for word in self.words]
+
+    @staticmethod
+    def __missing_chars_cost(missing: AbstractSet[str], other_has_underscore: bool) -> float:
+        """
+        Every character that is missing from the other string must be deleted, inserted or replaced, which costs
+        0.1 if either character is an underscore and 1 otherwise
+        """
+        if other_has_underscore:
+            return 0.1 * len(missing)
+        return len(missing) - 0.9 * ('_' in missing)
+
+    def distance_lower_bound(self, input_chars: AbstractSet[str], word_chars: AbstractSet[str]) -> float:
+        """
+        @param input_chars: the characters of the lowercase input word
+        @param word_chars: the characters of a lowercase dictionary word
+        @return a lower bound of string_distance_function for the two words, unless one is a prefix of the other
+        """
+        input_cost = self.__missing_chars_cost(input_chars - word_chars, '_' in word_chars)
+        word_cost = self.__missing_chars_cost(word_chars - input_chars, '_' in input_chars)
+        # a replacement handles a missing character of both words at once
+        return max(input_cost, word_cost)
+
+    def candidates(self, input_word: str, max_dist: float, max_spread: float = math.inf) -> List[Tuple[float, str]]:
+        """
+        @param input_word: the word we look for the closest matches of
+        @param max_dist: the maximal distance of a candidate
+        @param max_spread: the maximal difference between the distances of a candidate and of the closest word
+        @return all the words within max_dist from the input word and within max_spread from the closest word, with
+                their distances, closest first
+        """
+        lower_input = input_word.lower()
+        input_chars = set(lower_input)
+        bounded_words = []
+        for word, word_chars in zip(self.words, self.__char_sets):
+            lower_word = word.lower()
+            if lower_word.startswith(lower_input) or lower_input.startswith(lower_word):
+                bound = string_distance_function(input_word, word)
+            else:
+                bound = self.distance_lower_bound(input_chars, word_chars)
+            if bound <= max_dist + 1e-9:
+                bounded_words.append((bound, word))
+
+        # the most promising words first, so the distance threshold drops quickly
+        bounded_words.sort()
+        threshold = max_dist
+        candidates = []
+        for bound, word in bounded_words:
+            if bound > threshold + 1e-9:
+                break
+            dist = string_distance_function(input_word, word, threshold + 1e-9)
+            if dist <= threshold + 1e-9:
+                candidates.append((dist, word))
+                threshold = min(threshold, dist + max_spread)
+        return sorted(c for c in candidates if c[0] <= threshold + 1e-9)
+
+
+# The suggestion index of every dictionary that suggestions were made from, see get_suggestion_index
+_suggestion_indexes: Dict[FrozenSet[str], SuggestionIndex] = {}
+
+
+def get_suggestion_index(words: Iterable[str]) -> SuggestionIndex:
+    """
+    @return the SuggestionIndex of a dictionary of words. Every dictionary is indexed once, and its index is reused by
+            later suggestions from the same dictionary
+    """
+    key = frozenset(words)
+    if key not in _suggestion_indexes:
+        _suggestion_indexes[key] = SuggestionIndex(sorted(key))
+    return _suggestion_indexes[key]
+
+
+def get_closest_strings(input_word: str, word_dictionary: Union[Iterable[str], SuggestionIndex],
                         distance: Callable[[str, str], float] = string_distance_function,
                         max_dist: float = 4, max_dist_ratio: float = 0.5, max_suggestions: int = 2,
                         max_delta: float = 0.2) -> List[str]:
@@ -881,7 +1075,9 @@ def get_closest_strings(input_word: str, word_dictionary: List[str],
     words from the dictionary, with respect to a distance function.
 
     :param input_word: The word we look for closest matches of.
-    :param word_dictionary: A collection of words to suggest matches from.
+    :param word_dictionary: A collection of words to suggest matches from, or a SuggestionIndex of them (which can only
+                            be used with the default distance function). With the default distance function, the index
+                            of a collection is taken from get_suggestion_index.
     :param distance: The distance function we use to measure proximity of words.
     :param max_dist: The maximal distance between words, over which no suggestions will be made.
     :param max_dist_ratio: A maximal ratio between the distance and the input word's length. No suggestions will be made
@@ -895,17 +1091,24 @@ def get_closest_strings(input_word: str, word_dictionary: List[str],
         # empty input word, nothing is close to that.
         return []
 
-    distance_queue: queue.PriorityQueue = queue.PriorityQueue()  # Ordered in a distance ascending order
-
-    for candidate_word in word_dictionary:
-        dist = distance(input_word, candidate_word)
-        distance_queue.put((dist, candidate_word))
+    if distance is string_distance_function:
+        index = word_dictionary if isinstance(word_dictionary, SuggestionIndex) else get_suggestion_index(word_dictionary)
+        # Ordered in a distance ascending order
+        # the suggestions are at most max_delta apart from each other
+        sorted_distances = index.candidates(input_word, min(max_dist, max_dist_ratio * len(input_word)),
+                                            max_suggestions * max_delta)
+    else:
+        if isinstance(word_dictionary, SuggestionIndex):
+            raise ValueError("A SuggestionIndex can only be used with the default distance function")
+        sorted_distances = sorted((distance(input_word, candidate_word), candidate_word)
+                                  for candidate_word in word_dictionary)
 
     all_suggestions: List[str] = []
     last_dist = None
 
-    while not distance_queue.empty() and len(all_suggestions) <= max_suggestions:
-        suggested_dist, suggested_rule = distance_queue.get()
+    for suggested_dist, suggested_rule in sorted_distances:
+        if len(all_suggestions) > max_suggestions:
+            break
         if suggested_dist > max_dist or suggested_dist / len(input_word) > max_dist_ratio:
             break  # The distances are monotonically increasing
         if (last_dist is None) or (suggested_dist - last_dist <= max_delta):
@@ -1038,8 +1241,15 @@ def is_java_installed(java_version: str) -> bool:
     return True
 
 
+# The number of the last lines of a jar's standard error that are kept in memory, and logged if the jar fails
+JAR_STDERR_TAIL_LINES = 1000
+JAR_STDERR_FILE_MAX_BYTES = 100 * 1024 * 1024
+JAR_STDERR_FILE_BACKUPS = 2
+
+
 def run_jar_cmd(jar_cmd: List[str], override_exit_code: bool, custom_error_message: Optional[str] = None,
-                logger_topic: Optional[str] = "run", print_output: bool = False, print_err: bool = True) -> int:
+                logger_topic: Optional[str] = "run", print_output: bool = False, print_err: bool = True,
+                stderr_subscribers: Optional[List[Callable[[str], None]]] = None) -> int:
     """
     @return: 0 on success, an error exit code otherwise
     @param override_exit_code if true, always returns 0 (ignores/overrides non-zero exit codes of the jar subprocess)
@@ -1048,6 +1258,7 @@ def run_jar_cmd(jar_cmd: List[str], override_exit_code: bool, custom_error_messa
     @param print_output If True, the process' standard output will be printed on the screen
     @param print_err If True, the process' standard error will be printed on the screen
     @param jar_cmd a command line that runs a jar file (CertoraProver or Typechecker)
+    @param stderr_subscribers callbacks that get every line of the process' standard error as soon as it is written
 
     One may be confused why we need both override_exit_code and print_err, that have a similar effect:
     logs are not printed if either override_exit_code is enabled or print_err is disabled.
@@ -1058,6 +1269,8 @@ def run_jar_cmd(jar_cmd: List[str], override_exit_code: bool, custom_error_messa
     The use case for setting override_exit_code is the comparison of expected files instead of the Prover's default
     exit code which is failure in any case of not all-successful rules.
 
+    The standard error is streamed: every line is written to get_jar_stderr_file() as it arrives, and only the last
+    JAR_STDERR_TAIL_LINES lines are kept in memory for the error report.
     """
     logger = logging.getLogger(logger_topic)
     try:
@@ -1066,10 +1279,28 @@ def run_jar_cmd(jar_cmd: List[str], override_exit_code: bool, custom_error_messa
         else:
             stdout_stream = subprocess.DEVNULL
 
-        run_result = \
-            subprocess.run(jar_cmd, shell=False, universal_newlines=True, stderr=subprocess.PIPE, stdout=stdout_stream)
+        stderr_tail: Deque[str] = deque(maxlen=JAR_STDERR_TAIL_LINES)
+        stderr_file = get_jar_stderr_file()
+        stderr_file.parent.mkdir(parents=True, exist_ok=True)
+        stderr_file_handler = logging.handlers.RotatingFileHandler(
+            stderr_file, maxBytes=JAR_STDERR_FILE_MAX_BYTES, backupCount=JAR_STDERR_FILE_BACKUPS, delay=True)
+        stderr_lines_seen = 0
+        try:
+            stderr_file_handler.emit(logging.makeLogRecord({"msg": f"=== {' '.join(jar_cmd)}"}))
+            with subprocess.Popen(jar_cmd, shell=False, universal_newlines=True, errors="replace",
+                                  stderr=subprocess.PIPE, stdout=stdout_stream) as process:
+                assert process.stderr is not None
+                for line in process.stderr:
+                    line = line.rstrip("\n")
+                    stderr_lines_seen += 1
+                    stderr_tail.append(line)
+                    stderr_file_handler.emit(logging.makeLogRecord({"msg": line}))
+                    for subscriber in stderr_subscribers or []:
+                        subscriber(line)
+            return_code = process.returncode
+        finally:
+            stderr_file_handler.close()
 
-        return_code = run_result.returncode
         if return_code:
 
             default_msg = f"Execution of command \"{' '.join(jar_cmd)}\" terminated with exitcode {return_code}."
@@ -1083,8 +1314,10 @@ def run_jar_cmd(jar_cmd: List[str], override_exit_code: bool, custom_error_messa
             # Python loggers to miss
             # specifically, the errors go only to the log if we disabled printing of errors or exit code override is on
             log_level = logging.INFO if (override_exit_code or not print_err) else logging.CRITICAL
-            stderr_lines = run_result.stderr.splitlines()
-            for line in stderr_lines:
+            if stderr_lines_seen > len(stderr_tail):
+                logger.log(log_level, f"Showing the last {len(stderr_tail)} lines of the standard error, "
+                                      f"see {stderr_file} for the rest")
+            for line in stderr_tail:
                 logger.log(log_level, line)
 
             if not override_exit_code:  # else, we return 0
@@ -1133,7 +1366,9 @@ def run_compiler_cmd(compiler_cmd: str, output_file_name: str, wd: Path,
         with stderr_name.open('w+') as stderr:
             try:
                 args = prepare_call_args(compiler_cmd)
-                exitcode = subprocess.run(args, stdout=stdout, stderr=stderr, input=compiler_input, cwd=wd).returncode
+                with profile("compiler process", "process", output=output_file_name):
+                    exitcode = subprocess.run(args, stdout=stdout, stderr=stderr, input=compiler_input,
+                                              cwd=wd).returncode
                 if exitcode:
                     msg = f"Failed to run {compiler_cmd}, exit code {exitcode}"
                     with open(stderr_name, 'r') as stderr_read:
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+#     The Certora Prover
+#     Copyright (C) 2025  Certora Ltd.
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, version 3 of the License.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Runs certoraRun on many .conf files from a single invocation.
+
+Confs are grouped by the conf values that affect the build cache key. Every group is handled by a single process
+that runs its confs one after the other with the build cache enabled, so the first conf of a group builds the
+contracts and the rest get a build cache hit. In-process memos (compiler version probes, source file hashes) are
+shared by all the runs of a group. Groups run in parallel, bounded by --jobs.
+Every group gets its own .certora_internal directory (under .certora_internal/batch_groups), so groups that run in
+parallel do not share build directories, the 'latest' link or the build cache.
+"""
+
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Dict, Tuple, Type
+
+from tabulate import tabulate
+
+scripts_dir_path = Path(__file__).parent.resolve()  # containing directory
+sys.path.insert(0, str(scripts_dir_path))
+
+from Shared import certoraUtils as Util
+import CertoraProver.certoraApp as App
+from Shared.proverCommon import CertoraFoundViolations, catch_exits
+from certoraRun import run_certora
+
+batch_logger = logging.getLogger("run")
+
+BATCH_SUMMARY_FILE = "batch_summary.json"
+BATCH_GROUPS_DIR = "batch_groups"
+DEFAULT_JOBS = 4
+
+STATUS_SUCCESS = "SUCCESS"
+STATUS_VIOLATIONS = "VIOLATIONS"
+STATUS_FAILED = "FAILED"
+
+
+@dataclass
+class BatchConfResult:
+    conf: str
+    group: int
+    status: str
+    run_time: float  # seconds
+    link: Optional[str] = None
+    error: Optional[str] = None
+
+
+def get_batch_group_key(conf_file: Path, app: Type[App.CertoraApp] = App.EvmApp) -> str:
+    """
+    Computes a key from the build-cache affecting values of a conf file. Confs with the same key are likely to get
+    the same main build cache key (see CertoraBuildCacheManager.get_main_cache_key), and should therefore be run by
+    the same worker, one after the other.
+    Unreadable confs get a unique key, certoraRun will report the actual error.
+    """
+    try:
+        with conf_file.open() as conf_handle:
+            conf = Util.read_conf_file(conf_handle)
+    except Exception:
+        return f"unreadable:{conf_file}"
+
+    cache_affecting_keys = [attr.get_conf_key() for attr in app.attr_class.attribute_list()
+                            if attr.affects_build_cache_key]
+    key_dict = {}
+    for key in cache_affecting_keys:
+        value = conf.get(key)
+        if isinstance(value, list):
+            value = sorted(str(v) for v in value)
+        elif isinstance(value, dict):
+            value = dict(sorted(value.items()))
+        if value:
+            key_dict[key] = value
+    return json.dumps(key_dict, sort_keys=True)
+
+
+def group_confs(conf_files: List[str]) -> Dict[str, List[str]]:
+    """
+    @return the conf files grouped by their batch group key, keeping the order in which the confs were given
+    """
+    groups: Dict[str, List[str]] = OrderedDict()
+    for conf_file in conf_files:
+        groups.setdefault(get_batch_group_key(Path(conf_file)), []).append(conf_file)
+    return groups
+
+
+def get_group_internal_dir(group_key: str) -> Path:
+    """
+    @return the .certora_internal directory of a group. It is derived from the group key, so a group reuses the build
+    cache of the same group in previous batch runs
+    """
+    return Util.CERTORA_INTERNAL_ROOT / BATCH_GROUPS_DIR / hashlib.sha256(group_key.encode()).hexdigest()[:16]
+
+
+@contextmanager
+def group_internal_dir(internal_dir: Path) -> Iterator[None]:
+    """
+    Makes internal_dir the .certora_internal directory of the runs in this process, until the context is exited.
+    The files shared by the whole project (e.g. the recent jobs) stay in Util.CERTORA_PROJECT_INTERNAL_ROOT
+    """
+    orig_internal_root = Util.CERTORA_INTERNAL_ROOT
+    Util.safe_create_dir(internal_dir)
+    Util.CERTORA_INTERNAL_ROOT = internal_dir
+    try:
+        yield
+    finally:
+        Util.CERTORA_INTERNAL_ROOT = orig_internal_root
+
+
+@contextmanager
+def isolated_logging() -> Iterator[None]:
+    """
+    Every run_certora sets up its own log handlers on the root logger. Removes the handlers a run added when it ends,
+    so confs that run later in the same process do not log every message once per previous conf
+    """
+    root_logger = logging.root
+    orig_handlers = list(root_logger.handlers)
+    orig_level = root_logger.level
+    try:
+        yield
+    finally:
+        for handler in list(root_logger.handlers):
+            if handler not in orig_handlers:
+                root_logger.removeHandler(handler)
+                try:
+                    handler.close()
+                except Exception as e:
+                    batch_logger.debug(f"Failed to close {handler}: {repr(e)}")
+        root_logger.setLevel(orig_level)
+
+
+def run_conf_group(group_index: int, conf_files: List[str], extra_args: List[str],
+                   internal_dir: Optional[Path] = None) -> List[BatchConfResult]:
+    """
+    Runs certoraRun on each of the given confs sequentially, in the current process.
+    Failures are recorded in the returned results and do not stop the remaining confs of the group.
+    @param internal_dir: if given, the .certora_internal directory of the runs of the group
+    """
+    results = []
+    with group_internal_dir(internal_dir or Util.CERTORA_INTERNAL_ROOT):
+        for conf_file in conf_files:
+            start = time.perf_counter()
+            status = STATUS_SUCCESS
+            link = None
+            error = None
+            try:
+                with isolated_logging():
+                    run_result = run_certora([conf_file] + extra_args, App.EvmApp)
+                if run_result:
+                    link = run_result.rule_report_link or run_result.link
+            except CertoraFoundViolations as e:
+                status = STATUS_VIOLATIONS
+                if e.results:
+                    link = e.results.rule_report_link or e.results.link
+            except Util.TestResultsReady:
+                pass
+            except Exception as e:
+                status = STATUS_FAILED
+                error = str(e)
+            end = time.perf_counter()
+            results.append(BatchConfResult(conf_file, group_index, status, round(end - start, 4), link, error))
+    return results
+
+
+def run_certora_batch(conf_files: List[str], extra_args: Optional[List[str]] = None, jobs: int = DEFAULT_JOBS,
+                      build_cache: bool = True) -> List[BatchConfResult]:
+    """
+    Runs certoraRun on every conf file and returns the results in the order the confs were given.
+    @param conf_files: the .conf files to run
+    @param extra_args: arguments added to the command line of every run
+    @param jobs: the maximal number of groups that are run in parallel
+    @param build_cache: if True, --build_cache is added to every run so confs of the same group share their build
+    """
+    args = list(extra_args) if extra_args else []
+    if build_cache and '--build_cache' not in args:
+        args.append('--build_cache')
+
+    grouped_confs = group_confs(conf_files)
+    groups = list(grouped_confs.values())
+    internal_dirs = [get_group_internal_dir(group_key) for group_key in grouped_confs]
+    batch_logger.debug(f"running {len(conf_files)} confs in {len(groups)} groups: {groups}")
+
+    results: List[BatchConfResult] = []
+    if jobs <= 1 or len(groups) == 1:
+        for group_index, group in enumerate(groups):
+            results.extend(run_conf_group(group_index, group, args, internal_dirs[group_index]))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(groups))) as executor:
+            futures = [executor.submit(run_conf_group, group_index, group, args, internal_dirs[group_index])
+                       for group_index, group in enumerate(groups)]
+            for group_index, future in enumerate(futures):
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    # the worker itself crashed, every conf of the group is considered failed
+                    results.extend(BatchConfResult(conf, group_index, STATUS_FAILED, 0.0, error=str(e))
+                                   for conf in groups[group_index])
+
+    order = {conf: i for i, conf in enumerate(conf_files)}
+    return sorted(results, key=lambda r: order[r.conf])
+
+
+def summarize_batch(results: List[BatchConfResult]) -> Tuple[str, Path]:
+    """
+    Dumps the results to .certora_internal/batch_summary.json
+    @return the summary table and the path of the dumped results
+    """
+    table = tabulate([[r.conf, r.group, r.status, r.run_time, r.link or r.error or ''] for r in results],
+                     headers=["Conf", "Group", "Status", "Time (s)", "Link / Error"])
+    Util.safe_create_dir(Util.CERTORA_INTERNAL_ROOT)
+    summary_file = Util.get_from_certora_internal(BATCH_SUMMARY_FILE)
+    with summary_file.open("w+") as summary_handle:
+        json.dump([asdict(r) for r in results], summary_handle, indent=4)
+    return table, summary_file
+
+
+def parse_batch_args(args: List[str]) -> Tuple[argparse.Namespace, List[str]]:
+    parser = argparse.ArgumentParser(prog="certoraBatchRun",
+                                     description="Run certoraRun on many conf files, sharing builds between them. "
+                                                 "Unrecognized flags are passed to every certoraRun invocation.")
+    parser.add_argument('confs', nargs='+', help='the .conf files to run')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'maximal number of conf groups that run in parallel (default {DEFAULT_JOBS})')
+    parser.add_argument('--no_build_cache', action='store_true',
+                        help='do not add --build_cache to the runs (confs will not share their builds)')
+    return parser.parse_known_args(args)
+
+
+@catch_exits
+def entry_point() -> None:
+    namespace, extra_args = parse_batch_args(sys.argv[1:])
+    for conf in namespace.confs:
+        if not conf.endswith('.conf'):
+            raise Util.CertoraUserInputError(f"certoraBatchRun accepts only .conf files, got {conf}")
+
+    results = run_certora_batch(namespace.confs, extra_args, namespace.jobs, not namespace.no_build_cache)
+    table, summary_file = summarize_batch(results)
+    print(f"\n{table}\n\nBatch summary written to {summary_file}")
+
+    failed = [r for r in results if r.status != STATUS_SUCCESS]
+    if failed:
+        raise Util.ExitException(f"{len(failed)} out of {len(results)} confs did not succeed", 1)
+
+
+if __name__ == '__main__':
+    entry_point()
@@ -17,48 +17,212 @@
 
 import os
 import sys
+import json
+import hashlib
 import argparse
+import tempfile
+import threading
 import subprocess
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 scripts_dir_path = Path(__file__).parent.resolve()  # containing directory
 sys.path.insert(0, str(scripts_dir_path))
 
 from Shared import certoraUtils as Util
-from pathlib import Path
 
 FORMATTER_JAR = "ASTExtraction.jar"
+FORMATTER_STAMPS_FILE = "cvl_formatter_stamps.json"
 
-scripts_dir_path = Path(__file__).parent.resolve()
-sys.path.insert(0, str(scripts_dir_path))
 
 def spec_file_type(spec_file: str) -> str:
-    if not os.path.isfile(spec_file):
+    if not os.path.isfile(spec_file) and not os.path.isdir(spec_file):
         raise argparse.ArgumentTypeError(f"File {spec_file} does not exist")
     return spec_file
 
-def run_formatter_from_jar(spec_file: str, overwrite: bool) -> None:
-    path_to_typechecker = Util.find_jar(FORMATTER_JAR)
-    cmd = ['java', '-jar', str(path_to_typechecker), 'format', '--file', spec_file]
-
-    result = subprocess.run(cmd, text=True, capture_output=True)
 
-    if result.returncode != 0:
-        raise Util.CertoraUserInputError(f"Error running formatter on {spec_file}: {result.stderr.strip() if result.stderr else ''}")
-
-    if overwrite:
-        with open(spec_file, 'w', encoding='utf-8') as f:
-            f.write(result.stdout)
-    else:
-        print(result.stdout, end='', file=sys.stdout)
-
-def parse_args() -> tuple[str, bool]:
+def collect_spec_files(paths: List[str]) -> List[Path]:
+    """
+    @return the given files, and the .spec files under the given directories (skipping hidden directories)
+    """
+    spec_files: List[Path] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dir_names, file_names in os.walk(path):
+                dir_names[:] = sorted(d for d in dir_names if not d.startswith('.'))
+                spec_files.extend(Path(root) / f for f in sorted(file_names) if f.endswith('.spec'))
+        else:
+            spec_files.append(Path(path))
+    return list(dict.fromkeys(spec_files))
+
+
+def get_formatter_cmd(path_to_formatter: Path, *args: str) -> List[str]:
+    return ['java', '-jar', str(path_to_formatter), 'format', *args]
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class FormatterStamps:
+    """
+    The hashes of the spec files known to be formatted, so unchanged files are not sent to the formatter again.
+    Stamps are only valid for the formatter jar that produced them.
+    """
+
+    def __init__(self, stamps_file: Path, formatter_jar: Path) -> None:
+        self.stamps_file = stamps_file
+        stat = formatter_jar.stat()
+        self.formatter_key = f"{stat.st_size}:{stat.st_mtime_ns}"
+        self.stamps: Dict[str, str] = {}
+        self.dirty = False
+        try:
+            with stamps_file.open() as stamps_handle:
+                data = json.load(stamps_handle)
+            if data.get("formatter") == self.formatter_key:
+                self.stamps = data["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # start with no stamps
+
+    def is_formatted(self, spec_file: Path, content: str) -> bool:
+        return self.stamps.get(str(spec_file.resolve())) == content_hash(content)
+
+    def mark_formatted(self, spec_file: Path, content: str) -> None:
+        self.stamps[str(spec_file.resolve())] = content_hash(content)
+        self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.stamps_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=self.stamps_file.parent, delete=False) as tmp_handle:
+            json.dump({"formatter": self.formatter_key, "files": self.stamps}, tmp_handle)
+        os.replace(tmp_handle.name, self.stamps_file)
+        self.dirty = False
+
+
+class FormatterProcess:
+    """
+    A formatter JVM that formats every file whose path it is sent, in the formatter's --paths mode.
+    One process can format any number of files, one after the other: batch runs send all the paths at once, and
+    editors may keep a process around and send paths as files are saved.
+    """
+
+    def __init__(self, path_to_formatter: Optional[Path] = None) -> None:
+        path_to_formatter = path_to_formatter or Util.find_jar(FORMATTER_JAR)
+        self.process = subprocess.Popen(get_formatter_cmd(path_to_formatter, '--paths'), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, text=True, encoding='utf-8', bufsize=1)
+        self._lock = threading.Lock()
+
+    def format_file(self, spec_file: Path) -> Tuple[Optional[str], Optional[str]]:
+        """
+        @return the formatted content of spec_file, or None and the error of the formatter
+        """
+        with self._lock:
+            assert self.process.stdin is not None and self.process.stdout is not None
+            self.process.stdin.write(f"{spec_file.resolve()}\n")
+            self.process.stdin.flush()
+            return self.__read_result()[1:]
+
+    def format_files(self, spec_files: List[Path]) -> Iterator[Tuple[Path, Optional[str], Optional[str]]]:
+        """
+        Sends all the paths at once, and yields (spec file, formatted content, error) as soon as each file is formatted
+        """
+        with self._lock:
+            assert self.process.stdin is not None and self.process.stdout is not None
+            stdin = self.process.stdin
+
+            def send_paths() -> None:
+                # a separate thread, so the formatter never waits for us to read its output while we write the paths
+                for spec_file in spec_files:
+                    stdin.write(f"{spec_file.resolve()}\n")
+                stdin.flush()
+
+            sender = threading.Thread(target=send_paths, daemon=True)
+            sender.start()
+            for spec_file in spec_files:
+                _, output, error = self.__read_result()
+                yield spec_file, output, error
+            sender.join()
+
+    def __read_result(self) -> Tuple[str, Optional[str], Optional[str]]:
+        assert self.process.stdout is not None
+        line = self.process.stdout.readline()
+        if not line:
+            raise Util.CertoraUserInputError(f"The formatter exited unexpectedly with code {self.process.wait()}")
+        result = json.loads(line)
+        return result["file"], result.get("output"), result.get("error")
+
+    def close(self) -> None:
+        if self.process.stdin is not None:
+            self.process.stdin.close()
+        if self.process.stdout is not None:
+            self.process.stdout.close()  # so a formatter whose results were not all read does not block on writing
+        self.process.wait()
+
+
+def format_spec_files(spec_files: List[Path], overwrite: bool, use_stamps: bool = True) -> None:
+    """
+    Formats all the spec files in a single formatter JVM. Each file is written (or printed) as soon as it is
+    formatted. Files that were already formatted, according to the stamps, are not sent to the formatter.
+    """
+    path_to_formatter = Util.find_jar(FORMATTER_JAR)
+    stamps = FormatterStamps(Util.get_from_certora_internal(FORMATTER_STAMPS_FILE), path_to_formatter)
+    contents = {spec_file: spec_file.read_text(encoding='utf-8') for spec_file in spec_files}
+    to_format = [f for f in spec_files if not (use_stamps and stamps.is_formatted(f, contents[f]))]
+    sent = set(to_format)
+
+    def emit(spec_file: Path, output: str) -> None:
+        if overwrite:
+            if output != contents[spec_file]:
+                spec_file.write_text(output, encoding='utf-8')
+        else:
+            if len(spec_files) > 1:
+                print(f"==> {spec_file} <==")
+            print(output, end='', file=sys.stdout)
+
+    errors = []
+    formatter = None
+    try:
+        if to_format:
+            check_java_version()
+            formatter = FormatterProcess(path_to_formatter)
+        # to_format keeps the order of spec_files, so the results arrive in the order the files are emitted in
+        results = formatter.format_files(to_format) if formatter is not None else iter([])
+        for spec_file in spec_files:
+            if spec_file not in sent:
+                emit(spec_file, contents[spec_file])  # already formatted
+                continue
+            _, output, error = next(results)
+            if output is None:
+                errors.append(f"{spec_file}: {error}")
+                continue
+            emit(spec_file, output)
+            stamps.mark_formatted(spec_file, output)
+    finally:
+        if formatter is not None:
+            formatter.close()
+        stamps.save()
+
+    if errors:
+        raise Util.CertoraUserInputError("Error running formatter on:\n" + "\n".join(errors))
+
+
+def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
-    parser.add_argument('spec_file', type=spec_file_type, help='Path to the .spec file')
+    parser.add_argument('spec_files', type=spec_file_type, nargs='*',
+                        help='Paths to .spec files, or to directories whose .spec files are formatted')
     parser.add_argument('-w', '--overwrite', action='store_true', help='If set, output is written to the spec file instead of stdout')
+    parser.add_argument('--no_stamps', action='store_true',
+                        help='Format all the files, even those that are known to be formatted already')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run a formatter that formats the files whose paths are read from stdin, one per line, '
+                             'writing a JSON result per file to stdout, until stdin is closed')
 
     args = parser.parse_args()
-    return args.spec_file, args.overwrite
+    if not args.serve and not args.spec_files:
+        parser.error('at least one spec file is required')
+    return args
 
 
 def check_java_version() -> None:
@@ -68,9 +232,12 @@ def check_java_version() -> None:
 
 
 def entry_point() -> None:
-    spec_file, overwrite = parse_args()
-    check_java_version()
-    run_formatter_from_jar(spec_file, overwrite)
+    args = parse_args()
+    if args.serve:
+        check_java_version()
+        sys.exit(subprocess.run(get_formatter_cmd(Util.find_jar(FORMATTER_JAR), '--paths')).returncode)
+
+    format_spec_files(collect_spec_files(args.spec_files), args.overwrite, not args.no_stamps)
 
 if __name__ == '__main__':
     entry_point()
@@ -23,6 +23,7 @@ from pathlib import Path
 scripts_dir_path = Path(__file__).parent.resolve()  # containing directory
 sys.path.insert(0, str(scripts_dir_path))
 from Shared import certoraUtils as Util
+from Shared.certoraProfiler import build_profiler, profile
 
 from CertoraProver.certoraCloudIO import CloudVerification
 
@@ -60,8 +61,30 @@ def run_certora(args: List[str], app: Type[App.CertoraApp] = App.EvmApp,
     1. Parse program arguments
     2. Run the necessary steps (type checking/ build/ cloud verification/ local verification)
 
+    The time spent in every step is written to build_profile.json/txt in the build directory (see certoraProfiler).
     """
-    context, logging_manager = build_context(args, app)
+    build_profiler.reset()
+    try:
+        with profile("certoraRun"):
+            return __run_certora(args, app, prover_cmd)
+    finally:
+        dump_build_profile()
+
+
+def dump_build_profile() -> None:
+    if not Util.get_build_dir().is_dir():
+        return
+    try:
+        summary = build_profiler.dump(Util.get_build_profile_file())
+        run_logger.debug(f"Timing of the run was written to {Util.get_build_profile_file()}:\n{summary}")
+    except Exception as e:
+        # profiling should never fail the run
+        run_logger.debug("Failed to write the build profile", exc_info=e)
+
+
+def __run_certora(args: List[str], app: Type[App.CertoraApp], prover_cmd: Optional[str]) -> Optional[CertoraRunResult]:
+    with profile("parse arguments"):
+        context, logging_manager = build_context(args, app)
 
     if prover_cmd:
         context.prover_cmd = prover_cmd
@@ -71,9 +94,11 @@ def run_certora(args: List[str], app: Type[App.CertoraApp] = App.EvmApp,
     return_value = None
 
     # Collect and validate metadata
-    collect_and_dump_metadata(context)
+    with profile("collect metadata"):
+        collect_and_dump_metadata(context)
     # Collect and dump configuration layout
-    collect_and_dump_config_layout(context)
+    with profile("collect configuration layout"):
+        collect_and_dump_config_layout(context)
 
     if context.split_rules and not (context.build_only or context.compilation_steps_only):
         context.build_only = True
@@ -104,7 +129,8 @@ def run_certora(args: List[str], app: Type[App.CertoraApp] = App.EvmApp,
         build_start = time.perf_counter()
 
         # If we are not in CI, we also check the spec for Syntax errors.
-        build(context)
+        with profile("build"):
+            build(context)
         build_end = time.perf_counter()
 
         timings["buildTime"] = round(build_end - build_start, 4)
@@ -122,7 +148,8 @@ def run_certora(args: List[str], app: Type[App.CertoraApp] = App.EvmApp,
     if context.local:
         compare_with_expected_file = Path(context.expected_file).exists()
 
-        run_result = run_local(context, timings, compare_with_expected_file=compare_with_expected_file)
+        with profile("local run"):
+            run_result = run_local(context, timings, compare_with_expected_file=compare_with_expected_file)
         emv_dir = latest_emv_dir()
         return_value = CertoraRunResult(str(emv_dir) if emv_dir else None, True,
                                         Util.get_certora_sources_dir(), None)
@@ -142,7 +169,8 @@ def run_certora(args: List[str], app: Type[App.CertoraApp] = App.EvmApp,
 
         # Remove debug logger and run remote verification
         logging_manager.remove_debug_logger()
-        exit_code, return_value = run_remote(context, args, timings)
+        with profile("remote run"):
+            exit_code, return_value = run_remote(context, args, timings)
 
     # Handle exit codes and return
     return handle_exit(exit_code, return_value)
@@ -153,7 +181,8 @@ def run_syntax_and_typechecking_with_timings(context: CertoraContext, timings: d
     if Cv.mode_has_spec_file(context):
         if Ctx.should_run_local_speck_check(context):
             typechecking_start = time.perf_counter()
-            Ctx.run_local_spec_check(True, context)
+            with profile("typechecking"):
+                Ctx.run_local_spec_check(True, context)
             typechecking_end = time.perf_counter()
             timings['typecheckingTime'] = round(typechecking_end - typechecking_start, 4)
 
@@ -170,6 +170,7 @@ if __name__ == '__main__':
     copy(DEFAULT_DIR / "Typechecker.jar" if args.type_checker_path is None else args.type_checker_path, CERTORA_JARS)
     copy(DEFAULT_DIR / "ASTExtraction.jar", CERTORA_JARS)
     copy(SCRIPTS / "certoraRun.py", CERTORA_CLI_DIR)
+    copy(SCRIPTS / "certoraBatchRun.py", CERTORA_CLI_DIR)
     copy(SCRIPTS / "certoraMutate.py", CERTORA_CLI_DIR)
     copy(SCRIPTS / "certoraEqCheck.py", CERTORA_CLI_DIR)
     copy(SCRIPTS / "rustMutator.py", CERTORA_CLI_DIR)
@@ -251,6 +252,7 @@ setuptools.setup(
     entry_points={{
         "console_scripts": [
             "certoraRun = certora_cli.certoraRun:entry_point",
+            "certoraBatchRun = certora_cli.certoraBatchRun:entry_point",
             "certoraMutate = certora_cli.certoraMutate:mutate_entry_point",
             "certoraEqCheck = certora_cli.certoraEqCheck:equiv_check_entry_point",
             "certoraSolanaProver = certora_cli.certoraSolanaProver:entry_point",
@@ -0,0 +1,89 @@
+#      The Certora Prover
+#      Copyright (C) 2025  Certora Ltd.
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, version 3 of the License.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+A content-addressed cache of tool results, shared by the concordance tools.
+
+The LLM often resubmits byte-identical sources during feedback loops. Tools that compile or check sources look their
+result up here by a hash of everything the result depends on (sources, compiler version, settings), so repeated calls
+return immediately instead of spawning solc or the prover again.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from concordance.logger import tool_logger
+
+
+class ResultCache:
+    """
+    Maps the hash of a tool's inputs to the tool's result. Safe to use from concurrently running tools.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, **inputs: Any) -> str:
+        """
+        Computes the key of a result of the tool [kind] from all the inputs the result depends on.
+        Inputs must be JSON serializable.
+        """
+        return hashlib.sha256(json.dumps([kind, inputs], sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if result is not None:
+            tool_logger.debug("Result cache hit for %s", key)
+        return result
+
+    def put(self, key: str, result: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._results[key] = result
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """
+        Returns the cached result of key, or computes and caches it. A compute that raises is not cached.
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# The cache shared by all the tools of the current process
+result_cache = ResultCache()
@@ -0,0 +1,148 @@
+#      The Certora Prover
+#      Copyright (C) 2025  Certora Ltd.
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, version 3 of the License.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+A persistent Foundry project in which the differential fuzzer runs.
+
+The project (foundry.toml and a vendored copy of forge-std) is set up once, under .certora_internal in the current
+directory, and reused by every fuzz run: only the harness and test files are swapped in. Forge's cache and build
+outputs are kept between runs, so a run only recompiles the contracts that changed, and after the first setup no
+network access is needed. Set CONCORDANCE_FORGE_STD to a local forge-std checkout to set up the project offline.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from contextlib import contextmanager
+
+from concordance.logger import tool_logger
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, runs are then only serialized within the process
+    fcntl = None  # type: ignore[assignment]
+
+FUZZ_WORKSPACE_DIR = Path(".certora_internal") / "concordance" / "fuzz_workspace"
+FORGE_STD_REPO = "https://github.com/foundry-rs/forge-std"
+FORGE_STD_VERSION = "v1.10.0"
+FORGE_STD_ENV_VAR = "CONCORDANCE_FORGE_STD"
+
+FOUNDRY_TOML = """
+[profile.default]
+src = "src"
+out = "out"
+libs = ["lib"]
+"""
+
+
+class ForgeWorkspace:
+    """
+    A Foundry project that is initialized once and shared by all fuzz runs. Runs are serialized, as they share the
+    source files.
+    """
+
+    def __init__(self, root: Path = FUZZ_WORKSPACE_DIR) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+
+    @property
+    def forge_std_dir(self) -> Path:
+        return self.root / "lib" / "forge-std"
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Gives exclusive use of the workspace, also against other processes where possible
+        """
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / ".lock", "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    def vendor_forge_std(self) -> Optional[str]:
+        """
+        Puts forge-std in the lib directory of the workspace, from $CONCORDANCE_FORGE_STD if set, or by cloning it.
+        @return an error message if forge-std could not be set up
+        """
+        with tempfile.TemporaryDirectory(dir=self.root) as tmp_dir:
+            tmp_forge_std = Path(tmp_dir) / "forge-std"
+            local_forge_std = os.environ.get(FORGE_STD_ENV_VAR)
+            if local_forge_std:
+                if not (Path(local_forge_std) / "src" / "Test.sol").is_file():
+                    return f"{FORGE_STD_ENV_VAR} is set to {local_forge_std}, which is not a forge-std checkout"
+                shutil.copytree(local_forge_std, tmp_forge_std, ignore=shutil.ignore_patterns(".git"))
+            else:
+                clone = subprocess.run(["git", "clone", "--depth", "1", "--branch", FORGE_STD_VERSION, FORGE_STD_REPO,
+                                        str(tmp_forge_std)], capture_output=True, text=True)
+                if clone.returncode != 0:
+                    return f"Failed to fetch forge-std (set {FORGE_STD_ENV_VAR} to a local checkout to work " \
+                           f"offline):\n{clone.stderr}"
+            # forge-std only appears in the workspace once it is complete
+            self.forge_std_dir.parent.mkdir(parents=True, exist_ok=True)
+            tmp_forge_std.rename(self.forge_std_dir)
+        tool_logger.info("Set up the fuzz workspace in %s", self.root)
+        return None
+
+    def ensure_initialized(self) -> Optional[str]:
+        """
+        Sets up the parts of the workspace that are missing. Must be called while holding the workspace lock.
+        @return an error message if the workspace could not be set up
+        """
+        foundry_toml = self.root / "foundry.toml"
+        if not foundry_toml.is_file() or foundry_toml.read_text() != FOUNDRY_TOML:
+            foundry_toml.write_text(FOUNDRY_TOML)
+        if not self.forge_std_dir.is_dir():
+            return self.vendor_forge_std()
+        return None
+
+    def write_file(self, relative_path: str, content: str) -> None:
+        """
+        Writes a source file of the workspace. Unchanged files are not rewritten, so forge does not recompile them.
+        """
+        path = self.root / relative_path
+        if path.is_file() and path.read_text() == content:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    def run_forge_test(self, files: Dict[str, str]) -> str:
+        """
+        Writes the given files (relative path to content) to the workspace and runs forge test on it.
+        @return the exit code and the output of forge, or the reason the workspace could not be set up
+        """
+        with self.locked():
+            error = self.ensure_initialized()
+            if error is not None:
+                return f"The fuzz tester could not be set up: {error}"
+            for relative_path, content in files.items():
+                self.write_file(relative_path, content)
+            res = subprocess.run(["forge", "test"], cwd=str(self.root), capture_output=True)
+        return f"""
+Forge exited with returncode: {res.returncode},
+Stdout:
+{res.stdout.decode("utf-8")}
+Stderr:
+{res.stderr.decode("utf-8")}
+"""
+
+
+# The workspace shared by all the fuzz runs of the current process
+fuzz_workspace = ForgeWorkspace()
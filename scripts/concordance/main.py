@@ -20,6 +20,7 @@ from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_anthropic import ChatAnthropic
 
 from concordance.logger import logger
+from concordance.cache import result_cache
 from concordance.workflows import execute_rewrite_workflow, generate_harness
 
 def setup_argument_parser() -> argparse.ArgumentParser:
@@ -42,6 +43,8 @@ def setup_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument("--thread-id", type=str, help="Thread id to use for execution. Randomly generated if not provided")
     parser.add_argument("--db", type=str, help="Path for a database file for persistent executions")
     parser.add_argument("--iteration-limit", type=int, help="The maximum number of iterations allowed during rewrites", default=40)
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="Always rerun the compiler and the equivalence checker, even for sources they already checked")
     return parser
 
 
@@ -89,6 +92,7 @@ def main() -> int:
     args = parser.parse_args()
 
     setup_logging(args.debug)
+    result_cache.enabled = not args.no_result_cache
 
     # Create configured LLMs
     harness_llm = create_harness_llm(args)
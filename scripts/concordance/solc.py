@@ -18,6 +18,8 @@ import json
 
 from pydantic import BaseModel, Field
 
+from concordance.cache import result_cache
+
 class SolidityCompilerInputBase(BaseModel):
     compiler_version: str = \
         Field(description=
@@ -42,12 +44,17 @@ def solidity_compiler_impl(source: str, compiler_version: str) -> str:
             }
         }
     }
-    compile_result = subprocess.run(
-        [f'solc{compiler_version}', "--standard-json"],
-        input=json.dumps(compiler_input),
-        text=True,
-        encoding="utf-8",
-        capture_output=True
-    )
-    res = f"Return code was: {compile_result.returncode}\nStdout:\n{compile_result.stdout}"
-    return res
+
+    def run_solc() -> str:
+        compile_result = subprocess.run(
+            [f'solc{compiler_version}', "--standard-json"],
+            input=json.dumps(compiler_input),
+            text=True,
+            encoding="utf-8",
+            capture_output=True
+        )
+        return f"Return code was: {compile_result.returncode}\nStdout:\n{compile_result.stdout}"
+
+    # The compiler input holds the source and the settings
+    return result_cache.get_or_compute(
+        result_cache.key("solc", compiler_version=compiler_version, compiler_input=compiler_input), run_solc)
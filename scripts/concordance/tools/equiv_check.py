@@ -25,6 +25,7 @@ from pydantic import BaseModel, Field
 
 from concordance.state import RewriterState
 from concordance.logger import tool_logger, logger
+from concordance.cache import result_cache
 
 class EquivalenceCheckerSchema(BaseModel):
     """
@@ -89,6 +90,24 @@ def equivalence_check(
     compiler_version: str,
     state: RewriterState
 ) -> str:
+    if "curr_rewrite" not in state:
+        return "The \"rewrite harness\" is missing from the VFS."
+
+    cache_key = result_cache.key(
+        "equivalence_check",
+        original_harness=state["original_harness"],
+        rewrite_harness=state["curr_rewrite"],
+        original_harness_name=original_harness_name,
+        rewrite_harness_name=rewrite_harness_name,
+        abi_signature=abi_signature,
+        loop_bound=loop_bound,
+        compiler_version=compiler_version
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        print("Equivalence check result is known for these harnesses; returning it")
+        return cached
+
     print("Running the equivalence checker...")
 
     # Create temporary files - result in current directory, trace anywhere
@@ -100,8 +119,6 @@ def equivalence_check(
         # Write contract bodies to files
         f1.write(state["original_harness"])
         f1.flush()
-        if "curr_rewrite" not in state:
-            return "The \"rewrite harness\" is missing from the VFS."
         f2.write(state["curr_rewrite"])
         f2.flush()
 
@@ -149,11 +166,18 @@ def equivalence_check(
         # Check if SUCCESS
         if rule_value == "SUCCESS":
             print("Equivalence check passed")
-            return "Equivalent"
+            to_return = "Equivalent"
+            is_final = True
         else:
             print("Divergent behavior found; returning for refinement")
             # Read and return trace contents
             with open(trace.name, 'r') as trace_file:
                 to_return = trace_file.read()
                 tool_logger.info("Trace was:\n%s", to_return)
-                return to_return
+            # a timeout or an unknown result may have no trace, and may be decided when retried
+            is_final = rule_value == "FAIL" and bool(to_return.strip())
+
+        # Only decided checks are cached, a failed or undecided run of the checker may succeed when retried
+        if is_final:
+            result_cache.put(cache_key, to_return)
+        return to_return
@@ -14,9 +14,6 @@
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from typing import Annotated
-import tempfile
-import pathlib
-import subprocess
 
 from langgraph.runtime import get_runtime
 from langgraph.prebuilt import InjectedState
@@ -26,6 +23,7 @@ from pydantic import BaseModel, Field
 
 from concordance.templates.loader import load_template
 from concordance.state import RewriteContext, RewriterState
+from concordance.forge_workspace import fuzz_workspace
 
 
 class DifferentialFuzzTester(BaseModel):
@@ -82,10 +80,10 @@ def differential_fuzz_tester(
 
 def build_and_run_fuzz_test(original_harness_name: str, rewrite_harness_name: str, internal_param_types: list[str], state: RewriterState, build_buffer: str) -> str:
     """
-    Build and execute a Foundry-based differential fuzz test in a temporary directory.
+    Build and execute a Foundry-based differential fuzz test in the shared fuzz workspace.
 
-    Creates a temporary Foundry project with the original and rewrite harnesses,
-    generates a differential test, and runs it using forge test.
+    Generates a differential test, swaps it and the original and rewrite harnesses into the workspace,
+    and runs it using forge test.
 
     Args:
         original_harness_name: Name of the original harness contract
@@ -99,39 +97,11 @@ def build_and_run_fuzz_test(original_harness_name: str, rewrite_harness_name: st
     """
     diff_tester = build_fuzz_test(original_harness_name, rewrite_harness_name, internal_param_types, build_buffer)
     assert "curr_rewrite" in state
-    with tempfile.TemporaryDirectory() as working_dir:
-        dir_path = pathlib.Path(working_dir)
-        with open(dir_path / "foundry.toml", 'wt') as toml:
-            toml.write("""
-[profile.default]
-src = "src"
-out = "out"
-libs = ["lib"]
-            """)
-        test_path = (dir_path / "test")
-        test_path.mkdir(exist_ok=True, parents=True)
-        (test_path / "DiffTest.t.sol").write_text(diff_tester)
-
-        src_path = (dir_path / "src")
-        src_path.mkdir(exist_ok=True, parents=True)
-        (src_path / "Orig.sol").write_text(state["original_harness"])
-        (src_path / "Rewrite.sol").write_text(state["curr_rewrite"])
-        lib_dir = (dir_path / "lib")
-        lib_dir.mkdir(parents = True, exist_ok = True)
-        subprocess.run([
-            "git", "clone", "--branch", "v1.10.0", "https://github.com/foundry-rs/forge-std", "forge-std",
-        ], cwd=str(lib_dir), capture_output=True)
-
-        res = subprocess.run([
-            "forge", "test"
-        ], cwd=str(working_dir), capture_output=True)
-        return f"""
-Forge exited with returncode: {res.returncode},
-Stdout:
-{res.stdout.decode("utf-8")}
-Stderr:
-{res.stderr.decode("utf-8")}
-"""
+    return fuzz_workspace.run_forge_test({
+        "test/DiffTest.t.sol": diff_tester,
+        "src/Orig.sol": state["original_harness"],
+        "src/Rewrite.sol": state["curr_rewrite"]
+    })
 
 def build_fuzz_test(original_harness_name: str, rewrite_harness_name: str, internal_param_types: list[str], build_buffer: str) -> str:
     """
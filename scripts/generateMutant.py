@@ -20,11 +20,12 @@ import sys
 import json
 import datetime
 import argparse
+import tempfile
 import subprocess
 
 from rich.console import Console
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 scripts_dir_path = Path(__file__).parent.resolve()  # containing directory
 sys.path.insert(0, str(scripts_dir_path))
@@ -33,21 +34,98 @@ from Shared import certoraValidateFuncs as Vf
 from Shared import certoraUtils as Util
 from Mutate import mutateConstants as MConstants
 
+DIFF_HEADER_PREFIX = "diff --git "
+
+
+def run_git(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(['git', *args], capture_output=True, text=True)
+
+
+# the escapes of git's quoted paths, other than octal byte values
+GIT_QUOTED_ESCAPES = {'a': b'\a', 'b': b'\b', 't': b'\t', 'n': b'\n', 'v': b'\v', 'f': b'\f', 'r': b'\r',
+                      '"': b'"', '\\': b'\\'}
+
+
+def read_git_quoted_path(text: str, start: int) -> Optional[Tuple[str, int]]:
+    """
+    Decodes a path that git quoted, like "src/caf\\303\\251.sol" (non-ASCII bytes are octal escapes)
+    @param start: the index of the opening quote in text
+    @return the path and the index after its closing quote, None if the path is not properly quoted
+    """
+    path = bytearray()
+    i = start + 1
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            return os.fsdecode(bytes(path)), i + 1
+        if char != '\\':
+            path += char.encode()
+            i += 1
+        elif re.fullmatch(r'[0-3][0-7]{2}', text[i + 1:i + 4]):
+            path.append(int(text[i + 1:i + 4], 8))
+            i += 4
+        elif text[i + 1:i + 2] in GIT_QUOTED_ESCAPES:
+            path += GIT_QUOTED_ESCAPES[text[i + 1]]
+            i += 2
+        else:
+            return None
+    return None
+
+
+def get_diff_header_path(header: str) -> Optional[str]:
+    """
+    @param header: the first line of a file's section in git diff, e.g. 'diff --git a/src/A.sol b/src/A.sol'
+    @return the path of the diffed file relative to the repository root, None if it cannot be parsed
+    """
+    paths = header[len(DIFF_HEADER_PREFIX):]
+    if paths.startswith('"'):  # paths with special characters are quoted, and the file is not renamed
+        first = read_git_quoted_path(paths, 0)
+        if first is None or not paths.startswith(' "', first[1]):
+            return None
+        second = read_git_quoted_path(paths, first[1] + 1)
+        if second is None or second[1] != len(paths) or not second[0].startswith('b/'):
+            return None
+        return second[0][2:]
+    # the file is not renamed, so both paths are the same: 'a/<path> b/<path>'
+    path_len = (len(paths) - len("a/ b/")) // 2
+    return paths[-path_len:] if path_len > 0 else None
+
+
+def split_diff(diff: str, repo_root: Path) -> Dict[Path, str]:
+    """
+    Splits the output of a git diff of several files to the diff of each file
+    @return the resolved path of each file that has a diff, to its diff
+    """
+    diffs: Dict[Path, str] = {}
+    sections = re.split(rf'^(?={re.escape(DIFF_HEADER_PREFIX)})', diff, flags=re.MULTILINE)
+    for section in sections:
+        if not section.startswith(DIFF_HEADER_PREFIX):
+            continue
+        path = get_diff_header_path(section.split('\n', 1)[0])
+        if path is not None:
+            diffs[(repo_root / path).resolve()] = section
+    return diffs
+
 
 class MutantGenerator:
 
     def __init__(self) -> None:
-        self.mutant_file = Path('')
+        self.mutant_files: Dict[Path, Path] = {}
         self.args = sys.argv[1:]
-        self.conf = None
+        self.conf: Optional[Path] = None
         self.description = None
-        self.original_file = Path('')
+        self.original_files: List[Path] = []
         self.patch_directory = Path(MConstants.MUTATIONS)
         self.patch_filename = None
+        self.diffs: Dict[Path, str] = {}
+        self.repo_root = Path.cwd()
+        self.latest_commit = ''
+        self.user_name = ''
+        self.user_email = ''
 
     def read_args(self) -> None:
         parser = argparse.ArgumentParser(description="*** Generate a manual mutation from git patch ***")
-        parser.add_argument('original_file', type=Path, nargs=1, help='Generate a mutation for this file')
+        parser.add_argument('original_file', type=Path, nargs='+', help='Generate a mutation for each of these files')
         parser.add_argument('--description', type=str, help='Add a comment to '
                                                             'the mutant file')
         parser.add_argument('--conf', type=Path, help='Add the mutant to this Prover configuration')
@@ -57,10 +135,13 @@ class MutantGenerator:
 
         args = parser.parse_args()
 
-        try:
-            self.original_file = Path(Vf.validate_readable_file(str(args.original_file[0]), '.sol')).resolve()
-        except Util.CertoraUserInputError as orig_exception:
-            raise Util.CertoraUserInputError("Error when reading <file>", orig_exception) from None
+        for original_file in args.original_file:
+            try:
+                resolved = Path(Vf.validate_readable_file(str(original_file), '.sol')).resolve()
+            except Util.CertoraUserInputError as orig_exception:
+                raise Util.CertoraUserInputError("Error when reading <file>", orig_exception) from None
+            if resolved not in self.original_files:
+                self.original_files.append(resolved)
 
         self.description = args.description
         if args.patch_directory:
@@ -70,88 +151,109 @@ class MutantGenerator:
         self.conf = args.conf
 
         if self.conf:
-            self.conf = Path(Vf.file_exists_and_readable(self.conf))
+            self.conf = Path(Vf.file_exists_and_readable(str(self.conf)))
         self.validate_input()
 
     def validate_input(self) -> None:
-        # make sure the original file is tracked by git
-        try:
-            subprocess.run(['git', 'ls-files', '--error-unmatch', self.original_file], check=True,
-                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except Exception as orig_exception:
-            raise Util.CertoraUserInputError(f"Cannot find {self.original_file} in Git", orig_exception) from None
-        # make sure the original file was modified
-        try:
-            git_command = ['git', 'status', '--porcelain', str(self.original_file)]
-            result = subprocess.run(git_command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        except Exception as orig_exception:
-            raise Util.CertoraUserInputError(f"{' '.join(git_command)} failed", orig_exception) from None
-
-        if not result.stdout:
-            raise Util.CertoraUserInputError(f"Cannot create patch, {self.original_file} "
-                                             f"was not modified !!") from None
-
-    def collect_metadata(self) -> str:
+        """
+        Makes sure all the original files are tracked by git and were modified. Their diffs are kept for
+        generate_mutant, so the whole batch takes a single git ls-files and a single git diff.
+        """
+        files = [str(f) for f in self.original_files]
+        # make sure the original files are tracked by git
+        result = run_git('ls-files', '--error-unmatch', '--', *files)
+        if result.returncode != 0:
+            raise Util.CertoraUserInputError(f"Cannot find {' '.join(files)} in Git",
+                                             more_info=result.stderr) from None
+
+        self.collect_repo_metadata()
+        # make sure the original files were modified
+        # explicit prefixes, since get_diff_header_path relies on them (diff.noprefix or diff.mnemonicPrefix change them)
+        git_command = ['diff', 'HEAD', '--no-renames', '--no-color', '--no-ext-diff', '--src-prefix=a/',
+                       '--dst-prefix=b/', '--', *files]
+        result = run_git(*git_command)
+        if result.returncode != 0:
+            raise Util.CertoraUserInputError(f"git {' '.join(git_command)} failed", more_info=result.stderr) from None
+        self.diffs = split_diff(result.stdout, self.repo_root)
+
+        unmodified = [f for f in self.original_files if f not in self.diffs]
+        if unmodified:
+            raise Util.CertoraUserInputError(f"Cannot create patch, {', '.join(map(str, unmodified))} "
+                                             f"{'was' if len(unmodified) == 1 else 'were'} not modified !!") from None
+
+    def collect_repo_metadata(self) -> None:
+        """
+        Reads the repository root, the latest commit and the user once for all the mutants
+        """
+        rev_parse = run_git('rev-parse', '--show-toplevel', 'HEAD').stdout.split()
+        if len(rev_parse) == 2:
+            self.repo_root = Path(rev_parse[0]).resolve()
+            self.latest_commit = rev_parse[1]
+        for line in run_git('config', '--get-regexp', r'^user\.(name|email)$').stdout.splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'user.name':
+                self.user_name = value.strip()
+            elif key == 'user.email':
+                self.user_email = value.strip()
+
+    def collect_metadata(self, original_file: Path) -> str:
         current_time = datetime.datetime.now().isoformat()
         cwd = os.getcwd()
-        latest_commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
-        user_name = subprocess.run(["git", "config", "user.name"], capture_output=True, text=True).stdout.strip()
-        user_email = subprocess.run(["git", "config", "user.email"], capture_output=True, text=True).stdout.strip()
 
         metadata = ''
         if self.description:
             metadata += f"Description: {self.description}\n"
         if cwd:
             metadata += f"cwd: {cwd}\n"
-        if self.original_file:
-            metadata += f"Original File: {self.original_file}\n"
+        if original_file:
+            metadata += f"Original File: {original_file}\n"
         if self.args:
             metadata += f"Script Args: {self.args}\n"
         if current_time:
             metadata += f"Current Time: {current_time}\n"
-        if latest_commit:
-            metadata += f"Latest Commit: {latest_commit}\n"
-        if user_name:
-            metadata += f"User Name: {user_name}\n"
-        if user_email:
-            metadata += f"User Email: {user_email}\n"
+        if self.latest_commit:
+            metadata += f"Latest Commit: {self.latest_commit}\n"
+        if self.user_name:
+            metadata += f"User Name: {self.user_name}\n"
+        if self.user_email:
+            metadata += f"User Email: {self.user_email}\n"
 
         return f"\n\n{metadata} \n\n"
 
-    def set_mutant_file(self) -> None:
-        patch_filename = self.patch_filename or self.original_file.name
-        highest = 0
-        pattern = re.compile(rf'{patch_filename}\.(\d+)\.patch')
-
-        if self.patch_directory.exists():
-            for filename in os.listdir(self.patch_directory):
-                match = pattern.match(filename)
-                if match:
-                    integer_value = int(match.group(1))
-                    if integer_value > highest:
-                        highest = integer_value
-
-        self.mutant_file = self.patch_directory / f"{patch_filename}.{highest + 1}.patch"
-        print(f"mutant_file - {self.mutant_file}")
+    def set_mutant_files(self) -> None:
+        """
+        Numbers the patch of each original file after the patches with the same name that are already in the patch
+        directory (and after the patches of the batch that share its name)
+        """
+        highest: Dict[str, int] = {}
+        existing = os.listdir(self.patch_directory) if self.patch_directory.exists() else []
+        for original_file in self.original_files:
+            patch_filename = self.patch_filename or original_file.name
+            if patch_filename not in highest:
+                highest[patch_filename] = 0
+                pattern = re.compile(rf'{patch_filename}\.(\d+)\.patch')
+                for filename in existing:
+                    match = pattern.match(filename)
+                    if match:
+                        highest[patch_filename] = max(highest[patch_filename], int(match.group(1)))
+            highest[patch_filename] += 1
+            mutant_file = self.patch_directory / f"{patch_filename}.{highest[patch_filename]}.patch"
+            self.mutant_files[original_file] = mutant_file
+            print(f"mutant_file - {mutant_file}")
 
     def generate_mutant(self) -> None:
-        assert self.original_file, "generate_mutant: self.original_file is None"
-        Vf.validate_file_in_git(self.original_file)
-
-        diff_result = subprocess.run(['git', 'diff', 'HEAD', '--', self.original_file], capture_output=True, text=True)
-        if diff_result.returncode != 0:
-            raise Util.CertoraUserInputError(f"failed to diff {self.original_file} with the latest Git committed "
-                                             f"version")
-        patch_content = diff_result.stdout
-        self.set_mutant_file()
-        self.mutant_file.parent.mkdir(parents=True, exist_ok=True)
-        with self.mutant_file.open('w') as f:
-
-            f.write(self.collect_metadata())
-            f.write(patch_content)
+        assert self.original_files, "generate_mutant: self.original_files is empty"
+        self.set_mutant_files()
+        self.patch_directory.mkdir(parents=True, exist_ok=True)
+        for original_file, mutant_file in self.mutant_files.items():
+            with mutant_file.open('w') as f:
+                f.write(self.collect_metadata(original_file))
+                f.write(self.diffs[original_file])
 
     def save_mutant_to_conf(self) -> None:
-
+        """
+        Adds all the new mutants to the conf, which is rewritten once, atomically
+        """
         assert self.conf, "save_mutant_to_conf: self.conf not set"
         with self.conf.open() as f:
             conf_content = json.load(f)
@@ -164,24 +266,31 @@ class MutantGenerator:
 
         mutants_array = conf_content[MConstants.MUTATIONS][MConstants.MANUAL_MUTANTS]
 
-        if not self.is_manual_mutant_in_array(mutants_array):
-            mutant_object = {
-                MConstants.FILE_TO_MUTATE: os.path.relpath(self.original_file, Path.cwd()),
-                MConstants.MUTANTS_LOCATION: os.path.relpath(self.mutant_file, Path.cwd())
-            }
-            mutants_array.append(mutant_object)
-            print(f"added {str(mutant_object)}")
-
-            with self.conf.open('w') as json_file:
+        added = False
+        for original_file, mutant_file in self.mutant_files.items():
+            if not self.is_manual_mutant_in_array(mutants_array, original_file, mutant_file):
+                mutant_object = {
+                    MConstants.FILE_TO_MUTATE: os.path.relpath(original_file, Path.cwd()),
+                    MConstants.MUTANTS_LOCATION: os.path.relpath(mutant_file, Path.cwd())
+                }
+                mutants_array.append(mutant_object)
+                print(f"added {str(mutant_object)}")
+                added = True
+
+        if added:
+            conf_dir = self.conf.resolve().parent
+            with tempfile.NamedTemporaryFile('w', dir=conf_dir, suffix='.conf', delete=False) as json_file:
                 json.dump(conf_content, json_file, indent=4)
+            os.replace(json_file.name, self.conf)
 
-    def is_manual_mutant_in_array(self, mutants_array: List[Dict[str, str]]) -> bool:
+    @staticmethod
+    def is_manual_mutant_in_array(mutants_array: List[Dict[str, str]], original_file: Path, mutant_file: Path) -> bool:
         for mutant in mutants_array:
-            if Path(mutant[MConstants.FILE_TO_MUTATE]).resolve() == self.original_file:
+            if Path(mutant[MConstants.FILE_TO_MUTATE]).resolve() == original_file:
                 stored_mutant_location_path = Path(mutant[MConstants.MUTANTS_LOCATION]).resolve()
-                if stored_mutant_location_path == self.mutant_file:  # location is a file
+                if stored_mutant_location_path == mutant_file.resolve():  # location is a file
                     return True
-                if stored_mutant_location_path == self.mutant_file.parent:  # location is a directory
+                if stored_mutant_location_path == mutant_file.parent.resolve():  # location is a directory
                     return True
         return False
 
@@ -15,7 +15,16 @@
 
 from pathlib import Path
 import argparse
-from typing import List
+import hashlib
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from tabulate import tabulate
 
 from ConfRunnerInfra.TestTable import TestTable  # type: ignore
 from ConfRunnerInfra.Checks.VerificationCheck import VerificationCheck  # type: ignore
@@ -32,6 +41,21 @@ sys.path.append(str(test_dir))
 
 from ConfTester.RegTestDispatch import BASE_FLAGS
 
+scripts_dir = Path(__file__).parent.resolve()
+sys.path.insert(0, str(scripts_dir))
+
+from Shared import certoraUtils as Util
+
+REPORT_FILE = Path("Report.csv")
+HISTORY_FILE = Path("localRegtest_history.json")
+REPORTS_DIR = Util.CERTORA_INTERNAL_ROOT / "local_regtest_reports"
+HISTORY_LENGTH = 10  # the number of runs that are kept in the history of every conf
+SOURCE_SUFFIXES = {".conf", ".spec", ".sol", ".vy", ".json", ".yul", ".rs", ".toml", ".move"}
+
+STATUS_PASSED = "PASSED"
+STATUS_FAILED = "FAILED"
+STATUS_SKIPPED = "SKIPPED"
+
 
 def filter_confs(confs: List[Path], ignore_confs: Path) -> List[Path]:
     """
@@ -51,6 +75,226 @@ def filter_confs(confs: List[Path], ignore_confs: Path) -> List[Path]:
     return confs
 
 
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_jar_hash() -> str:
+    """
+    Returns:
+        str: The hash of the Prover jar the tests are run with, or an empty string if there is none.
+    """
+    jar = Util.get_certora_root_directory() / Util.EMV_JAR
+    return hash_file(jar) if jar.is_file() else ""
+
+
+def is_excluded_input(path: Path, root: Path) -> bool:
+    return any(part == ".certora_internal" or part.startswith("emv-") for part in path.relative_to(root).parts)
+
+
+def get_conf_referenced_paths(conf: Path) -> List[Path]:
+    """
+    Find the files and directories a conf refers to, e.g. sources, specs, packages and allowed paths, that may be
+    outside of its directory (e.g. "../contracts/A.sol").
+    Every string value of the conf, and every part of it around ':' and '=' (as in "C:spec.spec" or "name=path"),
+    that names an existing path relative to the conf's directory is taken.
+    Args:
+        conf (Path): The absolute path of the configuration file.
+    Returns:
+        List[Path]: The resolved referenced paths.
+    """
+    try:
+        with conf.open() as f:
+            conf_content = Util.read_conf_file(f)
+    except Exception:
+        return []  # the run of the conf will report the error
+
+    def strings(value: Any) -> List[str]:
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, dict):
+            return [s for v in value.values() for s in strings(v)]
+        if isinstance(value, list):
+            return [s for v in value for s in strings(v)]
+        return []
+
+    paths = set()
+    for value in strings(conf_content):
+        for candidate in {value, *value.replace("=", ":").split(":")}:
+            if not candidate.strip():
+                continue
+            path = (conf.parent / candidate.strip()).resolve()
+            if path.exists():
+                paths.add(path)
+    return sorted(paths)
+
+
+def get_conf_inputs_hash(conf: Path, run_key: str) -> str:
+    """
+    Hash the inputs of a single conf: the conf itself, the spec and source files in its directory tree, the files and
+    directory trees it refers to (and the trees of the referenced files, which may be imported by them) and the run key
+    (the jar hash and the flags every conf is run with).
+    Args:
+        conf (Path): The absolute path of the configuration file.
+        run_key (str): The hash of the inputs that are shared by all the confs.
+    Returns:
+        str: The hash of the conf's inputs.
+    """
+    digest = hashlib.sha256(run_key.encode())
+    conf_dir = conf.parent.resolve()
+    roots = {conf_dir}
+    input_files = {conf.resolve()}
+    for path in get_conf_referenced_paths(conf):
+        if path.is_dir():
+            roots.add(path)
+        else:
+            input_files.add(path)
+            roots.add(path.parent)
+    # trees that are nested in other trees are hashed with them
+    roots = {root for root in roots if not any(other in root.parents for other in roots)}
+    for root in roots:
+        input_files.update(f for f in root.rglob("*")
+                           if f.suffix in SOURCE_SUFFIXES and f.is_file() and not is_excluded_input(f, root))
+    for f in sorted(input_files):
+        digest.update(os.path.relpath(f, conf_dir).encode())
+        digest.update(hash_file(f).encode())
+    return digest.hexdigest()
+
+
+def read_history(history_file: Path) -> Dict[str, List[Dict[str, Any]]]:
+    try:
+        with history_file.open() as f:
+            history = json.load(f)
+        return history if isinstance(history, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def write_history(history_file: Path, history: Dict[str, List[Dict[str, Any]]]) -> None:
+    """
+    Write the history sorted by conf, so that changes in the run times and memory of the confs
+    show up as diffs of the history file.
+    """
+    tmp_file = history_file.with_name(history_file.name + ".tmp")
+    with tmp_file.open("w") as f:
+        json.dump(history, f, indent=2, sort_keys=True)
+        f.write("\n")
+    tmp_file.replace(history_file)
+
+
+def get_report_file(conf_key: str) -> Path:
+    return REPORTS_DIR / f"{hashlib.sha256(conf_key.encode()).hexdigest()[:16]}.csv"
+
+
+def run_conf_process(conf: Path, report_file: Path, child_args: List[str]) -> Tuple[bool, float, float]:
+    """
+    Run a single conf in a separate process, which runs this script on the conf alone.
+    Args:
+        conf (Path): The configuration file to run.
+        report_file (Path): The CSV file the child process exports its report to.
+        child_args (List[str]): The command line arguments that are passed to the child process.
+    Returns:
+        Tuple[bool, float, float]: Whether all the checks passed, the wall time in seconds and the maximal
+        resident set size in MB of the process and the processes it started (the prover itself).
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--path", str(conf),
+                                "--report", str(report_file)] + child_args)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return process.returncode == 0, wall_time, max_rss_mb
+
+
+def merge_reports(report_files: List[Path], output: Path) -> None:
+    """
+    Concatenate the CSV reports of the confs into a single report, keeping the header of the first one.
+    """
+    header_written = False
+    with output.open("w") as out:
+        for report_file in report_files:
+            if not report_file.is_file():
+                continue
+            lines = report_file.read_text().splitlines(keepends=True)
+            if not lines:
+                continue
+            if not header_written:
+                out.write(lines[0])
+                header_written = True
+            out.writelines(lines[1:])
+
+
+def run_sharded(confs: List[Path], args: argparse.Namespace, child_args: List[str]) -> int:
+    """
+    Run the confs in args.jobs parallel worker processes, the slowest ones (according to the history) first.
+    Confs whose inputs did not change since their last passing run are skipped, and their last report is reused.
+    The wall time and memory of every conf that was run are recorded in the history file.
+    Returns:
+        int: The number of confs that failed.
+    """
+    history = read_history(args.history_file)
+    run_key = hashlib.sha256(json.dumps([get_jar_hash(), BASE_FLAGS, child_args], sort_keys=True,
+                                        default=str).encode()).hexdigest()
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    conf_keys = {conf: os.path.relpath(conf) for conf in confs}
+    inputs_hashes = {conf: get_conf_inputs_hash(conf, run_key) for conf in confs}
+    last_runs: Dict[Path, Dict[str, Any]] = {conf: history[conf_keys[conf]][-1] for conf in confs
+                                             if history.get(conf_keys[conf])}
+
+    def is_unchanged(conf: Path) -> bool:
+        last_run = last_runs.get(conf)
+        return last_run is not None and last_run["status"] == STATUS_PASSED and \
+            last_run["inputs_hash"] == inputs_hashes[conf] and get_report_file(conf_keys[conf]).is_file()
+
+    to_run = [conf for conf in confs if args.no_skip or not is_unchanged(conf)]
+    # longest first, confs with no history are assumed to be the slowest
+    to_run.sort(key=lambda c: -last_runs.get(c, {}).get("wall_time", float("inf")))
+    print(f"Running {len(to_run)} out of {len(confs)} confs with {args.jobs} workers")
+
+    def run_and_record(conf: Path) -> None:
+        passed, wall_time, max_rss_mb = run_conf_process(conf, get_report_file(conf_keys[conf]), child_args)
+        conf_history = history.setdefault(conf_keys[conf], [])
+        conf_history.append({
+            "status": STATUS_PASSED if passed else STATUS_FAILED,
+            "inputs_hash": inputs_hashes[conf],
+            "wall_time": round(wall_time, 1),
+            "max_rss_mb": round(max_rss_mb),
+            "date": datetime.now().isoformat(timespec="seconds")
+        })
+        del conf_history[:-HISTORY_LENGTH]
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        for _ in executor.map(run_and_record, to_run):
+            pass
+    write_history(args.history_file, history)
+
+    rows = []
+    failed = 0
+    for conf in confs:
+        runs = history[conf_keys[conf]]
+        if conf in to_run:
+            current, previous = runs[-1], (runs[-2] if len(runs) > 1 else {})
+            status = current["status"]
+        else:
+            current, previous = runs[-1], {}
+            status = STATUS_SKIPPED
+        failed += status == STATUS_FAILED
+        rows.append([conf_keys[conf], status, current["wall_time"], previous.get("wall_time", ""),
+                     current["max_rss_mb"], previous.get("max_rss_mb", "")])
+    print(tabulate(rows, headers=["Conf", "Status", "Time (s)", "Previous time (s)",
+                                  "Max RSS (MB)", "Previous max RSS (MB)"]))
+
+    merge_reports([get_report_file(conf_keys[conf]) for conf in confs], args.report)
+    return failed
+
+
 def parse_args() -> argparse.Namespace:
     """
     Parse command line arguments.
@@ -71,6 +315,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--jacoco', action="store_true", help='Decide if execute with Jacoco data collection')
     parser.add_argument('--ignore_confs', default=Path(__file__).parent / "conf_tester/conf_ignore.txt", type=Path,
                         help="A file containing a list of .conf files to skip")
+    parser.add_argument('--report', default=REPORT_FILE, type=Path, help="The CSV file the report is exported to")
+    parser.add_argument('--jobs', type=int, default=0,
+                        help="""Run the confs in this many parallel worker processes, slowest first, skipping confs
+                            that did not change since their last passing run and recording the wall time and memory
+                            of every conf in the history file. By default, all the confs are run in this process""")
+    parser.add_argument('--history_file', default=HISTORY_FILE, type=Path,
+                        help="The file the run times and memory of the confs are recorded in, when --jobs is given")
+    parser.add_argument('--no_skip', action="store_true",
+                        help="With --jobs, run all the confs even if they did not change since their last passing run")
 
     args = parser.parse_args()
 
@@ -90,6 +343,17 @@ def main() -> None:
     confs = filter_confs(confs, args.ignore_confs)
     confs = [conf.resolve() for conf in confs]
 
+    if args.jobs > 0:
+        # the flags that are handled by the child processes, running a single conf each
+        child_args = ["--ignore_confs", str(args.ignore_confs.resolve())]
+        if args.additional_prover_args:
+            child_args += ["--additional_prover_args", args.additional_prover_args]
+        if args.additional_java_args:
+            child_args += ["--additional_java_args", args.additional_java_args]
+        child_args += [flag for flag, enabled in [("--clean_output", args.clean_output), ("--jacoco", args.jacoco)]
+                       if enabled]
+        exit(1 if run_sharded(confs, args, child_args) else 0)
+
     checks = [VerificationCheck(), RegressionCheck(), AnalysisCheck()]
 
     test_table = TestTable(confs, checks)
@@ -116,7 +380,7 @@ def main() -> None:
     print(BASE_FLAGS)
 
     local_executor.execute_tests({conf: BASE_FLAGS for conf in confs})
-    test_table.export_csv("Report.csv")
+    test_table.export_csv(str(args.report))
 
     exit(
         Queries.query_failed_tests(test_table, "Verification") or
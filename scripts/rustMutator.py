@@ -15,16 +15,21 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import os
 import atexit
+import queue
 import shutil
 import subprocess
 import argparse
+import tempfile
 from pathlib import Path
 import logging
 import re
 import random
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from tqdm import tqdm
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from Shared import certoraUtils as Util
 
@@ -32,6 +37,13 @@ rust_mutator_logger = logging.getLogger("rust_mutator")
 
 NUM_MUTANTS = 10
 SEED = 1
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+
+# Directories of the project that are not copied to the worktrees in which mutants are compiled
+WORKTREE_SKIPPED_DIRS = {"target", ".git", Util.CERTORA_INTERNAL_ROOT.name}
+# Every worker keeps its cargo target dir here, so consecutive builds of the same worker (and of later runs) are
+# incremental
+MUTANT_TARGET_DIRS = Util.CERTORA_INTERNAL_ROOT / "rust_mutator"
 
 def parse_args() -> argparse.Namespace:
     """
@@ -81,6 +93,13 @@ def parse_args() -> argparse.Namespace:
         default=SEED,
         help="Seed value for random selection to ensure repeatable testing"
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Number of mutants that are compiled in parallel (default: {DEFAULT_JOBS})"
+    )
     parser.add_argument(
         "--debug",
         "-d",
@@ -187,59 +206,171 @@ def validate_mutant_dir(mutants_location: Path) -> None:
         rust_mutator_logger.info(f"Mutant directory '{mutants_location}' created successfully.")
 
 
-def validate_mutant_count(file_to_mutate: Path, mutants_location: Path, num_mutants: int, seed: int) -> None:
+def get_mutant_number(file_to_mutate: Path, mutant: Path) -> Optional[int]:
+    """
+    Get the number universalmutator gave to a mutant of file_to_mutate.
+
+    Args:
+        file_to_mutate (Path): Path to the original Rust source file.
+        mutant (Path): Path to a file in the mutant directory.
+
+    Returns:
+        Optional[int]: The mutant number, or None if mutant is not a mutant of file_to_mutate.
+    """
+    match = re.match(rf"{re.escape(file_to_mutate.stem)}\.mutant\.(\d+)\.rs$", mutant.name)
+    return int(match.group(1)) if match else None
+
+
+def get_generated_mutants(file_to_mutate: Path, mutants_location: Path) -> List[Path]:
     """
-    Validate the number of mutants generated is less than or equal to the specified limit. If the number of mutants
-    exceeds the limit, select uniformly based on the seed and delete the rest.
+    Get the mutants universalmutator generated, ordered by their number.
 
     Args:
         file_to_mutate (Path): Path to the original Rust source file.
         mutants_location (Path): Directory containing generated mutants.
-        num_mutants (int): Upper bound on the number of mutants to generate.
-        seed (int, optional): Seed value for random selection.
 
     Raises:
         Util.CertoraUserInputError: If no mutants are generated.
     """
-    # Define the regex pattern to extract the mutant number
-    pattern = re.compile(rf"{re.escape(file_to_mutate.stem)}\.mutant\.(\d+)\.rs$")
+    numbered_mutants = [(number, mutant) for mutant in mutants_location.iterdir()
+                        if (number := get_mutant_number(file_to_mutate, mutant)) is not None]
+    if not numbered_mutants:
+        raise Util.CertoraUserInputError("No mutants generated. Exiting...")
+    rust_mutator_logger.info(f"Number of mutants generated: {len(numbered_mutants)}")
+    return [mutant for _, mutant in sorted(numbered_mutants)]
 
-    # Gather all mutants matching the pattern
-    mutants = [mutant for mutant in mutants_location.iterdir() if pattern.match(mutant.name)]
 
-    num_mutants_generated = len(mutants)
+@contextmanager
+def create_worktrees(project_dir: Path, count: int) -> Iterator["queue.Queue[Tuple[int, Path]]"]:
+    """
+    Copy the project to count worktrees, in which mutants are compiled without touching the project itself. The
+    worktrees are created next to the project, so relative paths that leave it (e.g. cargo `path = "../..."`
+    dependencies, or files used by build scripts) resolve to the same files as in the project. They are outside the
+    project, so cargo does not mistake them for members of the project's workspace. The worktrees are deleted on exit.
 
-    if num_mutants_generated == 0:
-        raise Util.CertoraUserInputError("No mutants generated. Exiting...")
+    Args:
+        project_dir (Path): The directory the build script runs in.
+        count (int): Number of worktrees to create.
+
+    Yields:
+        queue.Queue[Tuple[int, Path]]: The worktrees and their indexes, to be taken by workers for one build at a
+            time. The index names the worktree's cargo target dir, so it is the same in every run.
+    """
+    def ignore_dirs(src: str, names: List[str]) -> List[str]:
+        return [name for name in names if name in WORKTREE_SKIPPED_DIRS and (Path(src) / name).is_dir()]
+
+    created: List[Path] = []
+    worktrees: "queue.Queue[Tuple[int, Path]]" = queue.Queue()
+    try:
+        for index in range(count):
+            worktree = Path(tempfile.mkdtemp(prefix=f".{project_dir.name}_mutant_", dir=project_dir.parent))
+            created.append(worktree)
+            shutil.copytree(project_dir, worktree, ignore=ignore_dirs, symlinks=True, dirs_exist_ok=True)
+            worktrees.put((index, worktree))
+        yield worktrees
+    finally:
+        for worktree in created:
+            shutil.rmtree(worktree, ignore_errors=True)
+
+
+def compiles(mutant: Path, file_to_mutate: Path, rel_file_to_mutate: Path, build_script: str,
+             worktrees: "queue.Queue[Tuple[int, Path]]") -> bool:
+    """
+    Check if a mutant compiles by building it in a free worktree. The worktree is returned to the pool afterward with
+    the original source file back in place.
+
+    Args:
+        mutant (Path): The mutant to check.
+        file_to_mutate (Path): Path to the original Rust source file.
+        rel_file_to_mutate (Path): Path of the source file, relative to the root of the worktrees.
+        build_script (str): Build command, run in the root of the worktree.
+        worktrees (queue.Queue[Tuple[int, Path]]): The worktrees that are not in use, with their indexes.
+
+    Returns:
+        bool: True if the build succeeded.
+    """
+    worktree_index, worktree = worktrees.get()
+    try:
+        env = os.environ.copy()
+        env["CARGO_TARGET_DIR"] = str((MUTANT_TARGET_DIRS / f"target_{worktree_index}").resolve())
+        target_file = worktree / rel_file_to_mutate
+        shutil.copyfile(mutant, target_file)
+        try:
+            result = subprocess.run(build_script, shell=True, cwd=worktree, env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        finally:
+            shutil.copyfile(file_to_mutate, target_file)
+        rust_mutator_logger.debug(f"Building {mutant.name} returned {result.returncode}:\n{result.stdout}")
+        return result.returncode == 0
+    finally:
+        worktrees.put((worktree_index, worktree))
+
+
+def select_mutants(file_to_mutate: Path, build_script: str, mutants_location: Path, num_mutants: int, seed: int,
+                   jobs: int) -> None:
+    """
+    Select up to num_mutants mutants that compile. Mutants are drawn uniformly based on the seed, and only the drawn
+    mutants are compiled, in parallel isolated copies of the project. Whenever some of them do not compile, more
+    mutants are drawn. Mutants that were not selected are deleted, and the selected ones are renamed to
+    <stem>.mutant.0.rs ... <stem>.mutant.<n-1>.rs.
+
+    Args:
+        file_to_mutate (Path): Path to the original Rust source file.
+        build_script (str): Command to execute for each mutant to verify compilation.
+        mutants_location (Path): Directory containing generated mutants.
+        num_mutants (int): Upper bound on the number of mutants to select.
+        seed (int): Seed value for random selection.
+        jobs (int): Number of mutants that are compiled in parallel.
+
+    Raises:
+        Util.CertoraUserInputError: If no mutants are generated, or if the source file is not under the current
+            directory (in which the build script runs).
+    """
+    mutants = get_generated_mutants(file_to_mutate, mutants_location)
+    candidates = uniform_selection(mutants, len(mutants), seed)
+
+    project_dir = Path.cwd().resolve()
+    try:
+        rel_file_to_mutate = file_to_mutate.resolve().relative_to(project_dir)
+    except ValueError:
+        raise Util.CertoraUserInputError(f"Source file '{file_to_mutate}' must be under the directory the build "
+                                         f"script runs in ({project_dir})")
+
+    jobs = max(1, min(jobs, num_mutants, len(candidates)))
+    selected: List[Path] = []
+    checked = 0
+    MUTANT_TARGET_DIRS.mkdir(parents=True, exist_ok=True)
+    rust_mutator_logger.info(f"Compiling mutants in {jobs} worktrees next to {project_dir}")
+    with create_worktrees(project_dir, jobs) as worktrees:
+        with ThreadPoolExecutor(max_workers=jobs) as executor, \
+                tqdm(total=num_mutants, desc="Mutants Compiled", unit="mutant") as progress_bar:
+            while len(selected) < num_mutants and checked < len(candidates):
+                # compile at least one mutant per worker, and keep the selection independent of the build order
+                batch = candidates[checked:checked + max(num_mutants - len(selected), jobs)]
+                checked += len(batch)
+                results = list(executor.map(
+                    lambda m: compiles(m, file_to_mutate, rel_file_to_mutate, build_script, worktrees), batch))
+                compiled = [mutant for mutant, ok in zip(batch, results) if ok][:num_mutants - len(selected)]
+                selected.extend(compiled)
+                progress_bar.update(len(compiled))
+
+    if not selected:
+        raise Util.CertoraUserInputError(f"None of the {checked} mutants that were checked compiled. Exiting...")
+    if len(selected) < num_mutants:
+        rust_mutator_logger.warning(f"Number of mutants that compiled ({len(selected)}) is less than the specified "
+                                    f"limit ({num_mutants}).")
+    rust_mutator_logger.info(f"Selected {len(selected)} mutants based on seed {seed} out of {checked} that were "
+                             f"compiled ({len(mutants)} generated).")
+
+    for mutant in set(mutants) - set(selected):
+        mutant.unlink()
+    # rename in two steps, since a mutant may be renamed to the current name of another selected mutant
+    renamed = [mutant.rename(mutant.with_name(f"{mutant.name}.selected")) for mutant in selected]
+    for i, mutant in enumerate(renamed):
+        new_file_name = mutant.with_name(f"{file_to_mutate.stem}.mutant.{i}.rs")
+        mutant.rename(new_file_name)
+        rust_mutator_logger.debug(f"Renamed {mutant} to {new_file_name}")
 
-    rust_mutator_logger.info(f"Number of mutants generated: {num_mutants_generated}")
-
-    # If number of mutants exceeds the limit, select uniformly based on seed
-    if num_mutants_generated > num_mutants:
-        selected_mutants = uniform_selection(mutants, num_mutants, seed)
-        # Delete mutants not in selected_mutants
-        mutants_to_delete = set(mutants) - set(selected_mutants)
-        for mutant in mutants_to_delete:
-            mutant.unlink()
-        rust_mutator_logger.info(f"Selected {len(selected_mutants)} mutants based on seed {seed}. Deleted {len(mutants_to_delete)} mutants.")
-    elif num_mutants_generated < num_mutants:
-        rust_mutator_logger.warning(f"Number of mutants generated ({num_mutants_generated}) is less than the specified limit ({num_mutants}).")
-
-    # Maintain the mutant file name incremental indexing after selection and deletion
-    numbered_mutants: List[Tuple[Path, int]] = [
-        (mutant, int(match.group(1)))
-        for mutant in mutants_location.iterdir()
-        if (match := pattern.match(mutant.name))
-    ]
-    for mutant, mutant_number in numbered_mutants:
-        if not 0 <= mutant_number < num_mutants:
-            for i in range(num_mutants):
-                new_file_name = mutant.with_name(f"{file_to_mutate.stem}.mutant.{i}.rs")
-                if new_file_name.exists():
-                    continue
-                mutant.rename(new_file_name)
-                rust_mutator_logger.debug(f"Renamed {mutant} to {new_file_name}")
-                break
 
 def validate_mutate_command() -> None:
     """
@@ -255,14 +386,14 @@ def validate_mutate_command() -> None:
                                          " https://github.com/agroce/universalmutator")
 
 
-def run_mutate(file_to_mutate: Path, mutants_location: Path, build_command: str) -> None:
+def run_mutate(file_to_mutate: Path, mutants_location: Path) -> None:
     """
     Execute the universalmutator command to generate mutants, displaying a progress bar.
+    Mutants are not compiled by universalmutator (see select_mutants), so the source file is never modified.
 
     Args:
         file_to_mutate (Path): Path to the Rust source file.
         mutants_location (Path): Directory to store generated mutants.
-        build_command (str): Command to execute for each mutant to verify compilation.
 
     Raises:
         subprocess.CalledProcessError: If the mutate command fails.
@@ -273,8 +404,7 @@ def run_mutate(file_to_mutate: Path, mutants_location: Path, build_command: str)
         "rust",
         "--mutantDir",
         str(mutants_location),
-        "--cmd",
-        build_command
+        "--noCheck"
     ]
     rust_mutator_logger.info("Generating mutants...")
     rust_mutator_logger.debug(f"Running universalmutator with command: {' '.join(mutate_command)}")
@@ -349,10 +479,12 @@ def run_universal_mutator(
         mutants_location: Path,
         num_mutants: int = NUM_MUTANTS,
         seed: int = SEED,
-        debug: bool = False
+        debug: bool = False,
+        jobs: int = DEFAULT_JOBS
 ) -> None:
     f"""
-    Generate mutants for the specified source file and ensure the original file remains unchanged.
+    Generate mutants for the specified source file. The source file itself is never modified: mutants are compiled
+    in copies of the project.
 
     Args:
         file_to_mutate (Path): Path to the Rust source file.
@@ -361,14 +493,12 @@ def run_universal_mutator(
         num_mutants (int): Upper bound on the number of mutants to generate (default: {NUM_MUTANTS}).
         seed (int): Seed value for random selection to ensure repeatable testing (default: {SEED}).
         debug (bool): Enable debug logging.
+        jobs (int): Number of mutants that are compiled in parallel (default: {DEFAULT_JOBS}).
 
     Raises:
         Util.CertoraUserInputError: If any validation fails.
         Exception: For unexpected errors.
     """
-    backup_file = None
-    build_command = f"cp MUTATE & {build_script}"
-
     atexit.register(clean_temp_files, file_to_mutate)
 
     try:
@@ -382,27 +512,15 @@ def run_universal_mutator(
         # Validate source file
         validate_source_file(file_to_mutate)
 
-        # Backup the original source file
-        rust_mutator_logger.info(f"Backing up '{file_to_mutate}' ...")
-        backup_file = Util.create_backup(file_to_mutate)
-
-        if backup_file:
-            atexit.register(Util.restore_backup, backup_file)
-            rust_mutator_logger.info(f"Backing up '{file_to_mutate}' to '{backup_file} succeeded")
-        else:
-            rust_mutator_logger.warning(f"Backing up '{file_to_mutate}' to '{backup_file} failed")
-
         # Validate or create mutant directory
         validate_mutant_dir(mutants_location)
 
         # Run the mutation command
-        run_mutate(file_to_mutate, mutants_location, build_command)
+        run_mutate(file_to_mutate, mutants_location)
 
-        # Make sure the number of mutants generated is less than or equal to the specified limit
-        validate_mutant_count(file_to_mutate, mutants_location, num_mutants, seed)
+        # Compile a uniform selection of the mutants, keeping up to the specified limit of mutants that compile
+        select_mutants(file_to_mutate, build_script, mutants_location, num_mutants, seed, jobs)
     finally:
-        if backup_file:
-            Util.restore_backup(backup_file)
         clean_temp_files(file_to_mutate)
 
 
@@ -415,5 +533,6 @@ if __name__ == "__main__":
         args.mutants_location,
         args.num_mutants,
         args.seed,
-        args.debug
+        args.debug,
+        args.jobs
     )